@@ -0,0 +1,246 @@
+# Fixture corpus for the offline benchmarks. A corpus holds wiki pages by pageid along with their titles, categories,
+# redirects and image files, and is served by mock_mediawiki.py in place of IMFDB. Synthetic pages have their wikitext
+# as well as their html, so both page sources of the script can be benchmarked.
+#
+# Pages come from two sources: saved pages (see load_saved_pages()) and synthetic pages generated from a seed, which mimic
+# the structure the extraction script relies on (spec lists, Film and Television tables, multi-gun pages, redirects,
+# accented names, shared screenshots). The synthetic part scales linearly with the scale factor. No IMFDB downloads are
+# shipped, benchmark/fixtures holds a few hand-written pages in their layout.
+
+import hashlib
+import logging
+import os
+import random
+import re
+from urllib.parse import quote
+
+# Diagnostics go to the logger of imfdb_connector.py, which run_benchmarks.py configures
+logger = logging.getLogger("imfdb")
+
+# Number of synthetic pages per category at scale 1
+base_counts_dict = {
+    "Actor" : 60,
+    "Movie" : 40,
+    "Television" : 15,
+    "Gun" : 30
+}
+
+first_names = ["John", "Arnold", "Sigourney", "Keanu", "Téa", "André", "Ramón", "Kari", "Michelle", "Bruce", "Linda", "Jean", "Zoë", "Björn", "Chow"]
+last_names = ["Smith", "Leoni", "Holland", "Rodríguez", "Wührer", "Yeoh", "Willis", "Hamilton", "Reno", "Skarsgård", "Yun-fat", "Weaver", "Reeves"]
+title_words = ["Dark", "Heat", "Commando", "Silent", "Red", "Justice", "Last", "Night", "Storm", "Iron", "Hunter", "Blood", "City", "Code", "Fury"]
+firearm_types = ["Pistol", "Revolver", "Assault Rifle", "Submachine Gun", "Shotgun", "Bolt-Action Rifle", "Machine Gun"]
+calibers = ["9x19mm Parabellum", ".45 ACP", "5.56x45mm NATO", "7.62x39mm", "12 gauge", ".357 Magnum", "7.62x51mm NATO, .308 Winchester"]
+capacities = ["15-round detachable box magazine", "6-round cylinder", "20 or 30-round box magazine", "Belt-fed", "5-round tube magazine"]
+fire_modes = ["Semi-Automatic", "Semi-Automatic, Fully-Automatic", "Single/Double Action", "Bolt-Action", "Pump-Action", "Semi-Automatic, 3-round burst"]
+
+def new_corpus():
+    return {
+        "pages" : {}, # pageid -> {"title", "html", "wikitext", "category", "redirect_to"}
+        "titles" : {}, # title -> pageid
+        "files" : {} # file name -> {"content", "sha1", "size", "width", "height", "mime"}
+    }
+
+def add_page(corpus, pageid, title, html, category=None, redirect_to=None, wikitext=None):
+    corpus["pages"][str(pageid)] = {"title" : title, "html" : html, "wikitext" : wikitext, "category" : category, "redirect_to" : redirect_to}
+    corpus["titles"][title] = str(pageid)
+
+def add_file(corpus, filename, rng):
+    # Image files get deterministic content, so the sha1 reported by imageinfo matches what the mock serves
+    if filename in corpus["files"]:
+        return
+    content = rng.randbytes(rng.randint(2000, 20000))
+    corpus["files"][filename] = {
+        "content" : content,
+        "sha1" : hashlib.sha1(content).hexdigest(),
+        "size" : len(content),
+        "width" : rng.choice([300, 600, 800]),
+        "height" : rng.choice([200, 400, 450]),
+        "mime" : "image/jpeg"
+    }
+
+def image_path(filename, width=None):
+    # The path MediaWiki serves a file or one of its thumbnails under, e.g. '/images/thumb/4/4b/Foo.jpg/600px-Foo.jpg'
+    digest = hashlib.md5(filename.replace(" ", "_").encode()).hexdigest()
+    name = quote(filename.replace(" ", "_"))
+    if width is None:
+        return f"/images/{digest[0]}/{digest[:2]}/{name}"
+    return f"/images/thumb/{digest[0]}/{digest[:2]}/{name}/{width}px-{name}"
+
+def wiki_link(title, text=None):
+    return f'<a href="/wiki/{quote(title.replace(" ", "_"))}" title="{title}">{text or title}</a>'
+
+def wikitext_link(title, text=None):
+    return f"[[{title}|{text}]]" if text else f"[[{title}]]"
+
+def page_html(title, body):
+    # Full page as served by index.php, including the bits of skin the extraction has to ignore
+    return (f'<!DOCTYPE html>\n<html><head><title>{title} - Internet Movie Firearms Database</title></head><body>\n'
+            f'<h1 id="firstHeading" class="firstHeading">{title}</h1>\n'
+            f'<div id="mw-content-text"><div class="mw-parser-output">\n{body}\n</div></div>\n'
+            f'<div id="footer"><img src="/resources/assets/poweredby_mediawiki_88x31.png"/></div>\n</body></html>')
+
+def thumb_html(filename):
+    return f'<div class="thumb"><img src="{image_path(filename, 600)}" width="600"/></div>'
+
+def thumb_wikitext(filename):
+    return f"[[File:{filename}|thumb|none|600px]]"
+
+def spec_parts(rng):
+    # Production years and list items of a specification
+    start = rng.randint(1900, 2010)
+    end = rng.choice(["Present", str(start + rng.randint(1, 30))])
+    items = [("Type", rng.choice(firearm_types)), ("Caliber", rng.choice(calibers)), ("Capacity", rng.choice(capacities)), ("Fire Modes", rng.choice(fire_modes))]
+    return f"({start} - {end})", items
+
+def spec_html(production, items, suffix=""):
+    lists = "\n".join(f"<ul><li><b>{name}:</b> {value}</li></ul>" for name, value in items)
+    return f'<h2><span class="mw-headline" id="Specifications{suffix}">Specifications</span></h2>\n<p>{production}\n</p>\n{lists}'
+
+def spec_wikitext(production, items):
+    lists = "\n".join(f"* '''{name}:''' {value}" for name, value in items)
+    return f"==Specifications==\n{production}\n\n{lists}"
+
+def appearance_rows(rng, media_titles, actor_titles, rows):
+    # Rows of a Film or Television table as (media title, (actor kind, actor), character, year), including unlinked
+    # names, redlinks and uncredited extras
+    table_rows = []
+    for _ in range(rows):
+        media_title = rng.choice(media_titles)
+        year = re.search(r"\d{4}", media_title)
+        year = year.group(0) if year else str(rng.randint(1970, 2020))
+        roll = rng.random()
+        if roll < 0.7:
+            actor = ("link", rng.choice(actor_titles))
+        elif roll < 0.8:
+            actor = ("text", f"{rng.choice(first_names)} {rng.choice(last_names)}") # Actor without a page
+        elif roll < 0.85:
+            actor = ("redlink", "Missing Person")
+        else:
+            actor = ("text", rng.choice(["Uncredited", "Various", ""]))
+        table_rows.append((media_title, actor, f"Character {rng.randint(1, 99)}", year))
+    return table_rows
+
+def appearance_table_html(table_name, suffix, table_rows):
+    # A Film or Television table like the ones on firearm pages
+    if table_name == "Film":
+        header = "<tr><th>Title</th><th>Actor</th><th>Character</th><th>Note</th><th>Date</th></tr>"
+    else:
+        header = "<tr><th>Show</th><th>Actor</th><th>Character</th><th>Note</th><th>Air Date</th></tr>"
+    lines = [f'<h2><span class="mw-headline" id="{table_name}{suffix}">{table_name}</span></h2>', '<table class="wikitable">', header]
+    for media_title, (kind, name), character, year in table_rows:
+        if kind == "link":
+            actor = wiki_link(name)
+        elif kind == "redlink":
+            actor = f'<a href="/index.php?title={quote(name.replace(" ", "_"))}&amp;action=edit&amp;redlink=1" class="new">{name}</a>'
+        else:
+            actor = name
+        lines.append(f"<tr><td><i>{wiki_link(media_title)}</i></td><td>{actor}</td><td>{character}</td><td></td><td>{year}</td></tr>")
+    lines.append("</table>")
+    return "\n".join(lines)
+
+def appearance_table_wikitext(table_name, table_rows):
+    # The same table in wikitext, where redlinks are ordinary links to pages that don't exist
+    header = "! Title !! Actor !! Character !! Note !! Date" if table_name == "Film" else "! Show !! Actor !! Character !! Note !! Air Date"
+    lines = [f"=={table_name}==", '{| class="wikitable sortable"', header]
+    for media_title, (kind, name), character, year in table_rows:
+        actor = wikitext_link(name) if kind in ("link", "redlink") else name
+        lines.append("|-")
+        lines.append(f"| ''{wikitext_link(media_title)}'' || {actor} || {character} || || {year}")
+    lines.append("|}")
+    return "\n".join(lines)
+
+def generate_synthetic_pages(corpus, scale=1, seed=1, rows_per_table=8, first_pageid=100000):
+    # Adds synthetic actor, movie, television and firearm pages to the corpus. The same scale and seed always produce the same corpus.
+    rng = random.Random(seed)
+    pageid = first_pageid
+    counts = {category : max(1, int(count * scale)) for category, count in base_counts_dict.items()}
+    screenshots = [f"Screenshot {i}.jpg" for i in range(max(10, counts["Gun"] * 3))]
+    for filename in screenshots:
+        add_file(corpus, filename, rng)
+
+    titles = {category : [] for category in counts}
+    for i in range(counts["Actor"]):
+        titles["Actor"].append(f"{rng.choice(first_names)} {rng.choice(last_names)} {i}")
+    for i in range(counts["Movie"]):
+        titles["Movie"].append(f"{rng.choice(title_words)} {rng.choice(title_words)} {i} ({rng.randint(1970, 2020)})")
+    for i in range(counts["Television"]):
+        titles["Television"].append(f"{rng.choice(title_words)} {rng.choice(title_words)} Series {i}")
+
+    # Appearance tables link to pages by their title and sometimes by one of their redirects
+    link_titles = {category : list(category_titles) for category, category_titles in titles.items()}
+    for category in ["Actor", "Movie", "Television"]:
+        for title in titles[category]:
+            images = [rng.choice(screenshots) for _ in range(rng.randint(1, 4))]
+            html = page_html(title, f"<p>{title} is a page about {category.lower()}s.</p>\n" + "\n".join(thumb_html(image) for image in images))
+            wikitext = f"{title} is a page about {category.lower()}s.\n\n" + "\n".join(thumb_wikitext(image) for image in images)
+            add_page(corpus, pageid, title, html, category, wikitext=wikitext)
+            target = pageid
+            pageid += 1
+            # Some pages can also be reached through a redirect, for example by a name without accents
+            if rng.random() < 0.2:
+                alias = title.replace("é", "e").replace("ó", "o").replace("í", "i").replace("ü", "u").replace("å", "a").replace("ë", "e").replace("ö", "o")
+                if alias == title:
+                    alias = f"{title} (alias)"
+                add_page(corpus, pageid, alias, page_html(title, ""), redirect_to=str(target), wikitext=f"#REDIRECT [[{title}]]")
+                link_titles[category].append(alias)
+                pageid += 1
+
+    for i in range(counts["Gun"]):
+        title = f"{rng.choice(['Colt', 'Glock', 'Heckler & Koch', 'Beretta', 'SIG'])} Model {i}"
+        image = rng.choice(screenshots)
+        body = [f"<p>The {title} is a firearm.</p>", thumb_html(image)]
+        wikitext = [f"The {title} is a firearm.", thumb_wikitext(image)]
+        if rng.random() < 0.2: # Multi-gun page, split into children by the family stage
+            body.insert(0, '<div id="toc" class="toc"><div class="toctitle"><h2>Contents</h2></div><ul><li>1 Variant</li></ul></div>')
+            for child in range(rng.randint(2, 3)):
+                suffix = "" if child == 0 else f"_{child + 1}"
+                image = rng.choice(screenshots)
+                production, items = spec_parts(rng)
+                film_rows = appearance_rows(rng, link_titles["Movie"], link_titles["Actor"], rows_per_table)
+                body.append(f'<h1><span class="mw-headline" id="Variant{suffix}">{title} Variant {child + 1}</span></h1>')
+                body.extend([thumb_html(image), spec_html(production, items, suffix), appearance_table_html("Film", suffix, film_rows)])
+                wikitext.extend([f"={title} Variant {child + 1}=", thumb_wikitext(image), spec_wikitext(production, items), appearance_table_wikitext("Film", film_rows)])
+        else:
+            production, items = spec_parts(rng)
+            film_rows = appearance_rows(rng, link_titles["Movie"], link_titles["Actor"], rows_per_table)
+            television_rows = appearance_rows(rng, link_titles["Television"], link_titles["Actor"], rows_per_table // 2 + 1)
+            body.extend([spec_html(production, items), appearance_table_html("Film", "", film_rows), appearance_table_html("Television", "", television_rows)])
+            wikitext.extend([spec_wikitext(production, items), appearance_table_wikitext("Film", film_rows), appearance_table_wikitext("Television", television_rows)])
+        add_page(corpus, pageid, title, page_html(title, "\n".join(body)), "Gun", wikitext="\n\n".join(wikitext))
+        pageid += 1
+    return corpus
+
+def load_saved_pages(corpus, directory):
+    # Adds saved IMFDB pages to the corpus. Pages are expected as <directory>/<Category>/<pageid>.html, where Category is one
+    # of Actor, Movie, Television or Gun, exactly as downloaded from index.php?curid=<pageid>. Titles are taken from the h1.
+    # A <pageid>.wiki file next to a page is served as its wikitext.
+    for category in base_counts_dict:
+        category_directory = os.path.join(directory, category)
+        if not os.path.isdir(category_directory):
+            continue
+        for filename in sorted(os.listdir(category_directory)):
+            match = re.match(r"^(\d+)\.html?$", filename)
+            if match is None:
+                continue
+            with open(os.path.join(category_directory, filename), encoding="utf-8") as file:
+                html = file.read()
+            title = re.search(r'<h1[^>]*id="firstHeading"[^>]*>(.*?)</h1>', html, re.DOTALL)
+            if title is None:
+                logger.warning("No title found in %s, skipping it.", filename)
+                continue
+            title = re.sub(r"<[^>]+>", "", title.group(1)).strip()
+            wikitext = None
+            wikitext_path = os.path.join(category_directory, f"{match.group(1)}.wiki")
+            if os.path.exists(wikitext_path):
+                with open(wikitext_path, encoding="utf-8") as file:
+                    wikitext = file.read()
+            add_page(corpus, match.group(1), title, html, category, wikitext=wikitext)
+    return corpus
+
+def build_corpus(scale=1, seed=1, fixtures=None, rows_per_table=8):
+    corpus = new_corpus()
+    if fixtures is not None:
+        load_saved_pages(corpus, fixtures)
+    if scale > 0:
+        generate_synthetic_pages(corpus, scale, seed, rows_per_table)
+    return corpus
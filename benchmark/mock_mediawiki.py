@@ -0,0 +1,204 @@
+# Local mock of the IMFDB endpoints used by imfdb_connector.py, serving a fixture corpus (see corpus.py):
+#
+#   api.php?action=query&list=categorymembers   category enumeration with cmcontinue batches
+#   api.php?action=query&titles=...             page ids by title
+#   api.php?action=query&prop=redirects         redirects to a page
+#   api.php?action=query&prop=imageinfo         sha1, size and dimensions of files
+#   api.php?action=query&prop=revisions         wikitext of pages by pageids
+#   api.php?action=parse&pageid=...             page html
+#   index.php?curid=...                         full page html
+#   /wiki/Title                                 full page html by title, following redirects
+#   /images/...                                 image files
+#
+# Run it on its own with 'python benchmark/mock_mediawiki.py --port 8080' and point the script at it with IMFDB_URL.
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from corpus import build_corpus, image_path
+
+def normalize_title(title):
+    # The same normalization MediaWiki applies to titles in requests
+    title = " ".join(unquote(title).replace("_", " ").split())
+    if title == "":
+        return title
+    return title[0].upper() + title[1:]
+
+def resolve_redirect(corpus, pageid):
+    seen = set()
+    while corpus["pages"][pageid]["redirect_to"] is not None and pageid not in seen:
+        seen.add(pageid)
+        pageid = corpus["pages"][pageid]["redirect_to"]
+    return pageid
+
+def query_categorymembers(corpus, params):
+    category = params["cmtitle"][0].split(":", 1)[1]
+    limit = int(params.get("cmlimit", ["10"])[0])
+    start = int(params.get("cmcontinue", ["0"])[0])
+    members = [(pageid, page["title"]) for pageid, page in corpus["pages"].items() if page["category"] == category]
+    batch = members[start:start + limit]
+    data = {"batchcomplete" : "", "query" : {"categorymembers" : [{"pageid" : int(pageid), "ns" : 0, "title" : title} for pageid, title in batch]}}
+    if start + limit < len(members):
+        data["continue"] = {"cmcontinue" : str(start + limit), "continue" : "-||"}
+    return data
+
+def query_titles(corpus, params):
+    pages = {}
+    missing = 0
+    for title in params["titles"][0].split("|"):
+        title = normalize_title(title)
+        if title.startswith("File:"):
+            filename = title.split(":", 1)[1]
+            info = corpus["files"].get(filename)
+            if info is None:
+                missing -= 1
+                pages[str(missing)] = {"ns" : 6, "title" : title, "missing" : ""}
+                continue
+            page = {"ns" : 6, "title" : title, "imagerepository" : "local"}
+            if "imageinfo" in params.get("prop", [""])[0]:
+                page["imageinfo"] = [{"sha1" : info["sha1"], "size" : info["size"], "width" : info["width"], "height" : info["height"],
+                                      "mime" : info["mime"], "url" : f"{params['base_url']}{image_path(filename)}"}]
+            pages[f"f{filename}"] = page
+            continue
+        pageid = corpus["titles"].get(title)
+        if pageid is None:
+            missing -= 1
+            pages[str(missing)] = {"ns" : 0, "title" : title, "missing" : ""}
+        else:
+            pages[pageid] = {"pageid" : int(pageid), "ns" : 0, "title" : title}
+    return {"batchcomplete" : "", "query" : {"pages" : pages}}
+
+def query_redirects(corpus, params):
+    pages = {}
+    for pageid in params["pageids"][0].split("|"):
+        page = corpus["pages"].get(pageid)
+        if page is None:
+            pages[pageid] = {"pageid" : int(pageid), "missing" : ""}
+            continue
+        pages[pageid] = {"pageid" : int(pageid), "ns" : 0, "title" : page["title"]}
+        redirects = [{"pageid" : int(other), "ns" : 0, "title" : corpus["pages"][other]["title"]}
+                     for other, candidate in corpus["pages"].items() if candidate["redirect_to"] == pageid]
+        if len(redirects) > 0:
+            pages[pageid]["redirects"] = redirects
+    return {"batchcomplete" : "", "query" : {"pages" : pages}}
+
+def query_revisions(corpus, params):
+    pages = {}
+    for pageid in params["pageids"][0].split("|"):
+        page = corpus["pages"].get(pageid)
+        if page is None:
+            pages[pageid] = {"pageid" : int(pageid), "missing" : ""}
+            continue
+        pages[pageid] = {"pageid" : int(pageid), "ns" : 0, "title" : page["title"]}
+        if page["wikitext"] is not None:
+            pages[pageid]["revisions"] = [{"slots" : {"main" : {"contentmodel" : "wikitext", "contentformat" : "text/x-wiki", "*" : page["wikitext"]}}}]
+    return {"batchcomplete" : "", "query" : {"pages" : pages}}
+
+def parse_page(corpus, params):
+    pageid = params["pageid"][0]
+    if pageid not in corpus["pages"]:
+        return {"error" : {"code" : "nosuchpageid", "info" : f"There is no page with ID {pageid}."}}
+    page = corpus["pages"][pageid]
+    return {"parse" : {"title" : page["title"], "pageid" : int(pageid), "text" : {"*" : page["html"]}}}
+
+def make_handler(corpus, latency, counters):
+    # Builds the request handler class for a corpus. latency is added to every response to mimic the round trip to IMFDB.
+
+    class MockMediaWikiHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass # Keep the benchmark output readable
+
+        def send(self, status, body, content_type):
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_json(self, data):
+            self.send(200, json.dumps(data), "application/json; charset=utf-8")
+
+        def do_GET(self):
+            if latency > 0:
+                time.sleep(latency)
+            url = urlsplit(self.path)
+            path = "/" + url.path.lstrip("/")
+            params = parse_qs(url.query)
+            params["base_url"] = f"http://{self.headers.get('Host')}"
+            with counters["lock"]:
+                counters["requests"] += 1
+
+            if path == "/api.php":
+                action = params.get("action", [""])[0]
+                if action == "parse":
+                    return self.send_json(parse_page(corpus, params))
+                if action == "query" and "list" in params:
+                    return self.send_json(query_categorymembers(corpus, params))
+                if action == "query" and params.get("prop", [""])[0] == "redirects":
+                    return self.send_json(query_redirects(corpus, params))
+                if action == "query" and params.get("prop", [""])[0] == "revisions":
+                    return self.send_json(query_revisions(corpus, params))
+                if action == "query" and "titles" in params:
+                    return self.send_json(query_titles(corpus, params))
+                return self.send_json({"error" : {"code" : "badrequest", "info" : f"Unsupported request {self.path}"}})
+
+            if path == "/index.php":
+                pageid = params.get("curid", [None])[0]
+                if pageid is not None and pageid in corpus["pages"]:
+                    return self.send(200, corpus["pages"][pageid]["html"], "text/html; charset=UTF-8")
+                return self.send(404, "<html><body><h1>Bad title</h1></body></html>", "text/html; charset=UTF-8")
+
+            if path.startswith("/wiki/"):
+                pageid = corpus["titles"].get(normalize_title(path[len("/wiki/"):]))
+                if pageid is not None:
+                    return self.send(200, corpus["pages"][resolve_redirect(corpus, pageid)]["html"], "text/html; charset=UTF-8")
+                return self.send(404, "<html><body><h1>Page not found</h1></body></html>", "text/html; charset=UTF-8")
+
+            if path.startswith("/images/"):
+                filename = unquote(path.rstrip("/").split("/")[-1]).replace("_", " ")
+                filename = filename.split("px-", 1)[1] if path.startswith("/images/thumb/") and "px-" in filename else filename
+                info = corpus["files"].get(filename)
+                if info is not None:
+                    return self.send(200, info["content"], info["mime"])
+
+            return self.send(404, "Not found", "text/plain")
+
+    return MockMediaWikiHandler
+
+def start_server(corpus, host="127.0.0.1", port=0, latency=0.0):
+    # Starts the mock in a background thread and returns the server and its base url. Port 0 picks a free port.
+    counters = {"requests" : 0, "lock" : threading.Lock()}
+    server = ThreadingHTTPServer((host, port), make_handler(corpus, latency, counters))
+    server.daemon_threads = True
+    server.counters = counters
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves a fixture corpus through a mock of the IMFDB MediaWiki endpoints.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--scale", type=float, default=1, help="Size of the synthetic part of the corpus (default: 1)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--fixtures", help="Directory of saved IMFDB pages, see corpus.load_saved_pages()")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to every response")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.scale, args.seed, args.fixtures)
+    server, url = start_server(corpus, args.host, args.port, args.latency_ms / 1000)
+    print(f"Serving {len(corpus['pages'])} pages and {len(corpus['files'])} files at {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
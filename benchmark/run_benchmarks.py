@@ -0,0 +1,230 @@
+# Offline benchmarks of the extraction stages. Every stage of imfdb_connector.py runs against the mock in mock_mediawiki.py
+# and a local PostgreSQL database, and its throughput and latencies are taken from the stage's run metrics.
+#
+#   python benchmark/run_benchmarks.py --scale 2 --repeat 3
+#   python benchmark/run_benchmarks.py --compare benchmark/results/<old>.json benchmark/results/<new>.json
+#   python benchmark/run_benchmarks.py --bulk-load && python benchmark/run_benchmarks.py --compare benchmark/results/<commit>.json benchmark/results/<commit>-bulk.json
+#
+# The database is emptied before every repetition, so PG_IMFDB_DATABASE must name a separate benchmark database
+# with the schema of db/imfdb_structure.sql (use --init-schema to create it), or --sqlite must name a scratch file.
+# Results are written to benchmark/results/<commit>.json, so runs of different commits can be compared with the same
+# corpus parameters.
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+from corpus import build_corpus
+from mock_mediawiki import start_server
+
+repository = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Messages of the benchmark go through the logger of imfdb_connector.py, which main() configures
+logger = logging.getLogger("imfdb")
+
+def load_script():
+    sys.path.insert(0, repository)
+    return importlib.import_module("imfdb_connector")
+
+def point_script_at(imfdb, url):
+    # Sends the requests of imfdb_connector.py, which was imported before the mock was started, to the mock
+    os.environ["IMFDB_URL"] = url
+    imfdb.imfdb_url = url
+    imfdb.download_dict["base_url"] = os.environ.get("IMFDB_IMAGE_URL", url).rstrip("/")
+
+def init_schema(imfdb):
+    with open(os.path.join(repository, "db", "imfdb_structure.sql"), encoding="utf-8") as file:
+        imfdb.cursor.execute(file.read())
+    # The dump clears the search path for the rest of the session, the script relies on it
+    imfdb.cursor.execute("SELECT pg_catalog.set_config('search_path', 'public', false)")
+    imfdb.cnx.commit()
+
+def reset_database(imfdb):
+    shutil.rmtree(imfdb.download_dict["directory"], ignore_errors=True) # Image store of the downloads stage
+    if imfdb.is_sqlite():
+        # A fresh file is created, with its schema, on the next connection
+        path = imfdb.database_dict["sqlite_path"]
+        imfdb.use_sqlite(path)
+        for suffix in ["", "-wal", "-shm"]:
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        return
+    imfdb.cursor.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public'")
+    tables = [row[0] for row in imfdb.cursor.fetchall()]
+    imfdb.cursor.execute(f"TRUNCATE TABLE {', '.join(tables)} CASCADE")
+    imfdb.cnx.commit()
+
+def sum_counters(report, name):
+    # Sums a counter of a stage report over all of its labels
+    return sum(value for key, value in report["counters"].items() if key == name or key.startswith(name + "{"))
+
+def histogram_percentile(report, name, percentile):
+    # Estimates a percentile as the upper bound of the bucket it falls into, merging the histogram over all of its labels
+    buckets = {}
+    count = 0
+    for key, histogram in report["histograms"].items():
+        if key == name or key.startswith(name + "{"):
+            count += histogram["count"]
+            for bound, bucket_count in histogram["buckets"].items():
+                buckets[float(bound)] = buckets.get(float(bound), 0) + bucket_count
+    if count == 0:
+        return None
+    cumulative = 0
+    for bound in sorted(buckets):
+        cumulative += buckets[bound]
+        if cumulative >= count * percentile:
+            return bound
+    return float("inf")
+
+def summarize_stage(report):
+    wall_seconds = report["wall_seconds"]
+    requests = sum_counters(report, "imfdb_http_requests_total")
+    rows = sum_counters(report, "imfdb_sql_rows_written_total")
+    return {
+        "wall_seconds" : wall_seconds,
+        "cpu_seconds" : report["cpu_seconds"],
+        "http_requests" : requests,
+        "http_bytes" : sum_counters(report, "imfdb_http_received_bytes_total"),
+        "sql_statements" : sum_counters(report, "imfdb_sql_statements_total"),
+        "rows_written" : rows,
+        "requests_per_second" : requests / wall_seconds if wall_seconds > 0 else None,
+        "rows_per_second" : rows / wall_seconds if wall_seconds > 0 else None,
+        "http_p50_seconds" : histogram_percentile(report, "imfdb_http_request_seconds", 0.5),
+        "http_p95_seconds" : histogram_percentile(report, "imfdb_http_request_seconds", 0.95),
+        "sql_p95_seconds" : histogram_percentile(report, "imfdb_sql_statement_seconds", 0.95),
+        "parse_p95_seconds" : histogram_percentile(report, "imfdb_parse_seconds", 0.95)
+    }
+
+def median_summaries(summaries):
+    # Combines the summaries of several repetitions of a stage by taking the median of every value
+    median = {}
+    for key in summaries[0]:
+        values = [summary[key] for summary in summaries if summary[key] is not None]
+        median[key] = statistics.median(values) if len(values) > 0 else None
+    return median
+
+def get_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repository, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repository, capture_output=True, text=True).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_benchmarks(imfdb, args):
+    if args.sqlite is None and os.environ.get("PG_IMFDB_DATABASE", "imfdb") == "imfdb":
+        logger.error("The benchmark empties its database. Set PG_IMFDB_DATABASE to a separate benchmark database.")
+        return 1
+    if args.bulk_load and args.sqlite is not None:
+        logger.error("--bulk-load needs PostgreSQL.")
+        return 1
+
+    corpus = build_corpus(args.scale, args.seed, args.fixtures, args.rows_per_table)
+    server, url = start_server(corpus, latency=args.latency_ms / 1000)
+    print(f"Serving {len(corpus['pages'])} pages and {len(corpus['files'])} files at {url}")
+    point_script_at(imfdb, url)
+    imfdb.use_sqlite(args.sqlite)
+    imfdb.page_source_dict["mode"] = args.source
+    imfdb.download_dict["directory"] = os.path.join(args.output, "images")
+    if args.init_schema and args.sqlite is None:
+        init_schema(imfdb)
+
+    stages = args.stages or imfdb.get_default_stages()
+    metrics_directory = os.path.join(args.output, "metrics")
+    repetitions = {stage : [] for stage in stages}
+    bulk_load_seconds = []
+    for repetition in range(args.repeat):
+        reset_database(imfdb)
+        start = time.perf_counter()
+        if args.bulk_load: # The benchmark database is emptied for every repetition, so it needs no shadow schema
+            imfdb.prepare_bulk_load()
+        for stage in stages:
+            report = imfdb.run_stage(stage, metrics_directory)
+            repetitions[stage].append(summarize_stage(report))
+            print(f"Repetition {repetition + 1}/{args.repeat}, {stage}: {report['wall_seconds']:.2f}s")
+        if args.bulk_load:
+            finish_start = time.perf_counter()
+            imfdb.finish_bulk_load()
+            bulk_load_seconds.append(time.perf_counter() - finish_start)
+            print(f"Repetition {repetition + 1}/{args.repeat}, finishing the bulk load: {bulk_load_seconds[-1]:.2f}s, {time.perf_counter() - start:.2f}s in total")
+    server.shutdown()
+
+    result = {
+        "commit" : get_commit(),
+        "time" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python" : platform.python_version(),
+        "parameters" : {"backend" : "sqlite" if args.sqlite else "postgresql", "source" : args.source, "scale" : args.scale, "seed" : args.seed, "fixtures" : args.fixtures, "rows_per_table" : args.rows_per_table,
+                        "latency_ms" : args.latency_ms, "repeat" : args.repeat, "bulk_load" : args.bulk_load},
+        "corpus" : {"pages" : len(corpus["pages"]), "files" : len(corpus["files"])},
+        "stages" : {stage : median_summaries(summaries) for stage, summaries in repetitions.items()},
+        "bulk_load_seconds" : statistics.median(bulk_load_seconds) if args.bulk_load else 0 # Finishing the bulk load after the stages
+    }
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"{result['commit']}{'-bulk' if args.bulk_load else ''}.json")
+    with open(path, "w") as file:
+        json.dump(result, file, indent=2)
+    print_result(result)
+    print(f"Results written to {path}")
+    return 0
+
+def print_result(result):
+    print(f"{'stage':<16}{'wall s':>10}{'cpu s':>10}{'requests':>10}{'req/s':>10}{'rows/s':>10}{'http p95':>10}")
+    for stage, summary in result["stages"].items():
+        print(f"{stage:<16}{summary['wall_seconds']:>10.2f}{summary['cpu_seconds']:>10.2f}{summary['http_requests']:>10.0f}"
+              f"{summary['requests_per_second'] or 0:>10.1f}{summary['rows_per_second'] or 0:>10.1f}{summary['http_p95_seconds'] or 0:>10.3f}")
+
+def compare_results(old_path, new_path):
+    # Prints the wall time of every stage in two result files side by side
+    with open(old_path) as file:
+        old = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+    # Comparing a normal with a bulk load is what --bulk-load results are for
+    if {**old["parameters"], "bulk_load" : None} != {**new["parameters"], "bulk_load" : None}:
+        logger.warning("The results were produced with different parameters:\n%s\n%s", old["parameters"], new["parameters"])
+    labels = [result["commit"] + (" bulk" if result["parameters"].get("bulk_load") else "") for result in (old, new)]
+    print(f"{'stage':<16}{labels[0]:>16}{labels[1]:>16}{'change':>10}")
+    rows = [(stage, old["stages"][stage]["wall_seconds"], new["stages"][stage]["wall_seconds"]) for stage in new["stages"] if stage in old["stages"]]
+    if old.get("bulk_load_seconds") or new.get("bulk_load_seconds"):
+        rows.append(("finish bulk", old.get("bulk_load_seconds", 0), new.get("bulk_load_seconds", 0)))
+    rows.append(("total", sum(before for _, before, _ in rows), sum(after for _, _, after in rows)))
+    for stage, before, after in rows:
+        change = f"{(after - before) / before * 100:+.1f}%" if before > 0 else "n/a"
+        print(f"{stage:<16}{before:>15.2f}s{after:>15.2f}s{change:>10}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the extraction stages against a mock of IMFDB and a local PostgreSQL database.")
+    parser.add_argument("stages", nargs="*", help="Stages to benchmark in this order, default is all of them")
+    parser.add_argument("--scale", type=float, default=1, help="Size of the synthetic corpus (default: 1)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the synthetic corpus (default: 1)")
+    parser.add_argument("--fixtures", help="Directory of saved pages to include, see corpus.load_saved_pages(). No IMFDB downloads are "
+                                           "shipped, benchmark/fixtures holds a few hand-written pages in their layout")
+    parser.add_argument("--rows-per-table", type=int, default=8, help="Rows per Film table of synthetic firearm pages (default: 8)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay the mock adds to every response (default: 0)")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of repetitions, results are their median (default: 3)")
+    parser.add_argument("--output", default=os.path.join(repository, "benchmark", "results"), help="Directory for result files")
+    parser.add_argument("--log-level", default="WARNING", help="Log level of the stages (default: WARNING)")
+    parser.add_argument("--sqlite", metavar="PATH", help="Benchmark the SQLite backend with a database file at PATH, which is deleted first")
+    parser.add_argument("--source", choices=["html", "wikitext"], default="html", help="Page source of the script (default: html)")
+    parser.add_argument("--init-schema", action="store_true", help="Create the tables of db/imfdb_structure.sql first")
+    parser.add_argument("--bulk-load", action="store_true", help="Load like imfdb_connector.py --bulk-load, results are written to <commit>-bulk.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files instead of running")
+    args = parser.parse_args()
+
+    imfdb = load_script()
+    imfdb.configure_logging(args.log_level)
+    if args.compare is not None:
+        return compare_results(*args.compare)
+    return run_benchmarks(imfdb, args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,7 +27,8 @@ SET default_table_access_method = heap;
 CREATE TABLE public.actorimages (
     actorimageid uuid DEFAULT gen_random_uuid() NOT NULL,
     imageurl character varying NOT NULL,
-    actorid uuid NOT NULL
+    actorid uuid NOT NULL,
+    imageid uuid
 );
 
 
@@ -42,7 +43,8 @@ CREATE TABLE public.actors (
     actorurl character varying,
     actorpageid character varying NOT NULL,
     actorpagecontent character varying,
-    actorname character varying NOT NULL
+    actorname character varying NOT NULL,
+    actorwikitext character varying
 );
 
 
@@ -69,6 +71,112 @@ COMMENT ON COLUMN public.actors.actorpagecontent IS 'The HTML data of the actor
 COMMENT ON COLUMN public.actors.actorname IS 'Full name of the actor';
 
 
+--
+-- Name: COLUMN actors.actorwikitext; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.actors.actorwikitext IS 'The wikitext of the actor page if it was downloaded as wikitext, in which case actorpagecontent is NULL';
+
+
+--
+-- Name: checkpoints; Type: TABLE; Schema: public; Owner: imfdb
+--
+
+CREATE TABLE public.checkpoints (
+    stage character varying NOT NULL,
+    entityid character varying NOT NULL,
+    checkpointtime timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+
+
+ALTER TABLE public.checkpoints OWNER TO imfdb;
+
+--
+-- Name: TABLE checkpoints; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON TABLE public.checkpoints IS 'Entries finished by a pipeline stage that is still running, so an interrupted stage can resume';
+
+
+--
+-- Name: extractedpages; Type: TABLE; Schema: public; Owner: imfdb
+--
+
+CREATE TABLE public.extractedpages (
+    extractor character varying NOT NULL,
+    pageid character varying NOT NULL,
+    sha256 character varying NOT NULL,
+    version integer NOT NULL,
+    entityid character varying NOT NULL,
+    state character varying
+);
+
+
+
+
+ALTER TABLE public.extractedpages OWNER TO imfdb;
+
+--
+-- Name: TABLE extractedpages; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON TABLE public.extractedpages IS 'The page content and extractor version the derived rows of every page were written from, so unchanged pages are skipped';
+
+
+--
+-- Name: COLUMN extractedpages.entityid; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.extractedpages.entityid IS 'The row the derived rows belong to, pages are skipped only as long as it is the same';
+
+
+--
+-- Name: COLUMN extractedpages.state; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.extractedpages.state IS 'State of the data the rows also depend on, e.g. of the link resolver for appearances';
+
+
+--
+-- Name: extractions; Type: TABLE; Schema: public; Owner: imfdb
+--
+
+CREATE TABLE public.extractions (
+    extractor character varying NOT NULL,
+    sha256 character varying NOT NULL,
+    version integer NOT NULL,
+    result character varying NOT NULL,
+    extracttime timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+
+
+ALTER TABLE public.extractions OWNER TO imfdb;
+
+--
+-- Name: TABLE extractions; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON TABLE public.extractions IS 'Results of the extractors by the SHA-256 of the page content they were extracted from';
+
+
+--
+-- Name: COLUMN extractions.version; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.extractions.version IS 'Version of the extractor, results of other versions are extracted again';
+
+
+--
+-- Name: COLUMN extractions.result; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.extractions.result IS 'The result as JSON';
+
+
 --
 -- Name: firearmimages; Type: TABLE; Schema: public; Owner: imfdb
 --
@@ -76,7 +184,8 @@ COMMENT ON COLUMN public.actors.actorname IS 'Full name of the actor';
 CREATE TABLE public.firearmimages (
     firearmimageid uuid DEFAULT gen_random_uuid() NOT NULL,
     imageurl character varying NOT NULL,
-    firearmid uuid NOT NULL
+    firearmid uuid NOT NULL,
+    imageid uuid
 );
 
 
@@ -96,7 +205,8 @@ CREATE TABLE public.firearms (
     firearmtitle character varying NOT NULL,
     firearmversion character varying,
     isfamily boolean,
-    isfictional boolean DEFAULT false
+    isfictional boolean DEFAULT false,
+    firearmwikitext character varying
 );
 
 
@@ -130,6 +240,100 @@ COMMENT ON COLUMN public.firearms.isfamily IS 'This entry refers to a series or
 COMMENT ON COLUMN public.firearms.isfictional IS 'Entirely fictional or fake prop gun';
 
 
+--
+-- Name: COLUMN firearms.firearmwikitext; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.firearms.firearmwikitext IS 'The wikitext of the firearm page if it was downloaded as wikitext, in which case firearmpagecontent is NULL';
+
+
+--
+-- Name: imagefiles; Type: TABLE; Schema: public; Owner: imfdb
+--
+
+CREATE TABLE public.imagefiles (
+    imageurl character varying NOT NULL,
+    sha256 character varying NOT NULL,
+    localpath character varying NOT NULL,
+    filesize bigint NOT NULL,
+    mime character varying,
+    downloadtime timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+
+
+ALTER TABLE public.imagefiles OWNER TO imfdb;
+
+--
+-- Name: TABLE imagefiles; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON TABLE public.imagefiles IS 'Local copies of the image urls of the per-entity image tables, downloaded by the optional downloads stage';
+
+
+--
+-- Name: COLUMN imagefiles.sha256; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.imagefiles.sha256 IS 'SHA-256 of the downloaded file, which is also its address in the image store';
+
+
+--
+-- Name: COLUMN imagefiles.localpath; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.imagefiles.localpath IS 'Path of the file relative to the image store, shared by all urls with the same content';
+
+
+--
+-- Name: images; Type: TABLE; Schema: public; Owner: imfdb
+--
+
+CREATE TABLE public.images (
+    imageid uuid DEFAULT gen_random_uuid() NOT NULL,
+    sha1 character varying NOT NULL,
+    filename character varying NOT NULL,
+    imagesize integer,
+    width integer,
+    height integer,
+    mime character varying,
+    url character varying
+);
+
+
+
+
+ALTER TABLE public.images OWNER TO imfdb;
+
+--
+-- Name: TABLE images; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON TABLE public.images IS 'Every distinct image appearing on IMFDB pages, stored once per content hash';
+
+
+--
+-- Name: COLUMN images.sha1; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.images.sha1 IS 'SHA-1 of the file content as reported by the MediaWiki API';
+
+
+--
+-- Name: COLUMN images.filename; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.images.filename IS 'Wiki file name of the first file found with this content';
+
+
+--
+-- Name: COLUMN images.imagesize; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.images.imagesize IS 'File size in bytes';
+
+
 --
 -- Name: movieimages; Type: TABLE; Schema: public; Owner: imfdb
 --
@@ -137,7 +341,8 @@ COMMENT ON COLUMN public.firearms.isfictional IS 'Entirely fictional or fake pro
 CREATE TABLE public.movieimages (
     movieimageid uuid DEFAULT gen_random_uuid() NOT NULL,
     imageurl character varying NOT NULL,
-    movieid uuid NOT NULL
+    movieid uuid NOT NULL,
+    imageid uuid
 );
 
 
@@ -152,7 +357,8 @@ CREATE TABLE public.movies (
     movietitle character varying NOT NULL,
     movieurl character varying,
     moviepageid character varying NOT NULL,
-    moviepagecontent character varying
+    moviepagecontent character varying,
+    moviewikitext character varying
 );
 
 
@@ -196,6 +402,100 @@ COMMENT ON COLUMN public.movies_actors_firearms.note IS 'Any additional informat
 COMMENT ON COLUMN public.movies_actors_firearms.year IS 'Year of the appearance';
 
 
+--
+-- Name: negativelookups; Type: TABLE; Schema: public; Owner: imfdb
+--
+
+CREATE TABLE public.negativelookups (
+    lookuptable character varying NOT NULL,
+    title character varying NOT NULL,
+    reason character varying NOT NULL,
+    pageid character varying,
+    hits integer DEFAULT 0 NOT NULL,
+    lookuptime timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+
+
+ALTER TABLE public.negativelookups OWNER TO imfdb;
+
+--
+-- Name: TABLE negativelookups; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON TABLE public.negativelookups IS 'Links of appearance tables that could not be resolved, so they are not looked up again until they expire';
+
+
+--
+-- Name: COLUMN negativelookups.title; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.negativelookups.title IS 'Normalized page title of the link';
+
+
+--
+-- Name: COLUMN negativelookups.reason; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.negativelookups.reason IS 'One of ''missing'' (no such page), ''unlisted'' (the page is not in the table) or ''disambiguation'' (a disambiguation page, resolved by title and year)';
+
+
+--
+-- Name: COLUMN negativelookups.hits; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.negativelookups.hits IS 'Number of later links answered from this entry';
+
+
+--
+-- Name: COLUMN negativelookups.lookuptime; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.negativelookups.lookuptime IS 'Time of the failed lookup in UTC, the entry expires after IMFDB_NEGATIVE_TTL_DAYS';
+
+
+--
+-- Name: quarantine; Type: TABLE; Schema: public; Owner: imfdb
+--
+
+CREATE TABLE public.quarantine (
+    stage character varying NOT NULL,
+    entityid character varying NOT NULL,
+    reason character varying NOT NULL,
+    exception character varying,
+    seconds double precision,
+    memorybytes bigint,
+    attempts integer DEFAULT 1 NOT NULL,
+    quarantinetime timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+
+
+ALTER TABLE public.quarantine OWNER TO imfdb;
+
+--
+-- Name: TABLE quarantine; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON TABLE public.quarantine IS 'Pages whose extraction raised an exception or exceeded its time or memory budget, skipped by their stage until they are retried';
+
+
+--
+-- Name: COLUMN quarantine.reason; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.quarantine.reason IS 'One of ''exception'', ''time'', ''size'' or ''memory'', or ''pending'' for pages created by a retried page of an earlier stage';
+
+
+--
+-- Name: COLUMN quarantine.memorybytes; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.quarantine.memorybytes IS 'Growth of the peak memory of the process while the page was extracted';
+
+
 --
 -- Name: redirects; Type: TABLE; Schema: public; Owner: imfdb
 --
@@ -218,6 +518,94 @@ ALTER TABLE public.redirects OWNER TO imfdb;
 COMMENT ON TABLE public.redirects IS 'Keeps track of MediaWiki page redirects';
 
 
+--
+-- Name: specificationattributes; Type: TABLE; Schema: public; Owner: imfdb
+--
+
+CREATE TABLE public.specificationattributes (
+    specificationid uuid NOT NULL,
+    firearmid uuid NOT NULL,
+    capacitymin smallint,
+    capacitymax smallint,
+    productionstart smallint,
+    productionend smallint,
+    issemiautomatic boolean,
+    isfullyautomatic boolean,
+    isburst boolean,
+    issingleaction boolean,
+    isdoubleaction boolean,
+    isboltaction boolean,
+    ispumpaction boolean,
+    isleveraction boolean,
+    isbreakaction boolean
+);
+
+
+ALTER TABLE public.specificationattributes OWNER TO imfdb;
+
+--
+-- Name: TABLE specificationattributes; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON TABLE public.specificationattributes IS 'Normalized, indexed attributes derived from the free-text firearm specifications';
+
+
+--
+-- Name: COLUMN specificationattributes.capacitymin; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.specificationattributes.capacitymin IS 'Smallest number of rounds mentioned in the capacity';
+
+
+--
+-- Name: COLUMN specificationattributes.capacitymax; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.specificationattributes.capacitymax IS 'Largest number of rounds mentioned in the capacity';
+
+
+--
+-- Name: COLUMN specificationattributes.productionstart; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.specificationattributes.productionstart IS 'First year of production';
+
+
+--
+-- Name: COLUMN specificationattributes.productionend; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.specificationattributes.productionend IS 'Last year of production. NULL if still in production or unknown';
+
+
+--
+-- Name: specificationcalibers; Type: TABLE; Schema: public; Owner: imfdb
+--
+
+CREATE TABLE public.specificationcalibers (
+    specificationcaliberid uuid DEFAULT gen_random_uuid() NOT NULL,
+    specificationid uuid NOT NULL,
+    firearmid uuid NOT NULL,
+    caliber character varying NOT NULL
+);
+
+
+ALTER TABLE public.specificationcalibers OWNER TO imfdb;
+
+--
+-- Name: TABLE specificationcalibers; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON TABLE public.specificationcalibers IS 'One row per caliber listed in a firearm specification';
+
+
+--
+-- Name: COLUMN specificationcalibers.caliber; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON COLUMN public.specificationcalibers.caliber IS 'Canonical lower case caliber token. For example: ''9x19mm'', ''.45 acp'', ''12 gauge''';
+
+
 --
 -- Name: specifications; Type: TABLE; Schema: public; Owner: imfdb
 --
@@ -293,6 +681,28 @@ COMMENT ON COLUMN public.specifications.capacitylist IS 'List of capacities for
 COMMENT ON COLUMN public.specifications.firemode IS 'List of available fire modes. For example: ''semi-automatic (double action)'', ''3-round burst''';
 
 
+--
+-- Name: stageversions; Type: TABLE; Schema: public; Owner: imfdb
+--
+
+CREATE TABLE public.stageversions (
+    stage character varying NOT NULL,
+    version integer DEFAULT 1 NOT NULL,
+    committime timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+
+
+ALTER TABLE public.stageversions OWNER TO imfdb;
+
+--
+-- Name: TABLE stageversions; Type: COMMENT; Schema: public; Owner: imfdb
+--
+
+COMMENT ON TABLE public.stageversions IS 'Counts the finished runs of every pipeline stage, so readers of the database can tell when their cached results are stale';
+
+
 --
 -- Name: tvseries; Type: TABLE; Schema: public; Owner: imfdb
 --
@@ -302,7 +712,8 @@ CREATE TABLE public.tvseries (
     tvseriestitle character varying NOT NULL,
     tvseriesurl character varying,
     tvseriespageid character varying NOT NULL,
-    tvseriespagecontent character varying
+    tvseriespagecontent character varying,
+    tvserieswikitext character varying
 );
 
 
@@ -353,7 +764,8 @@ COMMENT ON COLUMN public.tvseries_actors_firearms.year IS 'Year of the appearanc
 CREATE TABLE public.tvseriesimages (
     tvseriesimageid uuid DEFAULT gen_random_uuid() NOT NULL,
     imageurl character varying NOT NULL,
-    tvseriesid uuid NOT NULL
+    tvseriesid uuid NOT NULL,
+    imageid uuid
 );
 
 
@@ -367,6 +779,30 @@ ALTER TABLE ONLY public.actors
     ADD CONSTRAINT actors_pk PRIMARY KEY (actorid);
 
 
+--
+-- Name: checkpoints checkpoints_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.checkpoints
+    ADD CONSTRAINT checkpoints_pk PRIMARY KEY (stage, entityid);
+
+
+--
+-- Name: extractedpages extractedpages_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.extractedpages
+    ADD CONSTRAINT extractedpages_pk PRIMARY KEY (extractor, pageid, sha256);
+
+
+--
+-- Name: extractions extractions_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.extractions
+    ADD CONSTRAINT extractions_pk PRIMARY KEY (extractor, sha256);
+
+
 --
 -- Name: firearmimages firearmimages_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
 --
@@ -383,6 +819,14 @@ ALTER TABLE ONLY public.firearms
     ADD CONSTRAINT firearms_pk PRIMARY KEY (firearmid);
 
 
+--
+-- Name: imagefiles imagefiles_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.imagefiles
+    ADD CONSTRAINT imagefiles_pk PRIMARY KEY (imageurl);
+
+
 --
 -- Name: actorimages images_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
 --
@@ -391,6 +835,22 @@ ALTER TABLE ONLY public.actorimages
     ADD CONSTRAINT images_pk PRIMARY KEY (actorimageid);
 
 
+--
+-- Name: images images_sha1_key; Type: CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.images
+    ADD CONSTRAINT images_sha1_key UNIQUE (sha1);
+
+
+--
+-- Name: images images_imageid_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.images
+    ADD CONSTRAINT images_imageid_pk PRIMARY KEY (imageid);
+
+
 --
 -- Name: movieimages movieimages_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
 --
@@ -415,6 +875,22 @@ ALTER TABLE ONLY public.movies
     ADD CONSTRAINT movies_pk PRIMARY KEY (movieid);
 
 
+--
+-- Name: negativelookups negativelookups_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.negativelookups
+    ADD CONSTRAINT negativelookups_pk PRIMARY KEY (lookuptable, title);
+
+
+--
+-- Name: quarantine quarantine_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.quarantine
+    ADD CONSTRAINT quarantine_pk PRIMARY KEY (stage, entityid);
+
+
 --
 -- Name: redirects redirects_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
 --
@@ -423,6 +899,22 @@ ALTER TABLE ONLY public.redirects
     ADD CONSTRAINT redirects_pk PRIMARY KEY (redirectid);
 
 
+--
+-- Name: specificationattributes specificationattributes_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.specificationattributes
+    ADD CONSTRAINT specificationattributes_pk PRIMARY KEY (specificationid);
+
+
+--
+-- Name: specificationcalibers specificationcalibers_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.specificationcalibers
+    ADD CONSTRAINT specificationcalibers_pk PRIMARY KEY (specificationcaliberid);
+
+
 --
 -- Name: specifications specifications_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
 --
@@ -431,6 +923,14 @@ ALTER TABLE ONLY public.specifications
     ADD CONSTRAINT specifications_pk PRIMARY KEY (specificationid);
 
 
+--
+-- Name: stageversions stageversions_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.stageversions
+    ADD CONSTRAINT stageversions_pk PRIMARY KEY (stage);
+
+
 --
 -- Name: tvseries_actors_firearms tvseries_actors_firearms_pk; Type: CONSTRAINT; Schema: public; Owner: imfdb
 --
@@ -455,6 +955,185 @@ ALTER TABLE ONLY public.tvseriesimages
     ADD CONSTRAINT tvseriesimages_pk PRIMARY KEY (tvseriesimageid);
 
 
+--
+-- Name: actorimages_imageid_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX actorimages_imageid_idx ON public.actorimages USING btree (imageid);
+
+
+--
+-- Name: actors_actorname_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX actors_actorname_idx ON public.actors USING btree (actorname);
+
+
+--
+-- Name: extractedpages_entityid_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX extractedpages_entityid_idx ON public.extractedpages USING btree (extractor, entityid);
+
+
+--
+-- Name: firearmimages_imageid_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX firearmimages_imageid_idx ON public.firearmimages USING btree (imageid);
+
+
+--
+-- Name: firearms_firearmtitle_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX firearms_firearmtitle_idx ON public.firearms USING btree (firearmtitle);
+
+
+--
+-- Name: imagefiles_sha256_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX imagefiles_sha256_idx ON public.imagefiles USING btree (sha256);
+
+
+--
+-- Name: movieimages_imageid_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX movieimages_imageid_idx ON public.movieimages USING btree (imageid);
+
+
+--
+-- Name: movies_actors_firearms_actorid_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX movies_actors_firearms_actorid_idx ON public.movies_actors_firearms USING btree (actorid);
+
+
+--
+-- Name: movies_actors_firearms_firearmid_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX movies_actors_firearms_firearmid_idx ON public.movies_actors_firearms USING btree (firearmid);
+
+
+--
+-- Name: movies_actors_firearms_movieid_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX movies_actors_firearms_movieid_idx ON public.movies_actors_firearms USING btree (movieid);
+
+
+--
+-- Name: movies_movietitle_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX movies_movietitle_idx ON public.movies USING btree (movietitle);
+
+
+--
+-- Name: specificationattributes_capacity_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX specificationattributes_capacity_idx ON public.specificationattributes USING btree (capacitymin, capacitymax);
+
+
+--
+-- Name: specificationattributes_firearmid_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX specificationattributes_firearmid_idx ON public.specificationattributes USING btree (firearmid);
+
+
+--
+-- Name: specificationattributes_production_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX specificationattributes_production_idx ON public.specificationattributes USING btree (productionstart, productionend);
+
+
+--
+-- Name: specificationcalibers_caliber_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX specificationcalibers_caliber_idx ON public.specificationcalibers USING btree (caliber);
+
+
+--
+-- Name: specificationcalibers_firearmid_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX specificationcalibers_firearmid_idx ON public.specificationcalibers USING btree (firearmid);
+
+
+--
+-- Name: tvseries_actors_firearms_actorid_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX tvseries_actors_firearms_actorid_idx ON public.tvseries_actors_firearms USING btree (actorid);
+
+
+--
+-- Name: tvseries_actors_firearms_firearmid_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX tvseries_actors_firearms_firearmid_idx ON public.tvseries_actors_firearms USING btree (firearmid);
+
+
+--
+-- Name: tvseries_actors_firearms_tvseriesid_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX tvseries_actors_firearms_tvseriesid_idx ON public.tvseries_actors_firearms USING btree (tvseriesid);
+
+
+--
+-- Name: tvseries_tvseriestitle_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX tvseries_tvseriestitle_idx ON public.tvseries USING btree (tvseriestitle);
+
+
+--
+-- Name: tvseriesimages_imageid_idx; Type: INDEX; Schema: public; Owner: imfdb
+--
+
+CREATE INDEX tvseriesimages_imageid_idx ON public.tvseriesimages USING btree (imageid);
+
+
+--
+-- Name: actorimages actorimages_images_fk; Type: FK CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.actorimages
+    ADD CONSTRAINT actorimages_images_fk FOREIGN KEY (imageid) REFERENCES public.images(imageid) ON DELETE SET NULL;
+
+
+--
+-- Name: firearmimages firearmimages_images_fk; Type: FK CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.firearmimages
+    ADD CONSTRAINT firearmimages_images_fk FOREIGN KEY (imageid) REFERENCES public.images(imageid) ON DELETE SET NULL;
+
+
+--
+-- Name: movieimages movieimages_images_fk; Type: FK CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.movieimages
+    ADD CONSTRAINT movieimages_images_fk FOREIGN KEY (imageid) REFERENCES public.images(imageid) ON DELETE SET NULL;
+
+
+--
+-- Name: tvseriesimages tvseriesimages_images_fk; Type: FK CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.tvseriesimages
+    ADD CONSTRAINT tvseriesimages_images_fk FOREIGN KEY (imageid) REFERENCES public.images(imageid) ON DELETE SET NULL;
+
+
 --
 -- Name: firearmimages firearmimages_fk; Type: FK CONSTRAINT; Schema: public; Owner: imfdb
 --
@@ -519,6 +1198,22 @@ ALTER TABLE ONLY public.movies_actors_firearms
     ADD CONSTRAINT movies_actors_firearms_fk_2 FOREIGN KEY (firearmid) REFERENCES public.firearms(firearmid);
 
 
+--
+-- Name: specificationattributes specificationattributes_fk; Type: FK CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.specificationattributes
+    ADD CONSTRAINT specificationattributes_fk FOREIGN KEY (specificationid) REFERENCES public.specifications(specificationid) ON UPDATE SET NULL ON DELETE CASCADE;
+
+
+--
+-- Name: specificationcalibers specificationcalibers_fk; Type: FK CONSTRAINT; Schema: public; Owner: imfdb
+--
+
+ALTER TABLE ONLY public.specificationcalibers
+    ADD CONSTRAINT specificationcalibers_fk FOREIGN KEY (specificationid) REFERENCES public.specifications(specificationid) ON UPDATE SET NULL ON DELETE CASCADE;
+
+
 --
 -- Name: specifications specifications_fk; Type: FK CONSTRAINT; Schema: public; Owner: imfdb
 --
@@ -0,0 +1,3470 @@
+# Author: Jan Zimmer
+# Last revision: 2023-04-18
+# 
+# This script is an attempt to extract data from the Internet Movie Firearms Database project, which is a MediaWiki based collaborative effort
+# to catalogue appearences of firearms in movies and television. Extracted data is stored in a PostgreSQL database server.
+#
+# The module can be imported without side effects, e.g. to use its parsers. Database connections are only opened once a
+# function needs one. Run it (or imfdb-script.py) to build the database, see main().
+#
+
+# Imports
+import psycopg2
+import psycopg2.extras
+import psycopg2.pool
+import requests
+import os
+import re
+from bs4 import BeautifulSoup
+import pandas as pd #1.20 or above required
+import time
+import sys
+import argparse
+import concurrent.futures
+import multiprocessing
+from urllib.parse import quote, unquote, urlsplit
+from urllib3.util import Retry
+import unicodedata
+import functools
+import json
+import sqlite3
+import io
+import hashlib
+from uuid import uuid4
+import html
+import logging
+import threading
+import queue
+import signal
+import traceback
+try:
+    import resource # Not available on Windows, see get_peak_memory()
+except ImportError:
+    resource = None
+
+# Logging. Diagnostics go through the 'imfdb' logger with lazy %-style arguments, so messages below the configured level
+# are discarded before they are formatted. Output looks like the old prints ('WARNING: function(): message') and can
+# additionally be written as JSON lines, see configure_logging().
+logger = logging.getLogger("imfdb")
+
+# Level of the messages that are written unless another one is given to configure_logging() or --log-level
+default_log_level = os.environ.get("IMFDB_LOG_LEVEL", "INFO")
+
+logging_dict = {
+    "level" : default_log_level,
+    "json_path" : None,
+    "rate_limits" : {} # (level, function, message template) -> {"window_start", "count", "suppressed"}
+}
+
+# Repetitive warnings are rate limited: at most log_rate_limit_burst messages with the same template from the same function
+# are written per log_rate_limit_interval seconds, the rest are counted and reported with the next message that gets through.
+log_rate_limit_burst = 10
+log_rate_limit_interval = 60
+
+class RateLimitFilter(logging.Filter):
+    def filter(self, record):
+        if record.levelno != logging.WARNING:
+            return True
+        key = (record.levelno, record.funcName, record.msg)
+        now = time.monotonic()
+        limit = logging_dict["rate_limits"].get(key)
+        if limit is None or now - limit["window_start"] >= log_rate_limit_interval:
+            suppressed = 0 if limit is None else limit["suppressed"]
+            limit = logging_dict["rate_limits"][key] = {"window_start" : now, "count" : 0, "suppressed" : 0}
+            if suppressed > 0:
+                record.msg = f"{record.msg} (%s similar messages suppressed)"
+                record.args = tuple(record.args or ()) + (suppressed,)
+        limit["count"] += 1
+        if limit["count"] > log_rate_limit_burst:
+            limit["suppressed"] += 1
+            count_metric("imfdb_log_suppressed_total", function=record.funcName)
+            return False
+        return True
+
+class JsonLogFormatter(logging.Formatter):
+    # One JSON object per line, for loading logs into other tools
+    def format(self, record):
+        entry = {
+            "time" : self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level" : record.levelname,
+            "function" : record.funcName,
+            "stage" : metrics_dict["stage"],
+            "process" : record.process,
+            "message" : record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def configure_logging(level=default_log_level, json_path=None):
+    # Sets the level of the imfdb logger and writes its messages to stderr and, if json_path is given, appended as JSON lines
+    # to that file. Worker processes of run_stages() are configured the same way.
+    logging_dict["level"] = level
+    logging_dict["json_path"] = json_path
+    logger.setLevel(level)
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(levelname)s: %(funcName)s(): %(message)s"))
+    logger.addHandler(handler)
+    if json_path is not None:
+        json_handler = logging.FileHandler(json_path, encoding="utf-8")
+        json_handler.setFormatter(JsonLogFormatter())
+        logger.addHandler(json_handler)
+
+def report_suppressed_logs():
+    # Writes how many messages were suppressed by the rate limit since they were last reported, e.g. at the end of a stage
+    for (level, function, message), limit in list(logging_dict["rate_limits"].items()):
+        if limit["suppressed"] > 0:
+            logger.log(level, "%s messages of %s() like '%s' were suppressed", limit["suppressed"], function, message)
+    logging_dict["rate_limits"].clear()
+
+logger.addFilter(RateLimitFilter())
+
+# Run metrics of this process. Counters and histograms are keyed by (name, labels) and exported to the metrics directory
+# as a JSON report and a Prometheus text file while a stage is running, see export_metrics().
+metrics_dict = {
+    "stage" : None,
+    "directory" : "metrics",
+    "counters" : {}, # (name, labels) -> value
+    "histograms" : {}, # (name, labels) -> {"buckets" : [...], "sum" : seconds, "count" : observations}
+    "gauges" : {}, # (name, labels) -> last value
+    "wall_start" : None,
+    "cpu_start" : None,
+    "last_export" : 0.0,
+    "lock" : threading.RLock() # Fetch threads record metrics too, see stream_category_pages()
+}
+
+# Upper bounds in seconds of the latency histogram buckets. Everything slower ends up in the implicit +Inf bucket.
+metrics_buckets = [0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+# Minimum number of seconds between two exports of the metrics files of a running stage
+metrics_export_interval = 15
+
+def count_metric(name, value=1, **labels):
+    # Adds value to a counter
+    key = (name, tuple(sorted(labels.items())))
+    with metrics_dict["lock"]:
+        metrics_dict["counters"][key] = metrics_dict["counters"].get(key, 0) + value
+
+def set_metric(name, value, **labels):
+    # Sets a gauge to its current value
+    key = (name, tuple(sorted(labels.items())))
+    with metrics_dict["lock"]:
+        metrics_dict["gauges"][key] = value
+
+def observe_metric(name, seconds, **labels):
+    # Records a duration in a latency histogram
+    key = (name, tuple(sorted(labels.items())))
+    with metrics_dict["lock"]:
+        histogram = metrics_dict["histograms"].get(key)
+        if histogram is None:
+            histogram = metrics_dict["histograms"][key] = {"buckets" : [0] * len(metrics_buckets), "sum" : 0.0, "count" : 0}
+        for i, bound in enumerate(metrics_buckets):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+                break
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+    if metrics_dict["stage"] is not None and time.time() - metrics_dict["last_export"] > metrics_export_interval:
+        export_metrics()
+
+def record_timing(name, **labels):
+    # Decorator recording the runtime of every call of a function in the histogram name
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                observe_metric(name, time.perf_counter() - start, function=function.__name__, **labels)
+        return wrapper
+    return decorator
+
+def format_metric_key(name, labels):
+    # Formats a metric key the way Prometheus does, e.g. 'imfdb_http_requests_total{endpoint="api"}'
+    if len(labels) == 0:
+        return name
+    return name + "{" + ",".join(f'{label}="{value}"' for label, value in labels) + "}"
+
+def start_metrics(stage, directory):
+    # Resets the metrics of this process for a stage that is about to run
+    metrics_dict["stage"] = stage
+    metrics_dict["directory"] = directory
+    metrics_dict["counters"] = {}
+    metrics_dict["histograms"] = {}
+    metrics_dict["gauges"] = {}
+    metrics_dict["wall_start"] = time.time()
+    metrics_dict["cpu_start"] = time.process_time()
+    metrics_dict["last_export"] = 0.0
+
+def get_metrics_report(running=True):
+    # Returns the metrics of the current stage as a JSON serializable dict
+    buckets = [str(bound) for bound in metrics_buckets]
+    return {
+        "stage" : metrics_dict["stage"],
+        "running" : running,
+        "wall_seconds" : time.time() - metrics_dict["wall_start"],
+        "cpu_seconds" : time.process_time() - metrics_dict["cpu_start"],
+        "counters" : {format_metric_key(name, labels) : value for (name, labels), value in metrics_dict["counters"].items()},
+        "gauges" : {format_metric_key(name, labels) : value for (name, labels), value in metrics_dict["gauges"].items()},
+        "histograms" : {format_metric_key(name, labels) : {"buckets" : dict(zip(buckets, histogram["buckets"])), "sum" : histogram["sum"], "count" : histogram["count"]}
+                        for (name, labels), histogram in metrics_dict["histograms"].items()}
+    }
+
+def write_file_atomically(path, content):
+    # Readers such as the Prometheus node exporter must never see a half written file
+    with open(f"{path}.tmp", "w") as file:
+        file.write(content)
+    os.replace(f"{path}.tmp", path)
+
+def export_metrics(running=True):
+    # Writes the metrics of the current stage to <directory>/<stage>.json and <directory>/<stage>.prom.
+    # The .prom files follow the Prometheus text format and can be picked up by the node exporter's textfile collector.
+    with metrics_dict["lock"]:
+        metrics_dict["last_export"] = time.time()
+        stage = metrics_dict["stage"]
+        report = get_metrics_report(running)
+        os.makedirs(metrics_dict["directory"], exist_ok=True)
+        write_file_atomically(os.path.join(metrics_dict["directory"], f"{stage}.json"), json.dumps(report, indent=2))
+
+        lines = []
+        stage_label = (("stage", stage),)
+        for gauge, value in [("imfdb_stage_running", int(running)), ("imfdb_stage_wall_seconds", report["wall_seconds"]), ("imfdb_stage_cpu_seconds", report["cpu_seconds"])]:
+            lines.append(f"# TYPE {gauge} gauge")
+            lines.append(f"{format_metric_key(gauge, stage_label)} {value}")
+        for (name, labels), value in sorted(metrics_dict["counters"].items()):
+            if f"# TYPE {name} counter" not in lines:
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{format_metric_key(name, stage_label + labels)} {value}")
+        for (name, labels), value in sorted(metrics_dict["gauges"].items()):
+            if f"# TYPE {name} gauge" not in lines:
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{format_metric_key(name, stage_label + labels)} {value}")
+        for (name, labels), histogram in sorted(metrics_dict["histograms"].items()):
+            if f"# TYPE {name} histogram" not in lines:
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(metrics_buckets, histogram["buckets"]):
+                cumulative += count
+                lines.append(f"{format_metric_key(name + '_bucket', stage_label + labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{format_metric_key(name + '_bucket', stage_label + labels + (('le', '+Inf'),))} {histogram['count']}")
+            lines.append(f"{format_metric_key(name + '_sum', stage_label + labels)} {histogram['sum']}")
+            lines.append(f"{format_metric_key(name + '_count', stage_label + labels)} {histogram['count']}")
+        write_file_atomically(os.path.join(metrics_dict["directory"], f"{stage}.prom"), "\n".join(lines) + "\n")
+        return report
+
+def record_statement_metrics(query, seconds, rowcount):
+    # Records count, latency and written rows of a statement, see MetricsCursor and SQLiteCursor
+    if isinstance(query, bytes):
+        query = query.decode(errors="replace")
+    words = str(query).split(None, 1)
+    verb = words[0].upper() if len(words) > 0 else "OTHER"
+    observe_metric("imfdb_sql_statement_seconds", seconds, statement=verb)
+    count_metric("imfdb_sql_statements_total", statement=verb)
+    if verb in ("INSERT", "UPDATE", "DELETE", "COPY") and rowcount > 0:
+        count_metric("imfdb_sql_rows_written_total", rowcount, statement=verb)
+        writer_dict["local"].written = True # See commit_writes()
+
+class MetricsCursor(psycopg2.extensions.cursor):
+    # Cursor recording count, latency and written rows of every statement, so every call site of cursor.execute is covered
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_statement_metrics(query, time.perf_counter() - start, self.rowcount)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_statement_metrics(query, time.perf_counter() - start, self.rowcount)
+
+def http_get(url, endpoint):
+    # GET request recording count, latency, status and bytes received per endpoint ('api', 'index', 'page')
+    start = time.perf_counter()
+    response = requests.get(url)
+    observe_metric("imfdb_http_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+    count_metric("imfdb_http_requests_total", endpoint=endpoint, status=response.status_code)
+    count_metric("imfdb_http_received_bytes_total", len(response.content), endpoint=endpoint)
+    return response
+
+# Where requests are sent. Can be pointed at a mock of the wiki, e.g. the one in benchmark/mock_mediawiki.py
+imfdb_url = os.environ.get("IMFDB_URL", "https://www.imfdb.org").rstrip("/")
+
+# Database connections are opened lazily, on first use, from a pool shared by all threads of a process. Each thread checks
+# out its own connection and cursor, so importing this module has no side effects and threads never share a transaction.
+# The pool is configured with the PG_IMFDB_* environment variables, PG_IMFDB_POOL_SIZE caps the connections per process.
+# If IMFDB_SQLITE_PATH (or --sqlite) names a file, an embedded SQLite database is used instead, see open_sqlite_connection().
+# PG_IMFDB_SCHEMA makes the connections use another schema than public, which is how shadow builds are written.
+database_dict = {
+    "pool" : None,
+    "lock" : threading.Lock(),
+    "local" : threading.local(),
+    "sqlite_path" : os.environ.get("IMFDB_SQLITE_PATH"),
+    "schema" : os.environ.get("PG_IMFDB_SCHEMA")
+}
+
+def get_connection_pool():
+    with database_dict["lock"]:
+        if database_dict["pool"] is None:
+            database_dict["pool"] = psycopg2.pool.ThreadedConnectionPool(
+                1,
+                int(os.environ.get("PG_IMFDB_POOL_SIZE", "8")),
+                host=os.environ.get("PG_IMFDB_HOST", "localhost"),
+                user=os.environ.get("PG_IMFDB_USER", "imfdb"),
+                password=os.environ.get("PG_IMFDB_PASSWORD"),
+                database=os.environ.get("PG_IMFDB_DATABASE", "imfdb"),
+                options=f"-c search_path={database_dict['schema']}" if database_dict["schema"] else None,
+                cursor_factory=MetricsCursor
+            )
+        return database_dict["pool"]
+
+def use_sqlite(path):
+    # Switches this process to the SQLite database at path (None switches back to PostgreSQL). Open connections are closed.
+    close_connections()
+    database_dict["sqlite_path"] = path
+
+def use_schema(schema):
+    # Switches the PostgreSQL connections of this process to schema (None switches back to the default search path)
+    close_connections()
+    database_dict["schema"] = schema
+
+def is_sqlite():
+    return database_dict["sqlite_path"] is not None
+
+def get_connection():
+    # Returns the connection of the calling thread, checking one out of the pool if it has none yet
+    local = database_dict["local"]
+    if getattr(local, "connection", None) is None:
+        if is_sqlite():
+            local.connection = open_sqlite_connection(database_dict["sqlite_path"])
+            local.cursor = SQLiteCursor(local.connection)
+        else:
+            local.connection = get_connection_pool().getconn()
+            local.cursor = local.connection.cursor()
+    return local.connection
+
+def get_cursor():
+    get_connection()
+    return database_dict["local"].cursor
+
+def release_connection():
+    # Returns the connection of the calling thread to the pool. Uncommitted changes are rolled back by the pool.
+    local = database_dict["local"]
+    if getattr(local, "connection", None) is not None:
+        local.cursor.close()
+        if isinstance(local.connection, sqlite3.Connection):
+            local.connection.rollback()
+            local.connection.close()
+        else:
+            get_connection_pool().putconn(local.connection)
+        local.connection = None
+        local.cursor = None
+
+def close_connections():
+    # Closes every connection of this process, e.g. before it exits. SQLite connections of other threads are closed when
+    # those threads end.
+    stop_writer()
+    release_connection()
+    with database_dict["lock"]:
+        if database_dict["pool"] is not None:
+            database_dict["pool"].closeall()
+            database_dict["pool"] = None
+    database_dict["local"] = threading.local()
+
+class ThreadLocalProxy:
+    # Forwards attribute access to the object returned by getter for the calling thread, see cnx and cursor below
+    def __init__(self, getter):
+        self._getter = getter
+
+    def __getattr__(self, name):
+        return getattr(self._getter(), name)
+
+# The connection and cursor of the calling thread. Functions use these like plain globals, the connection is opened on first use.
+cnx = ThreadLocalProxy(get_connection)
+cursor = ThreadLocalProxy(get_cursor)
+
+# SQLite backend. The schema is translated from db/imfdb_structure.sql, so both backends always have the same tables,
+# keys and indexes. Statements are written for PostgreSQL and translated by SQLiteCursor, which only has to deal with the
+# few differences the script runs into (placeholders, temporary tables). The database runs in WAL mode, so readers are
+# never blocked and several worker processes can share the file, waiting for each other's write transactions.
+sqlite_structure_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db", "imfdb_structure.sql")
+
+# Column types of the PostgreSQL schema and what they become in SQLite. Booleans are stored as 0 and 1.
+sqlite_types_dict = {
+    "uuid" : "TEXT",
+    "character varying" : "TEXT",
+    "timestamp without time zone" : "TEXT",
+    "boolean" : "INTEGER",
+    "smallint" : "INTEGER",
+    "integer" : "INTEGER",
+    "bigint" : "INTEGER",
+    "double precision" : "REAL"
+}
+
+# Column defaults calling PostgreSQL functions. SQLite has no uuid generator, so a version 4 uuid is built from random bytes.
+sqlite_defaults_dict = {
+    "gen_random_uuid()" : "(lower(hex(randomblob(4))) || '-' || lower(hex(randomblob(2))) || '-4' || substr(lower(hex(randomblob(2))), 2) || '-' || "
+                          "substr('89ab', 1 + abs(random()) % 4, 1) || substr(lower(hex(randomblob(2))), 2) || '-' || lower(hex(randomblob(6))))",
+    "now()" : "CURRENT_TIMESTAMP"
+}
+
+@functools.lru_cache(maxsize=None)
+def get_sqlite_schema(path=sqlite_structure_path):
+    # Translates the tables, constraints and indexes of a pg_dump schema file into SQLite statements. Constraints are added
+    # by ALTER TABLE in the dump, which SQLite doesn't support, so they are folded into the CREATE TABLE statements.
+    with open(path, encoding="utf-8") as file:
+        dump = re.sub(r"^--.*$", "", file.read(), flags=re.M)
+    tables = {}
+    indexes = []
+    for statement in dump.split(";\n"):
+        statement = " ".join(statement.split()).replace("public.", "")
+        match = re.match(r"^CREATE TABLE (\w+) \((.*)\)$", statement)
+        if match is not None:
+            columns = []
+            for column in match.group(2).split(", "):
+                column = column.strip()
+                for column_type, sqlite_type in sqlite_types_dict.items():
+                    column = re.sub(fr"^(\S+) {column_type}\b", fr"\1 {sqlite_type}", column)
+                for default, sqlite_default in sqlite_defaults_dict.items():
+                    column = column.replace(f"DEFAULT {default}", f"DEFAULT {sqlite_default}")
+                columns.append(column)
+            tables[match.group(1)] = columns
+            continue
+        match = re.match(r"^ALTER TABLE ONLY (\w+) ADD (CONSTRAINT .*)$", statement)
+        if match is not None:
+            tables[match.group(1)].append(match.group(2))
+            continue
+        match = re.match(r"^CREATE (UNIQUE )?INDEX (\w+) ON (\w+) USING btree (\(.*\))$", statement)
+        if match is not None:
+            indexes.append(f"CREATE {match.group(1) or ''}INDEX IF NOT EXISTS {match.group(2)} ON {match.group(3)} {match.group(4)}")
+    statements = [f"CREATE TABLE IF NOT EXISTS {table} (\n    " + ",\n    ".join(columns) + "\n)" for table, columns in tables.items()]
+    return ";\n".join(statements + indexes) + ";\n"
+
+def open_sqlite_connection(path):
+    # Opens the SQLite database at path, creating it and its tables if necessary
+    connection = sqlite3.connect(path, timeout=600, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL") # WAL stays consistent on a crash, only the last commits may be lost
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.execute("PRAGMA cache_size = -65536") # 64MB
+    connection.executescript(get_sqlite_schema())
+    return connection
+
+class SQLiteCursor:
+    # Cursor for SQLite connections behaving like the psycopg2 cursors the script was written for: it takes %s placeholders,
+    # records the same metrics as MetricsCursor and knows the number of rows of a SELECT before they are fetched.
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = connection.cursor()
+        self._rows = None
+        self.rowcount = -1
+
+    def translate(self, query, vars):
+        # Like psycopg2, placeholders are only replaced if there are parameters
+        if vars is not None:
+            query = re.sub(r"%([s%])", lambda match: "?" if match.group(1) == "s" else "%", query)
+        return query.replace(" ON COMMIT DROP", "")
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            self._cursor.execute(self.translate(query, vars), vars or ())
+            if self._cursor.description is not None: # SELECT or RETURNING, fetch now so rowcount is known
+                self._rows = self._cursor.fetchall()
+                self.rowcount = len(self._rows)
+            else:
+                self._rows = None
+                self.rowcount = self._cursor.rowcount
+        finally:
+            record_statement_metrics(query, time.perf_counter() - start, self.rowcount)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            self._cursor.executemany(self.translate(query, ()), vars_list)
+            self._rows = None
+            self.rowcount = self._cursor.rowcount
+        finally:
+            record_statement_metrics(query, time.perf_counter() - start, self.rowcount)
+
+    def fetchone(self):
+        if not self._rows:
+            return None
+        return self._rows.pop(0)
+
+    def fetchall(self):
+        rows = self._rows or []
+        self._rows = []
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+def execute_values(statement, rows, page_size=1000):
+    # Runs an INSERT with a single %s in place of its VALUES list for many rows, in pages of page_size rows per statement
+    if len(rows) == 0:
+        return
+    if not is_sqlite():
+        psycopg2.extras.execute_values(get_cursor(), statement, rows, page_size=page_size)
+        return
+    statement = statement.replace("%s", "(" + ", ".join(["%s"] * len(rows[0])) + ")")
+    get_cursor().executemany(statement, rows)
+
+# Background writer (PostgreSQL). Rows that aren't read back by the stage writing them (skeleton pages, redirects,
+# appearances, image urls, checkpoints, extraction records) are queued with queue_write() and handed to a writer thread
+# with a connection of its own once the stage commits, see commit_writes(). The writer groups them into transactions of up
+# to max_rows rows or max_seconds, so fetching and parsing never wait for a commit and its cost is spread over many rows.
+# The writes queued between two commits always end up in the same transaction, e.g. a page with its checkpoint.
+# SQLite has a single write lock, which a second writing connection would compete with for every page savepoint, so there
+# queued writes run right away on the connection of the calling thread.
+writer_dict = {
+    "queue_size" : int(os.environ.get("IMFDB_WRITER_QUEUE_SIZE", "256")), # Groups of writes waiting for the writer
+    "max_rows" : int(os.environ.get("IMFDB_WRITER_ROWS", "2000")),
+    "max_seconds" : float(os.environ.get("IMFDB_WRITER_SECONDS", "2")),
+    "queue" : None,
+    "thread" : None,
+    "error" : None,
+    "lock" : threading.Lock(),
+    "local" : threading.local() # Writes of the calling thread that haven't been handed to the writer yet, and whether it
+                                # wrote rows itself since its last commit_writes()
+}
+
+def get_pending_writes():
+    local = writer_dict["local"]
+    if getattr(local, "writes", None) is None:
+        local.writes = []
+    return local.writes
+
+def queue_write(statement, parameters):
+    # Queues a statement that doesn't return anything, to be written by the writer after the next commit_writes()
+    if is_sqlite():
+        cursor.execute(statement, parameters)
+        return
+    get_pending_writes().append((statement, parameters))
+
+def discard_writes(count):
+    # Drops the writes queued after the first count ones, e.g. those of a page that was rolled back
+    del get_pending_writes()[count:]
+
+@functools.lru_cache(maxsize=None)
+def get_copy_statement(statement):
+    # Returns (table, COPY statement) loading the rows of a plain 'INSERT INTO table (columns) VALUES (%s, ...)', None for
+    # any other statement
+    match = re.fullmatch(r"\s*INSERT INTO (\w+) \(([^()]*)\) VALUES \((?:%s, )*%s\)\s*", statement)
+    if match is None:
+        return None
+    return match.group(1), f"COPY {match.group(1)} ({match.group(2)}) FROM STDIN"
+
+def format_copy_value(value):
+    # A value in COPY's text format
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+def copy_rows(statement, rows):
+    start = time.perf_counter()
+    data = "".join("\t".join(format_copy_value(value) for value in row) + "\n" for row in rows)
+    cursor.copy_expert(statement, io.StringIO(data))
+    record_statement_metrics(statement, time.perf_counter() - start, len(rows))
+
+def run_writer(writes):
+    # Thread function of the writer. Groups are executed in the order they were queued and committed together until the
+    # transaction has max_rows rows or is max_seconds old. None stops the writer, an Event is set once all groups queued
+    # before it are committed. After an error, groups are dropped until the writer is stopped.
+    # During bulk loads, plain inserts are collected per statement and loaded with one COPY each before the commit. Other
+    # statements still run in order with them: the collected rows of their table are loaded first, and all collected rows
+    # if they might read other tables. Every foreign key involving the bulk tables is dropped, so tables load in any order.
+    rows = 0
+    deadline = None
+    copies = {} # (table, COPY statement) -> rows
+
+    def copy(table=None):
+        for key in [key for key in copies if table is None or key[0] == table]:
+            copy_rows(key[1], copies.pop(key))
+
+    def commit():
+        copy()
+        start = time.perf_counter()
+        cnx.commit()
+        observe_metric("imfdb_writer_commit_seconds", time.perf_counter() - start)
+        count_metric("imfdb_writer_commits_total")
+        count_metric("imfdb_writer_rows_total", rows)
+
+    def execute(statement, parameters):
+        copy_statement = get_copy_statement(statement) if bulk_load_dict["active"] else None
+        if copy_statement is not None:
+            copies.setdefault(copy_statement, []).append(parameters)
+            return
+        target = re.match(r"\s*(?:INSERT INTO|DELETE FROM|UPDATE) (\w+)", statement)
+        if target is None or re.search(r"\bSELECT\b", statement, flags=re.IGNORECASE):
+            copy()
+        else:
+            copy(target.group(1))
+        cursor.execute(statement, parameters)
+
+    def fail(exception):
+        logger.error("The database writer failed: %r", exception)
+        writer_dict["error"] = exception
+        copies.clear()
+        cnx.rollback()
+
+    try:
+        while True:
+            try:
+                item = writes.get(timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = "commit"
+            if item is None or isinstance(item, threading.Event) or item == "commit":
+                if rows > 0 and writer_dict["error"] is None:
+                    try:
+                        commit()
+                    except Exception as exception:
+                        fail(exception)
+                rows = 0
+                deadline = None
+                if item is None:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+                continue
+            if writer_dict["error"] is not None:
+                continue
+            try:
+                for statement, parameters in item:
+                    execute(statement, parameters)
+                rows += len(item)
+                if deadline is None:
+                    deadline = time.monotonic() + writer_dict["max_seconds"]
+                if rows >= writer_dict["max_rows"]:
+                    commit()
+                    rows = 0
+                    deadline = None
+            except Exception as exception:
+                fail(exception)
+    finally:
+        release_connection()
+
+def start_writer():
+    with writer_dict["lock"]:
+        if writer_dict["thread"] is None:
+            writer_dict["error"] = None
+            writer_dict["queue"] = queue.Queue(maxsize=writer_dict["queue_size"])
+            writer_dict["thread"] = threading.Thread(target=run_writer, args=(writer_dict["queue"],), name="writer", daemon=True)
+            writer_dict["thread"].start()
+        return writer_dict["queue"]
+
+def raise_writer_error():
+    if writer_dict["error"] is not None:
+        raise RuntimeError("The database writer failed, its queued writes were lost") from writer_dict["error"]
+
+def commit_writes():
+    # Commits the connection of the calling thread and hands its queued writes to the writer, in this order so that they
+    # may refer to the rows just committed. Blocks only while the writer's queue is full.
+    # If rows were written since the last call, the version of the running stage is counted up with the queued writes, so
+    # readers of the database (see imfdb_queries.py) notice the change while the stage is still running. On PostgreSQL the
+    # writer commits it along with or right after the rows, and only the writer updates the row of a running stage.
+    local = writer_dict["local"]
+    if metrics_dict["stage"] is not None and (getattr(local, "written", False) or len(get_pending_writes()) > 0):
+        queue_write(stage_version_statement, (metrics_dict["stage"],))
+    local.written = False
+    cnx.commit()
+    writes = get_pending_writes()
+    if len(writes) == 0:
+        return
+    raise_writer_error()
+    writes_queue = start_writer()
+    if writes_queue.full():
+        count_metric("imfdb_writer_backpressure_total")
+    writes_queue.put(list(writes))
+    writes.clear()
+    set_metric("imfdb_writer_queue_depth", writes_queue.qsize())
+
+def flush_writes():
+    # Barrier: commits like commit_writes() and waits until the writer has committed everything queued so far, e.g. at the
+    # end of a stage or before reading rows that were queued
+    commit_writes()
+    if writer_dict["thread"] is not None:
+        barrier = threading.Event()
+        writer_dict["queue"].put(barrier)
+        barrier.wait()
+        set_metric("imfdb_writer_queue_depth", writer_dict["queue"].qsize())
+    raise_writer_error()
+
+def stop_writer():
+    # Stops the writer after it has committed the writes queued so far. Writes that were never committed are dropped.
+    with writer_dict["lock"]:
+        thread = writer_dict["thread"]
+        writer_dict["thread"] = None
+    if thread is not None:
+        writer_dict["queue"].put(None)
+        thread.join()
+    get_pending_writes().clear()
+
+def api_request(url):
+    # Makes a get request to the specified API endpoint. A JSON response is expected.
+
+    # Make a GET request to the IMFDB API endpoint
+    response = http_get(url, "api")
+
+    # Check if the request was successful
+    if response.status_code == 200:
+        # Get the JSON data from the response
+        return response.json()
+    else:
+        # Handle the error
+        logger.error("Request failed with status code: %s", response.status_code)
+        return None
+    
+def parse_page_by_id(pageid, prop, format):
+    # Example: parse_page_by_id("215875","text", "json") to parse the wiki text of Weird Al Yankovic as json
+
+    data = api_request(f"{imfdb_url}/api.php?action=parse&pageid={pageid}&prop={prop}&format={format}")
+
+    # Error Handling
+    if data is None:
+        logger.error("Data is None!")
+        return None
+    
+    return data
+
+def get_page_id_by_url(url, format):
+    # url must take the form of '/wiki/Elke_Sommer'
+    if url is None:
+        logger.error("url was None!")
+        return None
+    title = None
+    match = re.match(r"^(\/wiki\/)(.*)$", url)
+    if match:
+        title = match.group(2)
+        if "#" in title: # HTML anchors need to be stripped
+            title = title.split("#")[0].strip()
+
+    if title is None:
+        logger.error("No title could be found for url '%s'!", url)
+        return None
+    data = api_request(f"{imfdb_url}/api.php?action=query&titles={title}&format={format}")
+    if data is None:
+        logger.error("Data is None for url '%s'!", url)
+        return None
+    if (len(data["query"]["pages"]) > 1):
+        logger.error("More than one page was returned for '%s'!", url)
+        return None
+    for value in data["query"]["pages"]:
+        pageid = value
+    return pageid
+
+def get_page_text_by_id(pageid):
+    # This used to be an API call, but due to issues with the HTML the API responds with (which doesn't match the actual page structure),
+    # we are now receiving it by GET request.
+    #    data = parse_page_by_id(pageid, "text", "json")
+    #    return str(data["parse"]["text"]["*"])
+    if page_source_dict["mode"] == "wikitext":
+        title, wikitext = get_wikitext_by_ids([pageid]).get(str(pageid), ("", ""))
+        return render_wikitext(title, wikitext)
+    response = http_get(f"{imfdb_url}/index.php?curid={pageid}", "index")
+    return str(response.text)
+
+def get_page_sources_by_ids(pageids):
+    # Returns the (html, wikitext) of several pages in the order of pageids, one of them None depending on the page source.
+    # Html takes one request per page, wikitext one per batch.
+    if page_source_dict["mode"] != "wikitext":
+        return [(get_page_text_by_id(pageid), None) for pageid in pageids]
+    pages = get_wikitext_by_ids(pageids)
+    sources = []
+    for pageid in pageids:
+        title, wikitext = pages.get(str(pageid), (None, None))
+        if wikitext is None:
+            logger.warning("No wikitext was returned for page %s!", pageid)
+        sources.append((None, wikitext or ""))
+    return sources
+
+def get_page_html(title, html_content, wikitext):
+    # The html the extraction reads of a stored page: its html or, for a page downloaded as wikitext, the rendering of it
+    if html_content is None and wikitext is not None:
+        return render_wikitext(title or "", wikitext)
+    return html_content
+
+# Pages are downloaded either as the full html of index.php ('html') or as their wikitext ('wikitext'), which is a
+# fraction of the size and comes 50 pages per request. Wikitext is stored as it is, in the wikitext column next to the
+# empty html column, and rendered into the html the extraction reads whenever a stage reads the page, see get_page_html().
+# Every later stage works on either, and a fix to render_wikitext() applies to stored pages without downloading them again.
+page_source_dict = {
+    "mode" : os.environ.get("IMFDB_SOURCE", "html"),
+    "batch_size" : 50 # Pages per revisions request, the API limit
+}
+
+def get_wikitext_by_ids(pageids):
+    # Returns a dict mapping each page id to its (title, wikitext), 50 pages per request. Missing pages are left out.
+    pages = {}
+    for i in range(0, len(pageids), page_source_dict["batch_size"]):
+        batch = [str(pageid) for pageid in pageids[i:i + page_source_dict["batch_size"]]]
+        data = api_request(f"{imfdb_url}/api.php?action=query&prop=revisions&rvprop=content&rvslots=main&pageids={'|'.join(batch)}&format=json")
+        if data is None:
+            logger.error("Data is None for batch starting with page %s!", batch[0])
+            continue
+        for pageid, page in data["query"]["pages"].items():
+            if "revisions" not in page:
+                continue
+            revision = page["revisions"][0]
+            content = revision["slots"]["main"]["*"] if "slots" in revision else revision["*"] # Older MediaWiki has no slots
+            pages[str(pageid)] = (page["title"], content)
+    return pages
+
+# Inline markup of wikitext that is rendered, in the order it is applied. Comments, references, categories, magic words
+# and the templates the extraction doesn't read are dropped beforehand by strip_wikitext().
+wikitext_inline_dict = {
+    "external_link" : (re.compile(r"\[(?:https?:)?//[^\s\]]+ ([^\]]*)\]"), r"\1"),
+    "bare_external_link" : (re.compile(r"\[((?:https?:)?//[^\s\]]+)\]"), r"\1"),
+    "bold_italic" : (re.compile(r"'''''(.+?)'''''"), r"<b><i>\1</i></b>"),
+    "bold" : (re.compile(r"'''(.+?)'''"), r"<b>\1</b>"),
+    "italic" : (re.compile(r"''(.+?)''"), r"<i>\1</i>")
+}
+
+wikitext_link_regex = re.compile(r"\[\[([^\[\]|]*)(?:\|([^\[\]]*))?\]\]([a-z]*)")
+wikitext_heading_regex = re.compile(r"^(={1,6})\s*(.+?)\s*\1$")
+
+def get_wiki_image_path(filename, width=None):
+    # The path MediaWiki serves a file or one of its thumbnails under, e.g. '/images/thumb/4/4b/Foo.jpg/600px-Foo.jpg'
+    name = filename.replace(" ", "_")
+    digest = hashlib.md5(name.encode()).hexdigest()
+    if width is None:
+        return f"/images/{digest[0]}/{digest[:2]}/{quote(name)}"
+    return f"/images/thumb/{digest[0]}/{digest[:2]}/{quote(name)}/{width}px-{quote(name)}"
+
+def render_wikitext_link(match):
+    # Renders a [[Title|text]] link like MediaWiki: pages as '/wiki/Title' hrefs, files as images, categories not at all
+    target, text, trail = match.group(1).strip(), match.group(2), match.group(3)
+    namespace = target.split(":", 1)[0].strip().lower() if ":" in target else None
+    if namespace in ("file", "image"):
+        filename = normalize_wiki_title(target.split(":", 1)[1])
+        if filename is None:
+            return ""
+        width = re.search(r"\|\s*(\d+)(?:x\d+)?px\s*(?=\||$)", "|" + (text or ""))
+        return f'<div class="thumb"><img src="{get_wiki_image_path(filename, width.group(1) if width else None)}"/></div>'
+    if namespace == "category":
+        return ""
+    title = normalize_wiki_title(target.lstrip(":"))
+    if title is None:
+        return (text or "") + trail
+    if text is None or text.strip() == "":
+        text = target.lstrip(":")
+    return f'<a href="/wiki/{quote(title.replace(" ", "_"))}" title="{html.escape(title)}">{text}{trail}</a>'
+
+def render_wikitext_inline(text):
+    # Renders the links and formatting of a line. Links are replaced innermost first, so image captions may contain links.
+    while True:
+        rendered = wikitext_link_regex.sub(render_wikitext_link, text)
+        if rendered == text:
+            break
+        text = rendered
+    for regex, replacement in wikitext_inline_dict.values():
+        text = regex.sub(replacement, text)
+    return text.strip()
+
+# Templates that wrap text, by their lower case name, with the number of leading positional parameters that are kept, so
+# that e.g. the caliber in '{{nowrap|.45 ACP}}' or the length in '{{convert|9|mm|in}}' survives. Other templates are dropped.
+wikitext_templates_dict = {
+    "nowrap" : 1,
+    "nobr" : 1,
+    "small" : 1,
+    "sic" : 1,
+    "abbr" : 1,
+    "convert" : 2
+}
+
+# Named template parameters holding a specification, e.g. '{{Gun spec|production=1911 - Present|caliber=.45 ACP}}', with
+# the label of the spec list item they are rendered as. 'Production' becomes the line of years above the list.
+wikitext_spec_fields_dict = {
+    "production" : "Production",
+    "type" : "Type",
+    "caliber" : "Caliber",
+    "calibre" : "Caliber",
+    "cartridge" : "Caliber",
+    "capacity" : "Capacity",
+    "feed system" : "Feed System",
+    "feed" : "Feed System",
+    "fire modes" : "Fire Modes",
+    "fire mode" : "Fire Modes",
+    "firemodes" : "Fire Modes"
+}
+
+def render_wikitext_template(match):
+    # Renders a template without nested ones: text templates as their text, templates with specification parameters as the
+    # production years and spec list of the Specifications section they are used in, everything else as nothing
+    parameters = [parameter.strip() for parameter in re.split(r"\|(?![^\[]*\]\])", match.group(1))] # Bars in links don't split
+    name = " ".join(parameters.pop(0).replace("_", " ").lower().split())
+    if name in wikitext_templates_dict:
+        return " ".join([parameter for parameter in parameters if "=" not in parameter][:wikitext_templates_dict[name]])
+    production = []
+    items = []
+    for parameter in parameters:
+        key, separator, value = parameter.partition("=")
+        label = wikitext_spec_fields_dict.get(" ".join(key.replace("_", " ").lower().split()))
+        value = value.strip()
+        if separator == "" or label is None or value == "":
+            continue
+        if label == "Production":
+            production = [value if value.startswith("(") else f"({value})", ""]
+        else:
+            items.append(f"* '''{label}:''' {value}")
+    if len(items) == 0:
+        return ""
+    return "\n" + "\n".join(production + items) + "\n"
+
+def strip_wikitext(wikitext):
+    # Removes what the extraction doesn't read: comments, references, magic words and templates (innermost first), except
+    # for the ones render_wikitext_template() renders
+    wikitext = re.sub(r"<!--.*?-->", "", wikitext, flags=re.DOTALL)
+    wikitext = re.sub(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", "", wikitext, flags=re.DOTALL | re.IGNORECASE)
+    while True:
+        stripped = re.sub(r"\{\{([^{}]*)\}\}", render_wikitext_template, wikitext)
+        if stripped == wikitext:
+            break
+        wikitext = stripped
+    return re.sub(r"__[A-Z]+__", "", wikitext)
+
+def get_wikitext_anchor(heading, anchors):
+    # The id MediaWiki gives a heading, with a suffix like '_2' if an earlier heading has the same one
+    anchor = re.sub(r"<[^>]+>", "", heading).strip().replace(" ", "_")
+    if anchor in anchors:
+        number = 2
+        while f"{anchor}_{number}" in anchors:
+            number += 1
+        anchor = f"{anchor}_{number}"
+    anchors.add(anchor)
+    return anchor
+
+def split_wikitext_cells(line, separator):
+    # Splits a table row like '| a || b' into its cells. A cell may start with attributes, as in '| rowspan="2" | a',
+    # of which only rowspan and colspan are kept.
+    cells = []
+    for cell in line[1:].split(separator * 2):
+        attributes = ""
+        parts = re.split(r"\|(?![^\[]*\]\])", cell, maxsplit=1) # A single bar outside of links ends the attributes
+        if len(parts) == 2 and "[[" not in parts[0]:
+            attributes = " ".join(re.findall(r'(?:rowspan|colspan)\s*=\s*"?\d+"?', parts[0]))
+            cell = parts[1]
+        cells.append((attributes, cell))
+    return cells
+
+def render_wikitext_table(lines):
+    # Renders the lines of a {| ... |} table. Rows are separated by '|-', cells start with '!' (headers) or '|'.
+    rows = [[]]
+    for line in lines[1:]:
+        if line.startswith("|-") or line.startswith("|+"):
+            if len(rows[-1]) > 0:
+                rows.append([])
+        elif line.startswith("!"):
+            rows[-1].extend(("th", attributes, cell) for attributes, cell in split_wikitext_cells(line, "!"))
+        elif line.startswith("|"):
+            rows[-1].extend(("td", attributes, cell) for attributes, cell in split_wikitext_cells(line, "|"))
+        elif len(rows[-1]) > 0: # A cell continued on the next line
+            tag, attributes, cell = rows[-1][-1]
+            rows[-1][-1] = (tag, attributes, f"{cell}<br/>{line}")
+    html_rows = []
+    for row in rows:
+        if len(row) > 0:
+            cells = "".join(f"<{tag}{' ' + attributes if attributes else ''}>{render_wikitext_inline(cell)}</{tag}>" for tag, attributes, cell in row)
+            html_rows.append(f"<tr>{cells}</tr>")
+    return '<table class="wikitable">\n' + "\n".join(html_rows) + "\n</table>"
+
+@record_timing("imfdb_parse_seconds")
+def render_wikitext(title, wikitext):
+    # Renders the wikitext of a page into the html structure the extraction reads from index.php pages: the title as h1,
+    # headings with their anchors, a table of contents where MediaWiki shows one, paragraphs, lists, wiki tables, images
+    # and links. Everything else is left out, which keeps stored pages small.
+    show_toc = "__TOC__" in wikitext or "__FORCETOC__" in wikitext
+    hide_toc = "__NOTOC__" in wikitext
+    lines = strip_wikitext(wikitext).splitlines()
+    blocks = []
+    headings = []
+    anchors = set()
+    paragraph = []
+    items = []
+
+    def flush():
+        if len(paragraph) > 0:
+            blocks.append(f"<p>{' '.join(paragraph)}\n</p>")
+            paragraph.clear()
+        if len(items) > 0:
+            blocks.append("<ul>" + "".join(f"<li>{item}</li>" for item in items) + "</ul>")
+            items.clear()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        i += 1
+        heading = wikitext_heading_regex.match(line)
+        if line == "":
+            flush()
+        elif line.startswith("{|"):
+            flush()
+            table = [line]
+            while i < len(lines) and not lines[i].strip().startswith("|}"):
+                table.append(lines[i].strip())
+                i += 1
+            i += 1 # Skip the closing '|}'
+            blocks.append(render_wikitext_table(table))
+        elif heading is not None:
+            flush()
+            level = len(heading.group(1))
+            text = render_wikitext_inline(heading.group(2))
+            anchor = get_wikitext_anchor(text, anchors)
+            headings.append((level, re.sub(r"<[^>]+>", "", text)))
+            blocks.append(f'<h{level}><span class="mw-headline" id="{html.escape(anchor)}">{text}</span></h{level}>')
+        elif line[0] in "*#":
+            if len(paragraph) > 0:
+                flush()
+            items.append(render_wikitext_inline(line.lstrip("*#:; ")))
+        else:
+            if len(items) > 0:
+                flush()
+            rendered = render_wikitext_inline(line)
+            if re.fullmatch(r'(<div class="thumb">.*?</div>\s*)+', rendered):
+                flush()
+                blocks.append(rendered)
+            elif rendered != "":
+                paragraph.append(rendered)
+    flush()
+
+    # MediaWiki shows a table of contents before the first heading of pages with four or more headings
+    if (len(headings) >= 4 or show_toc) and not hide_toc and len(headings) > 0:
+        top = min(level for level, _ in headings)
+        numbers = []
+        toc = []
+        for level, text in headings:
+            depth = max(1, min(level - top + 1, len(numbers) + 1))
+            numbers = numbers[:depth] + [0] * (depth - len(numbers))
+            numbers[depth - 1] += 1
+            toc.append(f"<li>{'.'.join(str(number) for number in numbers)} {text}</li>")
+        first = next(index for index, block in enumerate(blocks) if block.startswith("<h"))
+        blocks.insert(first, '<div id="toc" class="toc"><div class="toctitle"><h2>Contents</h2></div><ul>' + "".join(toc) + "</ul></div>")
+
+    body = "\n".join(blocks)
+    return (f'<!DOCTYPE html>\n<html><head><title>{html.escape(title)} - Internet Movie Firearms Database</title></head><body>\n'
+            f'<h1 id="firstHeading" class="firstHeading">{html.escape(title)}</h1>\n'
+            f'<div id="mw-content-text"><div class="mw-parser-output">\n{body}\n</div></div>\n</body></html>')
+
+def iterate_categorymembers(cmtitle, format):
+    # Yields the members of a category batch by batch, as the continuations come in. Raises a RuntimeError if a batch
+    # can't be fetched, so that a stage consuming the members fails instead of finishing with part of them.
+
+    # Make a GET request to the IMFDB API endpoint
+    url = f"{imfdb_url}/api.php?action=query&list=categorymembers&cmtitle={cmtitle}&format={format}"
+    data = api_request(url)
+
+    # Continue fetching while there is something to be fetched
+    while True:
+        # Error Handling
+        if data is None:
+            raise RuntimeError(f"Enumerating {cmtitle} failed at {url}")
+
+        for member in data["query"]["categorymembers"]:
+            logger.debug("Adding %s", member['title'])
+            yield member
+
+        if "continue" not in data:
+            return
+        url = f"{imfdb_url}/api.php?action=query&list=categorymembers&cmtitle={cmtitle}&format={format}&cmcontinue={data['continue']['cmcontinue']}"
+        data = api_request(url)
+
+def query_categorymembers(cmtitle, format):
+    # Example: query_categorymembers("Category:Actor", "json") to query all actor pages as json.
+    try:
+        return list(iterate_categorymembers(cmtitle, format))
+    except RuntimeError as exception:
+        logger.error("%s", exception)
+        return None
+
+# The skeleton stages stream their categories: a thread enumerates the members into a bounded queue, fetch threads
+# download their pages into a second bounded queue, and the stage inserts the pages as they arrive. A full queue blocks
+# the threads feeding it, so memory stays bounded whatever the size of the category, and enumeration, downloads and
+# inserts overlap at the speed of the slowest of them.
+pipeline_dict = {
+    "fetchers" : int(os.environ.get("IMFDB_FETCH_THREADS", "4")),
+    "queue_size" : int(os.environ.get("IMFDB_QUEUE_SIZE", "64")) # Members or pages waiting between two steps
+}
+
+def stream_category_pages(cmtitle, skip=()):
+    # Yields (member, html, wikitext) for the pages of a category, see get_page_sources_by_ids(), in the order their
+    # downloads finish. Subcategories and pageids in skip are left out. Errors of the enumeration or of a download are
+    # raised in the consumer; closing the generator early stops the threads.
+    members = queue.Queue(pipeline_dict["queue_size"])
+    pages = queue.Queue(pipeline_dict["queue_size"])
+    stop = threading.Event()
+    done = object()
+    fetchers = max(1, pipeline_dict["fetchers"])
+
+    def put(target, item, name):
+        # Waits while the queue is full, unless the pipeline is stopping. Returns False if it is.
+        full = False
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if not full:
+                    count_metric("imfdb_pipeline_backpressure_total", queue=name)
+                    full = True
+        return False
+
+    def get(source):
+        while not stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return done
+
+    def enumerate_members():
+        try:
+            for member in iterate_categorymembers(cmtitle, "json"):
+                if "Category:" in member["title"] or str(member["pageid"]) in skip:
+                    continue
+                if not put(members, member, "members"):
+                    return
+        except Exception as exception:
+            put(pages, exception, "pages")
+        finally:
+            for _ in range(fetchers):
+                put(members, done, "members")
+
+    def fetch_pages():
+        # In wikitext mode, members waiting in the queue are fetched together, up to a batch per request
+        batch_size = page_source_dict["batch_size"] if page_source_dict["mode"] == "wikitext" else 1
+        try:
+            finished = False
+            while not finished:
+                batch = [get(members)]
+                if batch[0] is done:
+                    return
+                while len(batch) < batch_size:
+                    try:
+                        member = members.get_nowait()
+                    except queue.Empty:
+                        break
+                    if member is done:
+                        finished = True
+                        break
+                    batch.append(member)
+                for member, source in zip(batch, get_page_sources_by_ids([str(member["pageid"]) for member in batch])):
+                    if not put(pages, (member, *source), "pages"):
+                        return
+        except Exception as exception:
+            put(pages, exception, "pages")
+        finally:
+            put(pages, done, "pages")
+
+    threads = [threading.Thread(target=enumerate_members, name="enumerate", daemon=True)]
+    threads += [threading.Thread(target=fetch_pages, name=f"fetch-{i}", daemon=True) for i in range(fetchers)]
+    for thread in threads:
+        thread.start()
+    try:
+        running = fetchers
+        while running > 0:
+            item = pages.get()
+            if item is done:
+                running -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+# Tables of the database skeleton, each filled with the pages of a category
+category_tables_dict = {
+    "actors" : {"category" : "Category:Actor", "prefix" : "actor", "title" : "actorname"},
+    "movies" : {"category" : "Category:Movie", "prefix" : "movie", "title" : "movietitle"},
+    "tvseries" : {"category" : "Category:Television", "prefix" : "tvseries", "title" : "tvseriestitle"},
+    "firearms" : {"category" : "Category:Gun", "prefix" : "firearm", "title" : "firearmtitle"}
+}
+
+def populate_category_table(table):
+    # Inserts every page of the table's category, see stream_category_pages(). Each page is committed on its own, so the
+    # first rows land right away and an interrupted stage resumes from its checkpoints. Rows are written by the background writer.
+    prefix = category_tables_dict[table]["prefix"]
+    statement = f"INSERT INTO {table} ({prefix}url, {prefix}pageid, {prefix}pagecontent, {prefix}wikitext, {category_tables_dict[table]['title']}) VALUES (%s, %s, %s, %s, %s)"
+
+    checkpoints = load_checkpoints(table) # Pages finished by a previous, interrupted run
+
+    for member, pagecontent, wikitext in stream_category_pages(category_tables_dict[table]["category"], checkpoints):
+        pageid = str(member['pageid'])
+        title = str(member['title'])
+        url = f"{imfdb_url}/index.php?curid={pageid}"
+        logger.debug("INSERTing %s, %s", title, pageid)
+        queue_write(statement, (url, pageid, pagecontent, wikitext, title))
+        write_checkpoint(table, pageid)
+        commit_writes()
+
+    clear_checkpoints(table)
+    flush_writes()
+
+def populate_actors_table():
+    populate_category_table("actors")
+
+def populate_movies_table():
+    populate_category_table("movies")
+
+def populate_tvseries_table():
+    populate_category_table("tvseries")
+
+def populate_firearms_table_minimally():
+    # Populates the table with a rough skeleton only, not including singles extracted from multi articles
+    populate_category_table("firearms")
+
+def update_firearm_html_by_uuid(uuid):
+    # Use with care! This will break multis because it pulls html from the online article in IMFDB! 
+    statement = "SELECT firearmpageid FROM firearms WHERE firearmid = %s"
+    cursor.execute(statement, (uuid,))
+    if cursor.rowcount == 1:
+        firearmpageid = cursor.fetchone()[0]
+        firearmpagecontent, firearmwikitext = get_page_sources_by_ids([firearmpageid])[0]
+        logger.debug("UPDATING html for %s", uuid)
+        statement = "UPDATE firearms SET firearmpagecontent = %s, firearmwikitext = %s WHERE firearmid = %s"
+        cursor.execute(statement, (firearmpagecontent, firearmwikitext, uuid,))
+        cnx.commit()
+    else:
+        logger.error("Can not update. Unexpected number of rows returned for %s!", uuid)
+
+def get_redirects_by_pageid(pageid):
+    # Some pageids are merely redirects others. Since movie or tvseries appearances may link to a redirect, we have
+    # to grab those and store them in a table to check whether any given pageid is a redirect.
+    data = api_request(f"{imfdb_url}/api.php?action=query&prop=redirects&pageids={pageid}&format=json")
+
+    redirects = {}
+
+    for page in data["query"]["pages"]:
+        if "redirects" not in data["query"]["pages"][page]:
+            return None
+        for redirect in data["query"]["pages"][page]["redirects"]:
+            redirects[redirect["pageid"]] = redirect["title"]
+
+    return redirects 
+
+def is_disambiguation_page(link):
+    # Rudimentary check for whether a given page is a disambiguation page. We want to avoid parsing those.
+    # There may be exceptions and corner cases where this doesn't give the correct response!
+    response = http_get(f"{imfdb_url}/{link}", "page")
+    soup = BeautifulSoup(str(response.text), 'html.parser')
+
+    # This logic didn't work in several cases and has been improved upon below.
+    #catlinks = soup.find_all('div', class_='mw-normal-catlinks')
+    #if catlinks is not None:
+    #    for child in catlinks[0].children:
+    #        # check if the child element is an <ul>
+    #        if child.name == 'ul':
+    #            # loop through each <li> in the <ul>
+    #            for li in child.find_all('li'):
+    #                # check if the <li> contains an <a> with href = '/wiki/Category:Disambiguation_pages'
+    #                if li.find('a', href='/wiki/Category:Disambiguation_pages'):
+    #                    return True
+
+    h1 = soup.find_all('h1')
+    if h1 is not None:
+        if "(disambiguation)" in h1[0].text:
+            return True
+        else:
+            return False
+    else:
+        logger.error("Page does not contain an h1 element.")
+    logger.error("Check failed.")
+    #print(response.text)
+    return None
+
+# Dicts and lists
+
+# Wiki tables may sometimes use the terms in this list in their 'Actor' column.
+# To avoid registering them as actual actors in our database, we avoid them.
+actor_false_positives = ["","(uncredited)", "(Uncredited)", "Uncredited", "uncredited", ".", "various", "Various", "Unknown", "unknown", "various", "Various", "multiple","multiple",
+                         "—", "Multiple actors", "-", "varios actors", "multiple actors", "Various others", "Varios Actors", "Various thugs", "Various extras", "Curtis Taylor, Various actors",
+                         "Various Actors", "Various actors", "Various characters", "Various", "various actors", "Multiple actors", "uncredited actor"]
+
+# The index which corresponds to a database column when fetching all columns from the firearms table
+firearms_dict = {
+    "firearmid" : 0,
+    "firearmurl" : 1,
+    "parentfirearmid" : 2,
+    "firearmpageid" : 3,
+    "firearmpagecontent" : 4,
+    "specificationid" : 5,
+    "firearmtitle" : 6,
+    "firearmversion" : 7,
+    "isfamily" : 8,
+    "isfictional" : 9,
+    "firearmwikitext" : 10
+}
+
+def get_firearm_html(firearm):
+    # The html of a row of the firearms table, rendered from its wikitext if the page was downloaded as wikitext
+    return get_page_html(firearm[6], firearm[4], firearm[10])
+
+def get_firearm_size(firearm):
+    # The size of the page of a row of the firearms table for its budget, see run_page()
+    return len(firearm[4] or firearm[10] or "")
+
+def get_page_content_from_db(pageid, table):
+    # Use with care! When used in conjunction with firearms, this only works with firearms that are NOT children
+    # In most cases, it is advisable to fetch content by uuid with get_page_content_from_db_by_uuid()
+    if table in ["tvseries"]:
+        content = f"{table}pagecontent"
+        id = f"{table}id"
+    elif table in ["actors", "movies", "firearms"]:
+        singular = table.rstrip("s")
+        content = f"{singular}pagecontent"
+        id = f"{singular}pageid"
+    else:
+        logger.error("%s is not a valid table!", table)
+        return None
+    logger.debug("Fetching %s from %s where %s equals '%s'.", content, table, id, pageid)
+    columns = "{}, {}, {}".format(category_tables_dict[table]["title"], content, content.replace("pagecontent", "wikitext"))
+    statement = "select {} from {} where {} = '{}';".format(columns, table, id, pageid)
+    if table == "firearms": # If the firearms table is queried, filter out child firearm rows
+        statement = "select {} from firearms where {} = '{}' and parentfirearmid is null;".format(columns, id, pageid)
+    cursor.execute(statement)
+    return get_page_html(*cursor.fetchone())
+
+def get_page_content_from_db_by_uuid(uuid, table):
+    # This works with all pages, including firearm children, but requires the uuid as key
+    if table in ["tvseries"]:
+        content = f"{table}pagecontent"
+        id = f"{table}id"
+    elif table in ["actors", "movies", "firearms"]:
+        singular = table.rstrip("s")
+        content = f"{singular}pagecontent"
+        id = f"{singular}id"
+    else:
+        logger.error("%s is not a valid table!", table)
+        return None
+
+    columns = "{}, {}, {}".format(category_tables_dict[table]["title"], content, content.replace("pagecontent", "wikitext"))
+    statement = "select {} from {} where {} = '{}';".format(columns, table, id, uuid)
+    cursor.execute(statement)
+    return get_page_html(*cursor.fetchone())
+
+def update_firearms_isfictional():
+    # Sets the boolean flag for fictional firearms for all firearms
+    statement = "UPDATE firearms SET isfictional = FALSE WHERE NOT firearmtitle LIKE '(%) -%';"
+    cursor.execute(statement)
+    statement = "UPDATE firearms SET isfictional = TRUE WHERE firearmtitle LIKE '(%) -%';"
+    cursor.execute(statement)
+    cnx.commit()
+
+@record_timing("imfdb_parse_seconds")
+def is_multi_gun_page(pageid):
+    # Check to determine whether a given page is a multi gun page composed of singles
+    # Exceptions
+    if (pageid == "464719" or pageid == "314208"): #Both of these have a table of contents despite being singles
+        return False
+
+    # If there are multiple h1s in an article, which are not See Also or Specification, it's a multi-gun page
+    soup = soup = BeautifulSoup(get_page_content_from_db(pageid, "firearms"), 'html.parser')
+
+    toctitle = soup.find("div", class_="toctitle") #If there is no table of contents, we don't need to check further, it's not multi-gun
+    if toctitle is None:
+        return False
+
+    see_also = soup.find(id = "See_Also")
+    if see_also is not None:
+        if see_also.parent.name == "h1":
+            see_also.parent.extract()
+
+    spec = soup.find(id = "Specifications")
+    if spec is not None:
+        if spec.parent.name == "h1":
+            spec.parent.extract()
+
+    h1_tags = soup.find_all("h1")
+    count = len(h1_tags)
+
+    if count > 1:
+        return True
+    else:
+        return False
+    
+def update_firearms_isfamily():
+    # We assume a firearm is a family when it is named 'series' or is a multi-gun page
+    keyword1 = "series"
+    keyword2 = "Series"
+    statement = "UPDATE firearms set isfamily = FALSE WHERE NOT (firearmtitle LIKE '%%%s%%' OR firearmtitle LIKE '%%%s%%' OR firearmtitle = 'Air Guns')" % (keyword1, keyword2)
+    cursor.execute(statement)
+    statement = "UPDATE firearms set isfamily = TRUE WHERE (firearmtitle LIKE '%%%s%%' OR firearmtitle LIKE '%%%s%%' OR firearmtitle = 'Air Guns')" % (keyword1, keyword2)
+    cursor.execute(statement)
+
+    statement = "SELECT * FROM firearms"
+    cursor.execute(statement)
+    firearms = cursor.fetchall()
+    for firearm in firearms:
+        if (is_multi_gun_page(pageid=firearm[3]) and firearm[8] == False): # If we have determined the article is multi-gun, it's a family
+            statement = "UPDATE firearms set isfamily = TRUE WHERE firearmid = '%s'" % (firearm[0])
+            cursor.execute(statement)
+        if firearm[2] is not None: # Child firearms are never families 
+            statement = "UPDATE firearms set isfamily = FALSE WHERE firearmid = '%s'" % (firearm[0])
+            cursor.execute(statement)
+
+    cnx.commit()
+
+@record_timing("imfdb_parse_seconds")
+def get_number_of_specifications(html_content):
+    # Returns the number of firearm specifications found in the provided html
+    soup = BeautifulSoup(html_content, 'html.parser')
+    
+    spec_tags = soup.find_all(id=lambda value: value and value.startswith("Specifications"))
+    spec_count = len(spec_tags)
+
+    logger.debug("The number of h2 tags with 'Specifications' is: %s", spec_count)
+    return spec_count
+
+def strip_spec_list_item(item):
+    # Strip the : character from a specification list item
+    index = item.index(":")
+    return item[index + 1:].strip()
+
+@record_timing("imfdb_parse_seconds")
+def get_single_specification(html_content, pageid=None):
+    # Finds the first specification within any given html
+
+    spec_dict = {
+        "production":None,
+        "type":None,
+        "caliber":None,
+        "capacity":None,
+        "fire_modes":None
+    }
+
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    # Find all h1 headers in the content
+    headers = soup.find_all("h1")
+
+    if (headers is None or len(headers) == 0):
+        if pageid is not None:
+            logger.error("%s does not contain any headers!", pageid)
+        return
+
+    # Page Title
+    title = headers[0].text
+
+    # Find the first Element with the Specifications id
+    span = soup.find(id = "Specifications")
+    if span is None:
+        logger.error("No <span> tag with id = 'Specifications' was found!")
+        return
+
+    spec_lists = span.parent.find_next_siblings("ul")
+
+    # Each spec row is its own unordered list with only a single list item
+    if spec_lists is None:
+        logger.error("No <ul> tags were found!")
+        return
+
+    specifications = [li.text for ul in spec_lists for li in ul.find_all('li')]
+
+    if specifications is None:
+        logger.error("No <li> tags were found!")
+        return
+
+    # Iterate through the list items and set a dict for each
+    for item in specifications:
+        if "Type:" in item:
+            spec_dict["type"] = strip_spec_list_item(item)
+        elif "Caliber:" in item:
+            spec_dict["caliber"] = strip_spec_list_item(item)
+        elif "Feed System" in item:
+            spec_dict["capacity"] = strip_spec_list_item(item)
+        elif "Capacity:" in item:
+            spec_dict["capacity"] = strip_spec_list_item(item)
+        elif "Fire Modes:" in item:
+            spec_dict["fire_modes"] = strip_spec_list_item(item)
+    
+    # Initialize with None so we can check later if a value was extracted from the HTML
+    production = None
+
+    # Determine whether a <p> tag containing a date exists
+    possible_p_tag = span.parent.find_next_sibling()
+    if possible_p_tag is not None:
+        if possible_p_tag.name == "p" and re.match(r"\(\.*\d{4}.*\)",str(possible_p_tag.text)):
+            production = possible_p_tag.text
+            match = re.search(r"\(.*(\d{4})s?\s*(-\s|–\s)(\d{4}|Present)s?.*\)", production)
+            if match is not None:
+                production_year = match.group(1).strip()
+                production_end_year = match.group(3).strip()
+                production = f"({production_year} - {production_end_year})"
+            # Add it to the specification
+            spec_dict["production"] = production.rstrip("\n")
+
+    # Normalized attributes for the indexed child tables, see get_specification_attributes()
+    spec_dict["attributes"] = get_specification_attributes(spec_dict)
+
+    return spec_dict
+
+# Aliases of common calibers and the canonical token they are stored as. Metric calibers of the form '9x19mm'
+# are canonicalized by canonicalize_caliber() on their own and only need an entry here if they are known by a name.
+caliber_aliases_dict = {
+    "9mm parabellum" : "9x19mm",
+    "9mm luger" : "9x19mm",
+    "9mm nato" : "9x19mm",
+    "9mm para" : "9x19mm",
+    "9mm" : "9x19mm",
+    ".380 acp" : "9x17mm",
+    "9mm short" : "9x17mm",
+    "9mm kurz" : "9x17mm",
+    ".45 auto" : ".45 acp",
+    "5.56mm nato" : "5.56x45mm",
+    "7.62mm nato" : "7.62x51mm",
+    ".308 winchester" : "7.62x51mm",
+    "12 ga" : "12 gauge",
+    "12-gauge" : "12 gauge"
+}
+
+# Fire mode flags stored in specificationattributes and the patterns they are detected by.
+# Semi-automatic mentions are removed before checking for fully automatic fire, see get_fire_mode_flags().
+fire_modes_dict = {
+    "issemiautomatic" : re.compile(r"semi[\s-]*auto", re.IGNORECASE),
+    "isfullyautomatic" : re.compile(r"(full[\s-]*auto|fully[\s-]*auto|\bautomatic)", re.IGNORECASE),
+    "isburst" : re.compile(r"burst", re.IGNORECASE),
+    "issingleaction" : re.compile(r"single(\s*/\s*double)?[\s-]*action", re.IGNORECASE),
+    "isdoubleaction" : re.compile(r"double[\s-]*action", re.IGNORECASE),
+    "isboltaction" : re.compile(r"bolt[\s-]*action", re.IGNORECASE),
+    "ispumpaction" : re.compile(r"pump[\s-]*action", re.IGNORECASE),
+    "isleveraction" : re.compile(r"lever[\s-]*action", re.IGNORECASE),
+    "isbreakaction" : re.compile(r"break[\s-]*action", re.IGNORECASE)
+}
+
+def canonicalize_caliber(caliber):
+    # Turns a single caliber as written on a page (e.g. '9x19mm Parabellum', '9mm Luger', '.45 ACP') into a canonical, lower case token
+    caliber = re.sub(r"\[\d+\]|\(.*?\)", "", caliber) # Strip footnotes and remarks in brackets
+    caliber = " ".join(caliber.replace("×", "x").lower().split()).strip(" :").rstrip(".") # Keeps the leading dot of '.308 Winchester'
+    if re.match(r"^\d{2,3}\b(?![\s-]*(?:mm|gauge|ga|bore)\b|\.\d|\s*x)", caliber): # Not metric, e.g. '12.7x99mm' or '12.7mm'
+        caliber = f".{caliber}" # Leading dots of imperial bores are frequently missing, e.g. '308 Winchester' or '30-06'
+    if caliber == "":
+        return None
+    match = re.match(r"^(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)\s*mm\s*(r|sr|b)?\b", caliber)
+    if match:
+        return f"{match.group(1)}x{match.group(2)}mm{match.group(3) or ''}"
+    return caliber_aliases_dict.get(caliber, caliber)
+
+def get_calibers(caliber_text):
+    # Splits a caliber spec that lists several calibers and returns their canonical tokens without duplicates
+    if caliber_text is None:
+        return []
+    calibers = []
+    for caliber in re.split(r"\n|,|;|\s/\s|\sor\s|\sand\s", caliber_text):
+        caliber = canonicalize_caliber(caliber)
+        if caliber is not None and caliber not in calibers:
+            calibers.append(caliber)
+    return calibers
+
+def get_capacity_range(capacity_text):
+    # Returns the smallest and largest number of rounds mentioned in a capacity spec, e.g. (20, 30) for '20 or 30-round box magazine'
+    if capacity_text is None:
+        return (None, None)
+    capacities = []
+    for match in re.finditer(r"((?:\d+\s*(?:-|–|to|/|,|or|and)\s*)*\d+)\s*-?\s*(?:round|rd|shot|shell|cartridge)", capacity_text, re.IGNORECASE):
+        capacities.extend(int(number) for number in re.findall(r"\d+", match.group(1)))
+    if len(capacities) == 0 and re.search(r"single[\s-]*shot", capacity_text, re.IGNORECASE):
+        capacities.append(1)
+    capacities = [capacity for capacity in capacities if capacity <= 32767] # Must fit the smallint columns
+    if len(capacities) == 0:
+        return (None, None)
+    return (min(capacities), max(capacities))
+
+def get_fire_mode_flags(fire_modes_text):
+    # Returns a dict with a boolean for each fire mode in fire_modes_dict, or None for all of them if there is no fire mode spec
+    flags = dict.fromkeys(fire_modes_dict)
+    if fire_modes_text is None:
+        return flags
+    for flag, regex in fire_modes_dict.items():
+        text = fire_modes_text
+        if flag == "isfullyautomatic": # 'Semi-Automatic' must not count as automatic
+            text = re.sub(r"semi[\s-]*auto\w*", "", text, flags=re.IGNORECASE)
+        flags[flag] = regex.search(text) is not None
+    return flags
+
+def get_production_years(production_text):
+    # Returns start and end year of a production timeframe such as '(1985 - Present)'. The end year is None while still in production.
+    if production_text is None:
+        return (None, None)
+    years = [int(year) for year in re.findall(r"\d{4}", production_text)]
+    if len(years) == 0:
+        return (None, None)
+    if "present" in production_text.lower():
+        return (years[0], None)
+    return (years[0], years[-1])
+
+def get_specification_attributes(spec_dict):
+    # Derives the normalized attributes of a specification from its free-text values
+    capacity_min, capacity_max = get_capacity_range(spec_dict["capacity"])
+    production_start, production_end = get_production_years(spec_dict["production"])
+    return {
+        "calibers" : get_calibers(spec_dict["caliber"]),
+        "capacity_min" : capacity_min,
+        "capacity_max" : capacity_max,
+        "fire_modes" : get_fire_mode_flags(spec_dict["fire_modes"]),
+        "production_start" : production_start,
+        "production_end" : production_end
+    }
+
+def insert_specification(firearmid, spec):
+    # INSERTs a specification as extracted by get_single_specification() along with its normalized attributes. The id is
+    # generated here instead of being returned by the database, so the rows are written by the background writer (with
+    # COPY during bulk loads) like those of the other stages.
+    specificationid = str(uuid4())
+    statement = "INSERT INTO specifications (specificationid, firearmid, type, caliber, capacity, firemode, productiontimeframe) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+    queue_write(statement, (specificationid, firearmid, spec["type"], spec["caliber"], spec["capacity"], spec["fire_modes"], spec["production"]))
+
+    attributes = spec["attributes"]
+    flags = attributes["fire_modes"]
+    statement = "INSERT INTO specificationattributes (specificationid, firearmid, capacitymin, capacitymax, productionstart, productionend, {}) VALUES (%s, %s, %s, %s, %s, %s{})".format(", ".join(flags), ", %s" * len(flags))
+    queue_write(statement, (specificationid, firearmid, attributes["capacity_min"], attributes["capacity_max"], attributes["production_start"], attributes["production_end"], *flags.values()))
+
+    for caliber in attributes["calibers"]:
+        statement = "INSERT INTO specificationcalibers (specificationid, firearmid, caliber) VALUES (%s, %s, %s)"
+        queue_write(statement, (specificationid, firearmid, caliber))
+
+@record_timing("imfdb_parse_seconds")
+def articles_has_h1_variants(soup):
+# Some firearm pages have variants ("Military, Civilian, etc.") as their h1, instead of different models
+    if soup.find(id = "Specifications") is not None:
+        first_specification_header = soup.find(id = "Specifications").parent
+        if first_specification_header.name == "h3":
+            return True
+        else:
+            return False
+    else: # If the table of contents has a depth of 3 or more, we also assume variants
+        toctitle = soup.find("div", class_="toctitle")
+        if toctitle is not None:
+            toc = toctitle.find_next_sibling("ul")
+            regex = re.compile(r'(\d\.){2,}\d')
+            for li in toc.find_all('li'):
+                if regex.search(li.text):
+                    return True
+            return False
+    return None
+
+@record_timing("imfdb_parse_seconds")
+def split_multi_gun_page(html_content, pageid):
+    # This function splits multi-gun pages at every h1, if it doesn't use h1s as variants, and at every h2, if it does.
+    # Returns a list of [firearmtitle, version, content] of the firearms on the page, version is None without variants.
+
+    firearms = []
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    firearmtitle = None
+    content = ""
+    version = None
+
+    see_also = soup.find(id = "See_Also")
+    if see_also is not None:
+        if see_also.parent.name == "h1":
+            see_also.parent.extract()
+
+    spec = soup.find(id = "Specifications")
+    if spec is not None:
+        if spec.parent.name == "h1":
+            h1spec= spec.parent.extract()
+
+    if articles_has_h1_variants(soup): # If it has variants in h1...
+        headers = soup.find_all("h1")
+        headers.pop(0) #Skip the first one, since its the page heading
+        for h1 in headers:
+            version = h1.text
+            headers2 = h1.find_next_siblings("h2")
+            for h2 in headers2:
+                slices = []
+                slices.append(h2)
+                firearmtitle = h2.text
+                content = ""
+                for slice in h2.find_next_siblings():
+                    if (slice.name == "h2" or slice.name == "h1"):
+                        break
+                    slices.append(slice.extract())
+                # Now that we have built up our slices of html, it's time to insert
+                for slice in slices:
+                    content = content+str(slice)
+                if (content == "" or firearmtitle is None or version is None):
+                    logger.error("%s produced empty version, content or title!", pageid)
+                    continue
+                if firearmtitle in ["Video Games", "Film", "Television", "Anime"]:
+                    logger.error("Version check failed for %s!", pageid)
+                    continue
+                firearms.append([firearmtitle, version, content])
+                
+    else: # If it doesn't have variants in h1...
+        headers = soup.find_all("h1")
+        headers.pop(0) # Skip the first one
+        for h1 in headers:
+            slices = []
+            slices.append(h1)
+            firearmtitle = h1.text
+            content = ""
+            for slice in h1.find_next_siblings():
+                if slice.name == "h1":
+                    break
+                slices.append(slice.extract())
+            # Now that we have built up our slices of html, it's time to insert
+            for slice in slices:
+                content = content+str(slice)
+            if (content == "" or firearmtitle is None):
+                logger.error("%s produced empty content or title!", pageid)
+                continue
+            if firearmtitle in ["Video Games", "Film", "Television", "Anime"]:
+                logger.error("Version check failed for %s!", pageid)
+                continue
+            firearms.append([firearmtitle, None, content])
+
+    if articles_has_h1_variants(soup) is None:
+        logger.error("Version check failed for %s!", pageid)
+    return firearms
+
+def generate_firearms_from_multi(html_content, url, pageid, parentuuid):
+    # Inserts the firearms of a multi-gun page as children of its family row. Children store their section of the parent's
+    # html, rendered from the parent's wikitext if it was downloaded as such, and have no wikitext of their own.
+    skipped, firearms = extract_page("multi", parentuuid, pageid, html_content, pageid)
+    if skipped:
+        return
+    for firearmtitle, version, content in firearms:
+        logger.debug("INSERTing %s, %s, %s", firearmtitle, pageid, parentuuid)
+        statement = "INSERT INTO firearms (firearmurl, parentfirearmid, firearmpageid, firearmpagecontent, firearmtitle, isfamily, firearmversion) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+        cursor.execute(statement, (url, parentuuid, pageid, content, firearmtitle, False, version))
+
+def generate_firearms_from_multis():
+    # Generates single firearm table entries from all the multi-gun pages and families
+    statement = "SELECT * FROM firearms WHERE isfamily = TRUE AND parentfirearmid IS NULL;"
+    cursor.execute(statement)
+    firearms = cursor.fetchall()
+
+    for firearm in firearms:
+        if not is_selected_page("family", firearm[0]):
+            continue
+        if run_page("family", firearm[0], generate_firearms_from_multi, get_firearm_html(firearm), firearm[1], firearm[3], firearm[0], size=get_firearm_size(firearm)) and page_budget_dict["retry"]:
+            # The children of a page that was quarantined have never been seen by the stages after this one
+            statement = "SELECT firearmid FROM firearms WHERE parentfirearmid = %s"
+            cursor.execute(statement, (firearm[0],))
+            for child in cursor.fetchall():
+                for stage in get_downstream_stages("family")[1:]:
+                    quarantine_page(stage, child[0], "pending", f"Generated when family page {firearm[0]} was retried", 0, 0)
+    flush_writes()
+
+def check_for_family_candidates():
+# Debugging function to check on potential is_Family candidates
+    statement = "SELECT * FROM firearms"
+    cursor.execute(statement)
+    firearms = cursor.fetchall()
+    
+    with open('candidates.txt', 'w') as writer:
+        for firearm in firearms:
+            if (is_multi_gun_page(pageid=firearm[3]) and firearm[8] == False):
+                writer.write(f"{firearm[3]}\n")
+
+def populate_specification(firearm, extractor="specification"):
+    # Extracts and inserts the specification of a single firearm row
+    logger.debug("Fetching spec for %s", firearm[3])
+    skipped, spec = extract_page(extractor, firearm[0], firearm[3], get_firearm_html(firearm), firearm[3])
+    if not skipped and spec is not None:
+        logger.debug("INSERTing %s specification", firearm[3])
+        insert_specification(firearm[0], spec)
+
+def populate_specs_for_singles():
+    # Populates the specifications table for single gun entries
+    statement = "SELECT * FROM firearms WHERE isfamily = FALSE AND parentfirearmid IS NULL;" # Children of multi-gun pages are handled by populate_specs_for_multies()
+    cursor.execute(statement)
+    firearms = cursor.fetchall()
+
+    for firearm in firearms:
+        if is_selected_page("specifications", firearm[0]):
+            run_page("specifications", firearm[0], populate_specification, firearm, size=get_firearm_size(firearm))
+            commit_writes()
+
+def get_family_specification(html_content, pageid=None):
+    # Family rows only get a specification if there is a single one in an h1 tag for the entire page
+    soup = BeautifulSoup(html_content, "html.parser")
+    spec_tag = soup.find_next(id = "Specifications") # Find the first spec
+    if spec_tag is not None:
+        if spec_tag.parent.name == "h1": # If it's nested in an h1...
+            return get_single_specification(html_content, pageid)
+    return None
+
+def populate_family_specification(firearm):
+    populate_specification(firearm, "family_specification")
+
+def populate_specs_for_multies():
+    # Populates the specification table for multi-gun entries
+    # We handle family rows first, trying to determine whether there is a single spec in an h1 tag for the entire page
+    statement = "SELECT * FROM firearms WHERE isfamily = TRUE and parentfirearmid IS NULL"
+    cursor.execute(statement)
+    firearms = cursor.fetchall()
+
+    for firearm in firearms:
+        if is_selected_page("specifications", firearm[0]):
+            run_page("specifications", firearm[0], populate_family_specification, firearm, size=get_firearm_size(firearm))
+            commit_writes()
+    # Same procedure for the child rows
+    statement = "SELECT * FROM firearms WHERE parentfirearmid IS NOT NULL"
+    cursor.execute(statement)
+    firearms = cursor.fetchall()
+
+    for firearm in firearms:
+        if is_selected_page("specifications", firearm[0]):
+            run_page("specifications", firearm[0], populate_specification, firearm, size=get_firearm_size(firearm))
+            commit_writes()
+
+def populate_specifications_table():
+    # Do both with a single function call
+    populate_specs_for_singles()
+    populate_specs_for_multies()
+    flush_writes()
+
+@record_timing("imfdb_parse_seconds")
+def parse_html(html_content):
+    # Parses a page once, so that several extraction functions can work on the same soup
+    return BeautifulSoup(html_content, "html.parser")
+
+def extract_dataframe_from_html_table(html_content, table_name, uuid):
+    # This is used to find and extract the first table (valid names are the keys of appearance_tables_dict, ie. 'Film' and 'Television') on any given page and return it as a data frame
+    soup = BeautifulSoup(html_content, "html.parser")
+    return extract_dataframe_from_soup(soup, table_name, uuid)
+
+@record_timing("imfdb_parse_seconds")
+def extract_dataframe_from_soup(soup, table_name, uuid):
+    # Same as above, but works on an already parsed page so several tables can be extracted from a single parse
+    if table_name not in appearance_tables_dict:
+        logger.error("table %s not found in list of valid table names!", table_name)
+        return
+    regex = re.compile(fr'^{table_name}(_\d*)?')
+    span = soup.find('span', {'id': regex})
+    if span is None:
+        logger.warning("No span with id %s was found in the html content of %s!", table_name, uuid)
+        return None
+    table = span.parent.find_next_sibling("table")
+    if table is None:
+        logger.error("No table was found in the html content of %s!", uuid)
+        return None
+    just_the_table = str(table)
+    df = pd.read_html(io.StringIO(just_the_table), extract_links='body') # Newer pandas no longer accepts literal html
+    return df[0]
+
+def get_uuid_by_pageid(pageid, table):
+    # This only works with tables where the pageid is unique, ie. not with firearms
+    if table in ["tvseries"]:
+        uuid = f"{table}id"
+        id = f"{table}pageid"
+    elif table in ["actors", "movies"]:
+        singular = table.rstrip("s")
+        uuid = f"{singular}id"
+        id = f"{singular}pageid"
+    else:
+        logger.error("%s is not a valid table (actors, movies, tvseries)!", table)
+        return None
+
+    statement = f"select {uuid} from {table} where {id} = '{pageid}';"
+    cursor.execute(statement)
+    logger.debug("Fetching uuid for page with id %s from %s", pageid, table)
+    if cursor.rowcount == 1:
+        return cursor.fetchone()[0]
+    else:
+        logger.error("Unexpected number of rows (%s) returned while fetching pageid %s from %s!", cursor.rowcount, pageid, table)
+        return None
+    
+def populate_redirects_table():
+    # Populate the redirects table with entries showing to and from
+    checkpoints = load_checkpoints("redirects") # Pages finished by a previous, interrupted run
+
+    statement = "SELECT * FROM movies WHERE moviepageid != '0'"
+    cursor.execute(statement)
+    movies = cursor.fetchall()
+
+    for movie in movies:
+        if movie[3] in checkpoints:
+            continue
+        redirects = get_redirects_by_pageid(movie[3])
+        logger.debug("Currently working on redirects for %s:%s", movie[3], movie[1])
+
+        time.sleep(0.1)
+
+        if redirects is not None:
+            for key,value in redirects.items():
+                statement = "INSERT INTO redirects (topageid, totitle, frompageid, fromtitle) VALUES (%s, %s, %s, %s)"
+                queue_write(statement, (movie[3], movie[1], key, value))
+        write_checkpoint("redirects", movie[3])
+        commit_writes()
+
+    cnx.commit()
+    
+    statement = "SELECT * FROM tvseries WHERE tvseriespageid != '0'"
+    cursor.execute(statement)
+    tvseries = cursor.fetchall()
+
+    for series in tvseries:
+        if series[3] in checkpoints:
+            continue
+        redirects = get_redirects_by_pageid(series[3])
+        logger.debug("Currently working on redirects for %s:%s", series[3], series[1])
+
+        time.sleep(0.1)
+
+        if redirects is not None:
+            for key,value in redirects.items():
+                statement = "INSERT INTO redirects (topageid, totitle, frompageid, fromtitle) VALUES (%s, %s, %s, %s)"
+                queue_write(statement, (series[3], series[1], key, value))
+        write_checkpoint("redirects", series[3])
+        commit_writes()
+    cnx.commit()
+
+    statement = "SELECT * FROM actors WHERE actorpageid != '0'"
+    cursor.execute(statement)
+    actors = cursor.fetchall()
+
+    for actor in actors:
+        if actor[2] in checkpoints:
+            continue
+        redirects = get_redirects_by_pageid(actor[2])
+        logger.debug("Currently working on redirects for %s:%s", actor[2], actor[4])
+
+        time.sleep(0.1)
+
+        if redirects is not None:
+            for key,value in redirects.items():
+                statement = "INSERT INTO redirects (topageid, totitle, frompageid, fromtitle) VALUES (%s, %s, %s, %s)"
+                queue_write(statement, (actor[2], actor[4], key, value))
+        write_checkpoint("redirects", actor[2])
+        commit_writes()
+
+    clear_checkpoints("redirects")
+    flush_writes()
+
+    # For some actors the MW API does not return redirect pages (e.g. 'Andre Holland' for 'André Holland').
+    # Those are resolved through the folded name index of the link resolver instead of being patched in here.
+
+def load_checkpoints(stage):
+    # Since the long stages may fail halfway, for example because we are locked out of the API for making too many requests,
+    # they keep track of the entries they finished working on in the checkpoints table. This returns those ids as a set, so
+    # a restarted stage can skip them.
+    statement = "SELECT entityid FROM checkpoints WHERE stage = %s"
+    cursor.execute(statement, (stage,))
+    checkpoints = set(row[0] for row in cursor.fetchall())
+    if len(checkpoints) > 0:
+        logger.info("Resuming stage '%s', skipping %s finished entries.", stage, len(checkpoints))
+    return checkpoints
+
+def write_checkpoint(stage, entityid):
+    # Marks an entry as finished. This is queued with the entry's rows, so it becomes durable in the same transaction.
+    statement = "INSERT INTO checkpoints (stage, entityid) VALUES (%s, %s) ON CONFLICT DO NOTHING"
+    queue_write(statement, (stage, str(entityid)))
+
+def clear_checkpoints(stage):
+    # We clear the checkpoints of a stage when it is done, so that the next run starts over.
+    statement = "DELETE FROM checkpoints WHERE stage = %s"
+    queue_write(statement, (stage,))
+
+# Budget of the extraction of a single page. A page that raises an exception or exceeds a budget is rolled back and put
+# into the quarantine table, and its stage carries on with the next page. The time budget interrupts the page when the
+# stage runs in the main thread of its process (always the case with run_stages()), otherwise it is checked afterwards.
+# Memory is checked afterwards as the growth of the peak memory of the process, which catches pages that blow up once.
+page_budget_dict = {
+    "seconds" : float(os.environ.get("IMFDB_PAGE_SECONDS", "120")),
+    "bytes" : int(os.environ.get("IMFDB_PAGE_BYTES", str(16 * 1024 * 1024))), # Size of the page html
+    "memory" : int(os.environ.get("IMFDB_PAGE_MEMORY", str(1024 * 1024 * 1024))),
+    "retry" : False, # Only extract quarantined pages, see --retry-quarantined
+    "quarantined" : {} # stage -> set of quarantined entity ids, loaded once per stage
+}
+
+class PageBudgetExceeded(Exception):
+    pass
+
+def raise_page_budget_exceeded(signum, frame):
+    raise PageBudgetExceeded(f"Time budget of {page_budget_dict['seconds']}s exceeded")
+
+def get_peak_memory():
+    # Peak resident memory of this process in bytes, 0 where the resource module is not available
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def load_quarantine(stage):
+    if stage not in page_budget_dict["quarantined"]:
+        statement = "SELECT entityid FROM quarantine WHERE stage = %s"
+        cursor.execute(statement, (stage,))
+        page_budget_dict["quarantined"][stage] = {row[0] for row in cursor.fetchall()}
+    return page_budget_dict["quarantined"][stage]
+
+def is_selected_page(stage, entityid):
+    # Every page is extracted in a normal run, only the quarantined ones when retrying
+    return not page_budget_dict["retry"] or str(entityid) in load_quarantine(stage)
+
+def quarantine_page(stage, entityid, reason, exception, seconds, memory):
+    statement = """INSERT INTO quarantine (stage, entityid, reason, exception, seconds, memorybytes) VALUES (%s, %s, %s, %s, %s, %s)
+                   ON CONFLICT (stage, entityid) DO UPDATE SET reason = excluded.reason, exception = excluded.exception, seconds = excluded.seconds,
+                   memorybytes = excluded.memorybytes, attempts = quarantine.attempts + 1, quarantinetime = CURRENT_TIMESTAMP"""
+    cursor.execute(statement, (stage, str(entityid), reason, exception, seconds, memory))
+    load_quarantine(stage).add(str(entityid))
+    count_metric("imfdb_pages_quarantined_total", stage=stage, reason=reason)
+
+def release_page(stage, entityid):
+    # Takes a page that was extracted successfully out of the quarantine
+    if str(entityid) in load_quarantine(stage):
+        statement = "DELETE FROM quarantine WHERE stage = %s AND entityid = %s"
+        queue_write(statement, (stage, str(entityid))) # Along with the rows of the page
+        load_quarantine(stage).discard(str(entityid))
+
+def run_page(stage, entityid, function, *args, size=None):
+    # Runs function(*args), the extraction of a single page, under the page budget. Its statements run in a savepoint, so a
+    # failed page leaves no partial rows behind. Returns True if the page was extracted, False if it was quarantined.
+    if size is not None and size > page_budget_dict["bytes"]:
+        logger.warning("Quarantining %s %s, its html has %s bytes", stage, entityid, size)
+        quarantine_page(stage, entityid, "size", f"{size} bytes exceed the budget of {page_budget_dict['bytes']}", 0, 0)
+        return False
+
+    interrupt = hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    cursor.execute("SAVEPOINT page")
+    link_resolver_dict["journal"].clear()
+    writes = len(get_pending_writes())
+    start = time.perf_counter()
+    peak_memory = get_peak_memory()
+    reason = None
+    try:
+        if interrupt:
+            handler = signal.signal(signal.SIGALRM, raise_page_budget_exceeded)
+            signal.setitimer(signal.ITIMER_REAL, page_budget_dict["seconds"])
+        try:
+            function(*args)
+        finally:
+            if interrupt:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, handler)
+    except PageBudgetExceeded as exception:
+        reason, detail = "time", str(exception)
+    except Exception as exception:
+        reason, detail = "exception", traceback.format_exc()
+    seconds = time.perf_counter() - start
+    memory = get_peak_memory() - peak_memory
+    if reason is None and seconds > page_budget_dict["seconds"]:
+        reason, detail = "time", f"Time budget of {page_budget_dict['seconds']}s exceeded"
+    if reason is None and memory > page_budget_dict["memory"]:
+        reason, detail = "memory", f"Peak memory grew by {memory} bytes, the budget is {page_budget_dict['memory']}"
+
+    if reason is None:
+        cursor.execute("RELEASE SAVEPOINT page")
+        release_page(stage, entityid)
+        return True
+    cursor.execute("ROLLBACK TO SAVEPOINT page")
+    cursor.execute("RELEASE SAVEPOINT page")
+    undo_resolver_journal() # Its entries may point to rows that were just rolled back
+    discard_writes(writes)
+    logger.warning("Quarantining %s %s after %.1fs (%s): %s", stage, entityid, seconds, reason, detail.strip().splitlines()[-1])
+    quarantine_page(stage, entityid, reason, detail, seconds, memory)
+    return False
+
+def insert_dummy_actor():
+    # If a firearm appearance is not clearly linked to a single and/or named actor, we associate it with a dummy entry instead 
+    statement = "select actorid from actors where actorpageid = '0' and actorname = 'Dummy / Uncredited Extra';"
+    cursor.execute(statement)
+    if cursor.rowcount > 0:
+        return cursor.fetchone()[0] # Check for possible duplicate, if it already exists, we return the uuid
+
+    statement = "INSERT INTO actors (actorpageid, actorname) VALUES ('0', 'Dummy / Uncredited Extra')"
+    cursor.execute(statement)
+    cnx.commit()
+    statement = "select actorid from actors where actorpageid = '0' and actorname = 'Dummy / Uncredited Extra';"
+    cursor.execute(statement)
+    return cursor.fetchone()[0]
+
+def insert_actor_without_page(name):
+    # Some actors don't have a wiki page yet. In this case we insert them into the actors table as needed.
+    uuid = lookup_folded_name(name, "actors") # Spelling variants of known entries resolve in memory
+    if uuid is not None:
+        return uuid
+
+    statement = "select actorid from actors where actorpageid = '0' and actorname = %s;"
+    cursor.execute(statement, (name,))
+    if cursor.rowcount > 0:
+        return cursor.fetchone()[0] # Check for possible duplicate, if it already exists, we return the uuid
+
+    statement = "INSERT INTO actors (actorpageid, actorname) VALUES ('0', %s)"
+    cursor.execute(statement, (name,))
+    statement = "select actorid from actors where actorpageid = '0' and actorname = %s;"
+    cursor.execute(statement, (name,))
+    logger.debug("INSERTing actor %s.", name)
+    uuid = cursor.fetchone()[0]
+    add_folded_name(name, "actors", uuid)
+    return uuid
+
+def insert_movie_without_page(title):
+    # See avove. Same is true for some movies.
+    uuid = lookup_folded_name(title, "movies") # Spelling variants of known entries resolve in memory
+    if uuid is not None:
+        return uuid
+
+    statement = "select movieid from movies where moviepageid = '0' and movietitle = %s;"
+    cursor.execute(statement, (title,))
+    if cursor.rowcount > 0:
+        return cursor.fetchone()[0] # Check for possible duplicate, if it already exists, we return the uuid
+
+    statement = "INSERT INTO movies (moviepageid, movietitle) VALUES ('0', %s)"
+    cursor.execute(statement, (title,))
+    statement = "select movieid from movies where moviepageid = '0' and movietitle = %s;"
+    cursor.execute(statement, (title,))
+    logger.debug("INSERTing movie %s.", title)
+    uuid = cursor.fetchone()[0]
+    add_folded_name(title, "movies", uuid)
+    return uuid
+
+def insert_tvseries_without_page(title):
+    # See above. ... and television shows.
+    uuid = lookup_folded_name(title, "tvseries") # Spelling variants of known entries resolve in memory
+    if uuid is not None:
+        return uuid
+
+    statement = "select tvseriesid from tvseries where tvseriespageid = '0' and tvseriestitle = %s;"
+    cursor.execute(statement, (title,))
+    if cursor.rowcount > 0:
+        return cursor.fetchone()[0] # Check for possible duplicate, if it already exists, we return the uuid
+
+    statement = "INSERT INTO tvseries (tvseriespageid, tvseriestitle) VALUES ('0', %s)"
+    cursor.execute(statement, (title,))
+    statement = "select tvseriesid from tvseries where tvseriespageid = '0' and tvseriestitle = %s;"
+    cursor.execute(statement, (title,))
+    logger.debug("INSERTing tvseries %s.", title)
+    uuid = cursor.fetchone()[0]
+    add_folded_name(title, "tvseries", uuid)
+    return uuid
+
+def get_redirect_pageid(pageid):
+    # Look up whether the pageid is a redirect to a different pageid. If not, return it unchanged
+    statement = "SELECT topageid FROM redirects WHERE frompageid = %s"
+    cursor.execute(statement, (pageid,))
+    if cursor.rowcount == 1:
+        return cursor.fetchone()[0]
+    else:
+        return pageid
+    
+def handle_disambiguation_page(title, date, table):
+    # Attempt to make sense of disambiguation pages in order to find the page they correspond with, e.g. 'Weekend (2011)'.
+    # Returns its uuid in table. Dated titles that can't be resolved either are remembered by resolve_link().
+    title = title.replace(" ", "_")
+    url = f"/wiki/{title}_({date})"
+    return resolve_link(url, table)
+
+# In-memory link resolution index. Maps normalized page titles and page ids to entity uuids, so that links in
+# appearance tables can mostly be resolved without asking the API or the database. Filled by load_link_resolver().
+link_resolver_dict = {
+    "titles" : {"actors" : {}, "movies" : {}, "tvseries" : {}}, # normalized title -> uuid
+    "pageids" : {"actors" : {}, "movies" : {}, "tvseries" : {}}, # pageid -> uuid
+    "redirect_titles" : {}, # normalized redirect title -> target pageid
+    "redirect_pageids" : {}, # redirect pageid -> target pageid
+    "folded_names" : {"actors" : {}, "movies" : {}, "tvseries" : {}}, # folded name key -> uuid, None if the key is ambiguous
+    "negative" : {"actors" : {}, "movies" : {}, "tvseries" : {}}, # normalized title -> reason it can't be resolved, see record_negative_lookup()
+    "negative_hits" : {}, # (table, title) -> links answered by a negative entry since the hits were last written
+    "journal" : [], # (index, table, key, existed, previous value) of every folded name or negative lookup added by the current page, see run_page()
+    "state" : None # Versions of the data the resolver was loaded from, see get_resolver_state()
+}
+
+def normalize_wiki_title(title):
+    # Brings a page title or the title part of a '/wiki/Title' href into the form MediaWiki uses for page titles
+    if title is None:
+        return None
+    title = unquote(title).split("#")[0] # HTML anchors need to be stripped
+    title = " ".join(title.replace("_", " ").split())
+    if title == "":
+        return None
+    return title[0].upper() + title[1:] # MediaWiki always capitalizes the first letter
+
+def fold_name_key(name):
+    # Folds a name or title into a key that is equal for spelling variants, e.g. 'Téa Leoni', 'Tea Leoni' and 'tea  leoni'.
+    # Accents are stripped, case is folded and any run of whitespace or punctuation collapses into a single space.
+    if name is None:
+        return None
+    name = unicodedata.normalize("NFKD", str(name))
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    name = re.sub(r"[\W_]+", " ", name.casefold()).strip()
+    if name == "":
+        return None
+    return name
+
+def add_folded_name(name, table, uuid):
+    # Registers a name in the folded name index. Keys shared by different entities are marked ambiguous and never resolved.
+    key = fold_name_key(name)
+    if key is None:
+        return
+    folded_names = link_resolver_dict["folded_names"][table]
+    link_resolver_dict["journal"].append(("folded_names", table, key, key in folded_names, folded_names.get(key)))
+    if key in folded_names and folded_names[key] != uuid:
+        folded_names[key] = None
+    else:
+        folded_names[key] = uuid
+
+def undo_resolver_journal():
+    # Removes the folded names and negative lookups added since the journal was last cleared, when the rows they point to
+    # or were stored in were rolled back
+    for index, table, key, existed, previous in reversed(link_resolver_dict["journal"]):
+        if existed:
+            link_resolver_dict[index][table][key] = previous
+        else:
+            link_resolver_dict[index][table].pop(key, None)
+    link_resolver_dict["journal"].clear()
+
+def lookup_folded_name(name, table):
+    # Returns the uuid of the entity in table whose name folds to the same key as name, or None
+    key = fold_name_key(name)
+    if key is None:
+        return None
+    uuid = link_resolver_dict["folded_names"][table].get(key)
+    count_metric("imfdb_cache_lookups_total", cache="folded_names", result="miss" if uuid is None else "hit")
+    return uuid
+
+# Links that can't be resolved are remembered in the negativelookups table with the reason, so later links to the same
+# title are answered without asking the API or the database. Entries expire after this many days and are tried again.
+negative_lookup_ttl_days = float(os.environ.get("IMFDB_NEGATIVE_TTL_DAYS", "30"))
+
+def get_utc_timestamp(seconds_ago=0):
+    # A timestamp in the format of timestamp columns, e.g. '2023-04-18 12:00:00', which compares correctly as text in SQLite
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - seconds_ago))
+
+def load_negative_lookups():
+    # Drops the expired negative lookups and loads the others into the link resolver
+    statement = "DELETE FROM negativelookups WHERE lookuptime < %s"
+    cursor.execute(statement, (get_utc_timestamp(negative_lookup_ttl_days * 86400),))
+    if cursor.rowcount > 0:
+        record_stage_version("negativelookups") # Links that failed may resolve now, see get_resolver_state()
+    for negative in link_resolver_dict["negative"].values():
+        negative.clear()
+    statement = "SELECT lookuptable, title, reason FROM negativelookups"
+    cursor.execute(statement)
+    for table, title, reason in cursor.fetchall():
+        if table in link_resolver_dict["negative"]:
+            link_resolver_dict["negative"][table][title] = reason
+    cnx.commit()
+
+def record_negative_lookup(title, table, reason, pageid=None):
+    # Remembers that links to title can't be resolved in table. reason is 'missing' if there is no such page, 'unlisted'
+    # if the page isn't in the table, or 'disambiguation' for disambiguation pages, which are resolved by title and year.
+    negative = link_resolver_dict["negative"][table]
+    link_resolver_dict["journal"].append(("negative", table, title, title in negative, negative.get(title)))
+    negative[title] = reason
+    statement = """INSERT INTO negativelookups (lookuptable, title, reason, pageid, lookuptime) VALUES (%s, %s, %s, %s, %s)
+                   ON CONFLICT (lookuptable, title) DO UPDATE SET reason = excluded.reason, pageid = excluded.pageid, lookuptime = excluded.lookuptime"""
+    cursor.execute(statement, (table, title, reason, pageid, get_utc_timestamp()))
+    count_metric("imfdb_negative_lookups_total", table=table, reason=reason)
+
+def get_negative_lookup(link, table):
+    # Returns the reason a '/wiki/Title' link can't be resolved in table, None if it isn't known to fail
+    return link_resolver_dict["negative"][table].get(get_title_from_url(link))
+
+def write_negative_lookup_hits():
+    # Adds the hits counted since the last call to the negativelookups table
+    statement = "UPDATE negativelookups SET hits = hits + %s WHERE lookuptable = %s AND title = %s"
+    get_cursor().executemany(statement, [(hits, table, title) for (table, title), hits in link_resolver_dict["negative_hits"].items()])
+    link_resolver_dict["negative_hits"].clear()
+    cnx.commit()
+
+def get_negative_lookup_report():
+    # Returns (table, title, reason, pageid, hits, lookuptime) of every negative lookup, most hit first, for patching them by hand
+    statement = "SELECT lookuptable, title, reason, pageid, hits, lookuptime FROM negativelookups ORDER BY hits DESC, lookuptable, title"
+    cursor.execute(statement)
+    return cursor.fetchall()
+
+def get_title_from_url(url):
+    # url must take the form of '/wiki/Elke_Sommer'
+    match = re.match(r"^(\/wiki\/)(.*)$", url)
+    if match:
+        return normalize_wiki_title(match.group(2))
+    return None
+
+def load_link_resolver():
+    # Preload titles, page ids and redirects of all pages we already have locally. Call this once per run before resolving links.
+    for table in ["actors", "movies", "tvseries"]:
+        link_resolver_dict["titles"][table].clear()
+        link_resolver_dict["pageids"][table].clear()
+        link_resolver_dict["folded_names"][table].clear()
+        if table == "tvseries":
+            prefix = table
+        else:
+            prefix = table.rstrip("s")
+        title_col = "actorname" if table == "actors" else f"{prefix}title"
+        statement = f"SELECT {prefix}id, {prefix}pageid, {title_col} FROM {table}"
+        cursor.execute(statement)
+        rows = cursor.fetchall()
+        for uuid, pageid, title in rows:
+            if pageid == "0": # Entries without a page are only known by their folded names, see below
+                continue
+            link_resolver_dict["pageids"][table][str(pageid)] = uuid
+            link_resolver_dict["titles"][table][normalize_wiki_title(title)] = uuid
+            add_folded_name(title, table, uuid)
+        # Entries without a page only fill gaps, so a spelling variant always resolves to the actual page if there is one
+        for uuid, pageid, title in rows:
+            if pageid == "0" and lookup_folded_name(title, table) is None:
+                add_folded_name(title, table, uuid)
+
+    link_resolver_dict["redirect_titles"].clear()
+    link_resolver_dict["redirect_pageids"].clear()
+    statement = "SELECT frompageid, fromtitle, topageid FROM redirects"
+    cursor.execute(statement)
+    for frompageid, fromtitle, topageid in cursor.fetchall():
+        link_resolver_dict["redirect_pageids"][str(frompageid)] = str(topageid)
+        link_resolver_dict["redirect_titles"][normalize_wiki_title(fromtitle)] = str(topageid)
+
+    load_negative_lookups()
+    # What links resolve to only changes when one of these stages ran again or negative lookups expired
+    statement = "SELECT stage, version FROM stageversions WHERE stage IN ('actors', 'movies', 'tvseries', 'redirects', 'negativelookups') ORDER BY stage"
+    cursor.execute(statement)
+    link_resolver_dict["state"] = ",".join(f"{stage}:{version}" for stage, version in cursor.fetchall())
+    cnx.commit()
+    logger.info("Loaded %s titles, %s redirects and %s negative lookups.", sum(len(titles) for titles in link_resolver_dict['titles'].values()),
+                len(link_resolver_dict['redirect_pageids']), sum(len(negative) for negative in link_resolver_dict['negative'].values()))
+
+def get_resolver_state():
+    # The state of the link resolver's data, which appearance rows are recorded with in extractedpages, so the rows of
+    # unchanged pages are written again after the titles, redirects or negative lookups they were resolved with changed
+    return link_resolver_dict["state"]
+
+def follow_redirect_pageids(pageid):
+    # Follows a chain of redirects in the local index and returns the final page id. Returns the page id unchanged if it isn't a redirect.
+    seen = set()
+    while pageid in link_resolver_dict["redirect_pageids"] and pageid not in seen:
+        seen.add(pageid)
+        pageid = link_resolver_dict["redirect_pageids"][pageid]
+    return pageid
+
+def resolve_link(link, table):
+    # Resolves a '/wiki/Title' href to the uuid of an entity in table (actors, movies, tvseries).
+    # The local index is checked first, the API is only asked for true misses.
+    title = get_title_from_url(link)
+    if title is None:
+        logger.error("No title could be found for url '%s'!", link)
+        return None
+
+    uuid = link_resolver_dict["titles"][table].get(title)
+    if uuid is not None:
+        count_metric("imfdb_cache_lookups_total", cache="link_resolver", result="hit")
+        return uuid
+
+    if title in link_resolver_dict["negative"][table]: # Known to fail, neither the API nor the database is asked again
+        count_metric("imfdb_cache_lookups_total", cache="link_resolver", result="negative_hit")
+        key = (table, title)
+        link_resolver_dict["negative_hits"][key] = link_resolver_dict["negative_hits"].get(key, 0) + 1
+        return None
+
+    pageid = link_resolver_dict["redirect_titles"].get(title)
+    if pageid is None: # Accent and spelling variants of known pages resolve without a redirect
+        uuid = lookup_folded_name(title, table)
+        if uuid is not None:
+            count_metric("imfdb_cache_lookups_total", cache="link_resolver", result="folded_hit")
+            link_resolver_dict["titles"][table][title] = uuid
+            return uuid
+    if pageid is None: # True miss, ask the API
+        count_metric("imfdb_cache_lookups_total", cache="link_resolver", result="miss")
+        pageid = get_page_id_by_url(link, "json")
+        if pageid is None:
+            return None
+        if str(pageid).startswith("-"): # The API keys missing pages by negative numbers
+            record_negative_lookup(title, table, "missing")
+            return None
+    else:
+        count_metric("imfdb_cache_lookups_total", cache="link_resolver", result="redirect_hit")
+    pageid = follow_redirect_pageids(str(pageid))
+
+    uuid = link_resolver_dict["pageids"][table].get(pageid)
+    if uuid is None: # The page may have been inserted after the index was loaded
+        uuid = get_uuid_by_pageid(pageid, table)
+        if uuid is None:
+            record_negative_lookup(title, table, "unlisted", pageid)
+            return None
+        link_resolver_dict["pageids"][table][pageid] = uuid
+
+    # Remember the title so that further links to this page are resolved locally
+    link_resolver_dict["titles"][table][title] = uuid
+    return uuid
+
+# Appearance tables found on firearm pages and how their rows are routed into the junction tables.
+# Column regexes are checked in order, so the first matching role wins. Further media (e.g. 'Video Games')
+# can be added here once there are tables to route them to.
+appearance_tables_dict = {
+    "Film" : {
+        "media_table" : "movies",
+        "junction_statement" : "INSERT INTO movies_actors_firearms (movieid, firearmid, character, note, year, actorid) VALUES (%s, %s, %s, %s, %s, %s)",
+        "insert_without_page" : insert_movie_without_page,
+        "year_as_int" : True, # movies_actors_firearms.year is a smallint
+        "column_regexes" : {
+            "title" : re.compile('.*(Title|Film|Movie|Titla).*', re.IGNORECASE),
+            "actor" : re.compile('.*Actor.*', re.IGNORECASE),
+            "character" : re.compile('.*(Character|Charcter).*', re.IGNORECASE),
+            "note" : re.compile('.*(Note|Notation).*', re.IGNORECASE),
+            "date" : re.compile('.*(Date|Year).*', re.IGNORECASE)
+        }
+    },
+    "Television" : {
+        "media_table" : "tvseries",
+        "junction_statement" : "INSERT INTO tvseries_actors_firearms (tvseriesid, firearmid, character, note, year, actorid) VALUES (%s, %s, %s, %s, %s, %s)",
+        "insert_without_page" : insert_tvseries_without_page,
+        "year_as_int" : False, # tvseries_actors_firearms.year is a varchar, since series run over several years
+        "column_regexes" : {
+            "title" : re.compile('.*(Title|Series|Show|Serie|Titla).*', re.IGNORECASE),
+            "actor" : re.compile('.*Actor.*', re.IGNORECASE),
+            "character" : re.compile('.*(Character|Charcter).*', re.IGNORECASE),
+            "note" : re.compile('.*(Note|Notation|Episode|Episodes).*', re.IGNORECASE),
+            "date" : re.compile('.*(Date|Year|Air|Run|Release).*', re.IGNORECASE)
+        }
+    }
+}
+
+@record_timing("imfdb_parse_seconds")
+def classify_appearance_columns(df, table_name):
+    # Columns don't have consistent naming, so we have do go through this and match them with regex.
+    # Returns a dict mapping each role ('title', 'actor', ...) to the matching column name or None.
+    columns = dict.fromkeys(appearance_tables_dict[table_name]["column_regexes"])
+    for col_name in df.columns:
+        for role, regex in appearance_tables_dict[table_name]["column_regexes"].items():
+            if regex.match(col_name):
+                columns[role] = col_name
+                break
+    return columns
+
+def is_valid_link(link):
+    # Links to missing pages (redlinks) or empty cells can't be resolved to a page id
+    return link is not None and link != "" and "redlink=1" not in link
+
+def insert_appearances_from_dataframe(df, table_name, firearm, dummy_uuid):
+    # Extract the row values of a single appearance table and INSERT them into the junction table it is routed to
+    uuid = firearm[0]
+    route = appearance_tables_dict[table_name]
+    media_table = route["media_table"]
+
+    columns = classify_appearance_columns(df, table_name)
+    title_col_name = columns["title"]
+    actor_col_name = columns["actor"]
+    character_col_name = columns["character"]
+    note_col_name = columns["note"]
+    date_col_name = columns["date"]
+
+    if any(var is None for var in columns.values()):
+        logger.warning("The html content in '%s' has one or more unmatched columns in its '%s' table", uuid, table_name)
+
+    for i in range(len(df.index)):
+        title = actor = character = note = date = "NULL"
+        actor_link = None
+        title = (df[title_col_name][i])[0]
+        title_link = (df[title_col_name][i])[1]
+        if actor_col_name is not None:
+            actor = (df[actor_col_name][i])[0]
+            actor_link = (df[actor_col_name][i])[1]
+        character = (df[character_col_name][i])[0]
+        if note_col_name is not None:
+            note = (df[note_col_name][i])[0]
+        if type(df[date_col_name][i]) == float: # This applies if the page author used rowspan but forgot to include an empty note column
+            match = re.match(r"\d{4}", note)
+            if match:
+                date = note
+        else:
+            date = (df[date_col_name][i])[0]
+
+        # Page id's can be assigned using the second element of each tuple, which may contain an html link found in each cell.
+        # This is only attempted when the actor and title columns actually contain a valid title or actor.
+        if (not(pd.isna(actor) or actor is None)) and (actor not in actor_false_positives): # Actor name is valid
+            if is_valid_link(actor_link): # Actor name is linked to an IMFDB wiki page
+                actor_uuid = resolve_link(actor_link, "actors")
+                if actor_uuid is None and get_negative_lookup(actor_link, "actors") == "missing": # Links from wikitext don't mark redlinks
+                    actor_uuid = insert_actor_without_page(actor)
+            else: # If we have a valid actor name, but it is not linked to a page, we insert the actor into the database with pageid 0
+                actor_uuid = insert_actor_without_page(actor)
+
+        if not (pd.isna(title) or title == "" or title is None): # Title is not blank
+            if is_valid_link(title_link): # Title is linked to an IMFDB wiki page
+                known = get_negative_lookup(title_link, media_table)
+                title_uuid = resolve_link(title_link, media_table)
+                reason = get_negative_lookup(title_link, media_table)
+                if title_uuid is None and reason == "missing": # Links from wikitext don't mark redlinks
+                    title_uuid = route["insert_without_page"](title)
+                # If the link can't be resolved, check if it points to a disambiguation page. Pages we know locally never are one,
+                # and links that failed before were checked the first time.
+                elif title_uuid is None and (reason == "disambiguation" or (known is None and is_disambiguation_page(title_link))):
+                    if reason != "disambiguation":
+                        record_negative_lookup(get_title_from_url(title_link), media_table, "disambiguation")
+                    title_uuid = handle_disambiguation_page(title, date, media_table)
+            else: # If we have a title that's not blank, but it is not linked to a page, we insert it into the database with pageid 0
+                title_uuid = route["insert_without_page"](title)
+
+        # Some of the values may be NaN. We set those to NULL
+        if pd.isna(title) or title == "" or title is None:
+            title_uuid = None
+        if pd.isna(actor) or actor == "" or actor is None or actor in actor_false_positives:
+            actor_uuid = dummy_uuid
+        if pd.isna(character) or character == "":
+            character = None
+        if pd.isna(note) or note == "":
+            note = None
+        if pd.isna(date) or date == "":
+            date = None
+        elif route["year_as_int"]:
+            date = int(date)
+
+        # If after error handling the the title_uuid is can still not be determined, we skip the table row
+        if title_uuid == "" or title_uuid is None:
+            logger.warning("Skipping entire table row %s appearence in %s used by %s!", firearm[3], title, actor)
+            continue
+
+        logger.debug("INSERTing %s %s appearence in %s used by %s in %s", firearm[3], table_name, title, actor, date)
+        queue_write(route["junction_statement"], (title_uuid, uuid, character, note, date, actor_uuid))
+
+def extract_appearance_tables(html_content, uuid):
+    # Returns the appearance tables of a page by name, each as the columns and rows of its data frame or None if the page
+    # doesn't have it. Cells are (text, link) pairs or NaN.
+    soup = parse_html(html_content)
+    tables = {}
+    for table_name in appearance_tables_dict:
+        df = extract_dataframe_from_soup(soup, table_name, uuid)
+        tables[table_name] = None if df is None else {"columns" : list(df.columns), "rows" : df.values.tolist()}
+    return tables
+
+def get_dataframe_from_extraction(table):
+    # Turns a table of extract_appearance_tables() back into its data frame. JSON stores tuples as lists.
+    columns = [tuple(column) if isinstance(column, list) else column for column in table["columns"]]
+    rows = [[tuple(cell) if isinstance(cell, list) else cell for cell in row] for row in table["rows"]]
+    return pd.DataFrame(rows, columns=columns)
+
+def populate_firearm_appearances(firearm, dummy_uuid):
+    # Inserts the appearances in all tables of a single firearm page
+    uuid = firearm[0]
+    logger.debug("Currently working on appearances of %s", uuid)
+    skipped, tables = extract_page("appearances", uuid, firearm[3], get_firearm_html(firearm), uuid)
+    if skipped:
+        return
+    for table_name, table in tables.items():
+        if table is None:
+            continue
+        insert_appearances_from_dataframe(get_dataframe_from_extraction(table), table_name, firearm, dummy_uuid)
+
+def populate_appearances_tables(dummy_uuid):
+    # Populate all junction tables linking appearances of firearms in movies, television etc. to their actors.
+    # Every firearm page is fetched and parsed once and all of its appearance tables are extracted in the same pass.
+
+    statement = "SELECT * FROM firearms ORDER BY firearmpageid ASC"
+    cursor.execute(statement)
+    firearms = cursor.fetchall()
+
+    checkpoints = load_checkpoints("appearances") # Firearms finished by a previous, interrupted run
+
+    for firearm in firearms:
+        uuid = firearm[0]
+        if str(uuid) in checkpoints:
+            logger.debug("Skipping %s...", uuid)
+            continue
+        if not is_selected_page("appearances", uuid):
+            continue
+        run_page("appearances", uuid, populate_firearm_appearances, firearm, dummy_uuid, size=get_firearm_size(firearm))
+
+        # One checkpoint per firearm, covering all of its appearance tables
+        write_checkpoint("appearances", uuid)
+        commit_writes()
+    write_negative_lookup_hits()
+    clear_checkpoints("appearances")
+    flush_writes()
+    return
+
+@record_timing("imfdb_parse_seconds")
+def extract_images_from_html(html):
+    # Returns a list of URLs of all image tags in the given HTML
+    soup = BeautifulSoup(html, 'html.parser')
+    image_urls = [img['src'] for img in soup.find_all('img')]
+    return image_urls
+
+# Images that are part of the wiki skin rather than the article
+ignored_image_urls = ["/images/thumb/4/4b/Discord-logo.jpg/20px-Discord-logo.jpg", "/resources/assets/poweredby_mediawiki_88x31.png"]
+
+# The per-entity image tables and the entity tables their rows belong to
+image_tables_dict = {
+    "actors" : {"image_table" : "actorimages", "id" : "actorid", "pageid" : "actorpageid"},
+    "firearms" : {"image_table" : "firearmimages", "id" : "firearmid", "pageid" : "firearmpageid"},
+    "movies" : {"image_table" : "movieimages", "id" : "movieid", "pageid" : "moviepageid"},
+    "tvseries" : {"image_table" : "tvseriesimages", "id" : "tvseriesid", "pageid" : "tvseriespageid"}
+}
+
+def insert_page_images(table, uuid, pageid, html):
+    # Inserts the URLs of all images on a single page of table
+    image_table = image_tables_dict[table]["image_table"]
+    id = image_tables_dict[table]["id"]
+    skipped, urls = extract_page(image_table, uuid, pageid, html)
+    if skipped or urls is None:
+        return
+    for url in dict.fromkeys(urls): # Drop repeated images on the same page, keeping their order
+        if url in ignored_image_urls:
+            continue
+        logger.debug("INSERTING image with url '%s' appearing in %s %s", url, table, uuid)
+        statement = f"INSERT INTO {image_table} (imageurl, {id}) VALUES (%s, %s)"
+        queue_write(statement, (f"https://imfdb.org{url}", uuid))
+
+def populate_entity_images_table(table):
+    # Stores the URLs of all images appearing on the pages in table (actors, firearms, movies, tvseries). Every image is stored once per page.
+    image_table = image_tables_dict[table]["image_table"]
+    id = image_tables_dict[table]["id"]
+    statement = f"SELECT {id}, {image_tables_dict[table]['pageid']} FROM {table}"
+    cursor.execute(statement)
+    entities = cursor.fetchall()
+    checkpoints = load_checkpoints(image_table) # Pages finished by a previous, interrupted run
+
+    for entity in entities:
+        uuid, pageid = entity
+        if str(uuid) in checkpoints or not is_selected_page("images", uuid):
+            continue
+        logger.debug("Currently working on images in %s %s", table, uuid)
+        html = get_page_content_from_db_by_uuid(uuid, table)
+        if html is None:
+            continue
+        run_page("images", uuid, insert_page_images, table, uuid, pageid, html, size=len(html))
+        write_checkpoint(image_table, uuid)
+        commit_writes()
+    clear_checkpoints(image_table)
+    flush_writes() # populate_images_table() reads the image tables
+    return
+
+def populate_actor_images_table():
+    populate_entity_images_table("actors")
+
+def populate_firearm_images_table():
+    populate_entity_images_table("firearms")
+
+def populate_movie_images_table():
+    populate_entity_images_table("movies")
+
+def populate_tvseries_images_table():
+    populate_entity_images_table("tvseries")
+
+# Derived results. The specifications, multi-gun splits, appearance tables and image lists of a page only depend on its
+# html, so every result is stored in the extractions table by the SHA-256 of the html and the version of its extractor,
+# and reused for any page with the same content. The extractedpages table records the content each page's rows were
+# written from: pages whose content and extractor version are unchanged are skipped, the rows of changed pages are
+# deleted and written again. Bump the version of an extractor whenever a change alters its results.
+extractors_dict = {
+    "specification" : {
+        "function" : get_single_specification,
+        "version" : 2, # 2: leading dots of imperial calibers
+        "derived" : ["DELETE FROM specificationcalibers WHERE firearmid = %s",
+                     "DELETE FROM specificationattributes WHERE firearmid = %s",
+                     "DELETE FROM specifications WHERE firearmid = %s"]
+    },
+    "family_specification" : {
+        "function" : get_family_specification,
+        "version" : 2, # 2: leading dots of imperial calibers
+        "derived" : ["DELETE FROM specificationcalibers WHERE firearmid = %s",
+                     "DELETE FROM specificationattributes WHERE firearmid = %s",
+                     "DELETE FROM specifications WHERE firearmid = %s"]
+    },
+    "multi" : { # The children of a family page, along with everything extracted from them
+        "function" : split_multi_gun_page,
+        "version" : 1,
+        "derived" : [f"DELETE FROM {table} WHERE firearmid IN (SELECT firearmid FROM firearms WHERE parentfirearmid = %s)"
+                     for table in ["specificationcalibers", "specificationattributes", "specifications", "movies_actors_firearms",
+                                   "tvseries_actors_firearms", "firearmimages"]]
+                    + ["DELETE FROM extractedpages WHERE entityid IN (SELECT CAST(firearmid AS varchar) FROM firearms WHERE parentfirearmid = %s)",
+                       "DELETE FROM firearms WHERE parentfirearmid = %s"]
+    },
+    "appearances" : {
+        "function" : extract_appearance_tables,
+        "version" : 1,
+        "state" : get_resolver_state, # Rows depend on what the links of a page resolve to
+        "derived" : ["DELETE FROM movies_actors_firearms WHERE firearmid = %s",
+                     "DELETE FROM tvseries_actors_firearms WHERE firearmid = %s"]
+    }
+}
+for image_table in image_tables_dict.values(): # One extractor per image table, named after it
+    extractors_dict[image_table["image_table"]] = {
+        "function" : extract_images_from_html,
+        "version" : 1,
+        "derived" : [f"DELETE FROM {image_table['image_table']} WHERE {image_table['id']} = %s"]
+    }
+
+def get_content_hash(html_content):
+    return hashlib.sha256((html_content or "").encode("utf-8")).hexdigest()
+
+def get_extraction(extractor, html_content, *args):
+    # Returns the result of an extractor for html_content, from the extractions table if the same version extracted it
+    # before. Further arguments are passed to the extractor, they must not change its result.
+    definition = extractors_dict[extractor]
+    sha256 = get_content_hash(html_content)
+    statement = "SELECT result FROM extractions WHERE extractor = %s AND sha256 = %s AND version = %s"
+    cursor.execute(statement, (extractor, sha256, definition["version"]))
+    row = cursor.fetchone()
+    if row is not None:
+        count_metric("imfdb_cache_lookups_total", cache="extractions", result="hit")
+        return json.loads(row[0])
+    count_metric("imfdb_cache_lookups_total", cache="extractions", result="miss")
+    result = definition["function"](html_content, *args)
+    statement = """INSERT INTO extractions (extractor, sha256, version, result, extracttime) VALUES (%s, %s, %s, %s, %s)
+                   ON CONFLICT (extractor, sha256) DO UPDATE SET version = excluded.version, result = excluded.result, extracttime = excluded.extracttime"""
+    queue_write(statement, (extractor, sha256, definition["version"], json.dumps(result), get_utc_timestamp()))
+    return json.loads(json.dumps(result)) # The same types as a stored result, e.g. lists instead of tuples
+
+def extract_page(extractor, entityid, pageid, html_content, *args):
+    # Returns (skipped, result) for the content of page pageid, whose rows belong to the row entityid. skipped is True if
+    # they were written for entityid from the same content by the same extractor version (and in the same state, for
+    # extractors that have one), and they are left as they are. Otherwise the previous rows of entityid are deleted, so
+    # the caller can write them again from result, see get_extraction().
+    definition = extractors_dict[extractor]
+    sha256 = get_content_hash(html_content)
+    state = definition["state"]() if "state" in definition else None
+    statement = "SELECT version, entityid, state FROM extractedpages WHERE extractor = %s AND pageid = %s AND sha256 = %s"
+    cursor.execute(statement, (extractor, str(pageid), sha256))
+    row = cursor.fetchone()
+    if row is not None and tuple(row) == (definition["version"], str(entityid), state):
+        count_metric("imfdb_extracted_pages_total", extractor=extractor, result="unchanged")
+        return True, None
+    statement = "SELECT count(*) FROM extractedpages WHERE extractor = %s AND entityid = %s"
+    cursor.execute(statement, (extractor, str(entityid)))
+    changed = cursor.fetchone()[0] > 0
+    if changed:
+        for statement in definition["derived"]:
+            cursor.execute(statement, (entityid,))
+    count_metric("imfdb_extracted_pages_total", extractor=extractor, result="changed" if changed else "new")
+    result = get_extraction(extractor, html_content, *args)
+    # Replaces the record of the previous content of entityid and any record of this content for another row, along with the rows of the page
+    statement = "DELETE FROM extractedpages WHERE extractor = %s AND (entityid = %s OR (pageid = %s AND sha256 = %s))"
+    queue_write(statement, (extractor, str(entityid), str(pageid), sha256))
+    statement = "INSERT INTO extractedpages (extractor, pageid, sha256, version, entityid, state) VALUES (%s, %s, %s, %s, %s, %s)"
+    queue_write(statement, (extractor, str(pageid), sha256, definition["version"], str(entityid), state))
+    return False, result
+
+def get_image_filename(url):
+    # Returns the wiki file name of an image url, e.g. 'Foo.jpg' for both
+    # 'https://imfdb.org/images/thumb/4/4b/Foo.jpg/600px-Foo.jpg' and 'https://imfdb.org/images/4/4b/Foo.jpg'
+    match = re.search(r"/images/(?:thumb/)?[0-9a-f]/[0-9a-f]{2}/([^/]+)", url)
+    if match is None:
+        return None
+    return normalize_wiki_title(match.group(1))
+
+def query_imageinfo(filenames):
+    # Queries sha1, size, dimensions and mime type of the given files, 50 titles at a time (the API limit per request).
+    # Returns a dict mapping each file name to its image info. Missing files are left out.
+    imageinfo = {}
+    for i in range(0, len(filenames), 50):
+        batch = filenames[i:i + 50]
+        titles = quote("|".join(f"File:{filename}" for filename in batch))
+        data = api_request(f"{imfdb_url}/api.php?action=query&prop=imageinfo&iiprop=sha1|size|mime|url&titles={titles}&format=json")
+        if data is None:
+            logger.error("Data is None for batch starting with '%s'!", batch[0])
+            continue
+        for page in data["query"]["pages"].values():
+            if "imageinfo" not in page:
+                logger.warning("No image info for '%s'!", page['title'])
+                continue
+            imageinfo[page["title"].split(":", 1)[1]] = page["imageinfo"][0]
+        time.sleep(0.1)
+    return imageinfo
+
+def populate_images_table():
+    # Harvests the metadata of every distinct image in the per-entity image tables and stores each image once, identified by its sha1.
+    # Files with identical content share one row. The per-entity tables are then linked to it through their imageid column.
+    imageurls = []
+    for table in image_tables_dict.values():
+        statement = f"SELECT DISTINCT imageurl FROM {table['image_table']}"
+        cursor.execute(statement)
+        imageurls.extend(row[0] for row in cursor.fetchall())
+
+    url_filenames = {}
+    for url in dict.fromkeys(imageurls):
+        filename = get_image_filename(url)
+        if filename is not None:
+            url_filenames[url] = filename
+    filenames = list(dict.fromkeys(url_filenames.values()))
+    logger.info("Querying image info for %s files in %s image urls.", len(filenames), len(imageurls))
+    imageinfo = query_imageinfo(filenames)
+
+    # Store each image once. Images that are already known by their sha1 are reused.
+    filename_imageids = {}
+    for filename, info in imageinfo.items():
+        statement = "INSERT INTO images (sha1, filename, imagesize, width, height, mime, url) VALUES (%s, %s, %s, %s, %s, %s, %s) ON CONFLICT (sha1) DO NOTHING"
+        cursor.execute(statement, (info["sha1"], filename, info["size"], info["width"], info["height"], info["mime"], info["url"]))
+        statement = "SELECT imageid FROM images WHERE sha1 = %s"
+        cursor.execute(statement, (info["sha1"],))
+        filename_imageids[filename] = cursor.fetchone()[0]
+
+    # Link the per-entity tables in one UPDATE each
+    statement = "DROP TABLE IF EXISTS imageurlids"
+    cursor.execute(statement)
+    statement = "CREATE TEMPORARY TABLE imageurlids (imageurl character varying PRIMARY KEY, imageid uuid NOT NULL) ON COMMIT DROP"
+    cursor.execute(statement)
+    statement = "INSERT INTO imageurlids (imageurl, imageid) VALUES %s"
+    execute_values(statement, [(url, filename_imageids[filename]) for url, filename in url_filenames.items() if filename in filename_imageids])
+    for table in image_tables_dict.values():
+        statement = f"UPDATE {table['image_table']} AS t SET imageid = i.imageid FROM imageurlids i WHERE t.imageurl = i.imageurl"
+        cursor.execute(statement)
+    cnx.commit()
+
+# Local copies of the images. The optional downloads stage fetches every distinct url of the per-entity image tables
+# through a pooled session, with a rate shared by all download threads, and stores each file once under the SHA-256 of
+# its content: <directory>/ab/cd/abcd...jpg. Interrupted downloads continue from their partial file with a Range
+# request. Urls that already have a file are skipped, failed ones are quarantined like pages.
+download_dict = {
+    "directory" : os.environ.get("IMFDB_IMAGE_DIR", "images"),
+    "base_url" : os.environ.get("IMFDB_IMAGE_URL", imfdb_url).rstrip("/"), # Where the paths of image urls are fetched from
+    "threads" : int(os.environ.get("IMFDB_DOWNLOAD_THREADS", "4")),
+    "rate" : float(os.environ.get("IMFDB_DOWNLOAD_RATE", "5")), # Requests per second of all threads together, 0 for no limit
+    "chunk_size" : 64 * 1024,
+    "session" : None,
+    "next_request" : 0.0,
+    "lock" : threading.Lock()
+}
+
+def get_download_session():
+    # One session for all download threads, so connections to the image host are pooled and reused
+    with download_dict["lock"]:
+        if download_dict["session"] is None:
+            session = requests.Session()
+            retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, download_dict["threads"]), max_retries=retries)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            download_dict["session"] = session
+        return download_dict["session"]
+
+def wait_for_download_slot():
+    # Spaces the requests of all threads evenly at the configured rate
+    if download_dict["rate"] <= 0:
+        return
+    with download_dict["lock"]:
+        now = time.monotonic()
+        start = max(now, download_dict["next_request"])
+        download_dict["next_request"] = start + 1 / download_dict["rate"]
+    time.sleep(start - now)
+
+def get_image_store_path(sha256, url):
+    # Path of a file relative to the image store, keeping the extension of its url
+    extension = os.path.splitext(urlsplit(url).path)[1].lower()
+    if not re.fullmatch(r"\.[a-z0-9]{1,5}", extension):
+        extension = ""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+@record_timing("imfdb_download_seconds")
+def download_image(url):
+    # Downloads an image url into the store and returns (sha256, localpath, size, mime). A partial file left by an earlier
+    # attempt is continued if the server supports ranges and started over if it doesn't.
+    directory = download_dict["directory"]
+    partial = os.path.join(directory, "partial", hashlib.sha1(url.encode()).hexdigest())
+    os.makedirs(os.path.dirname(partial), exist_ok=True)
+    offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+    wait_for_download_slot()
+    headers = {"Range" : f"bytes={offset}-"} if offset > 0 else {}
+    start = time.perf_counter()
+    with get_download_session().get(download_dict["base_url"] + urlsplit(url).path, headers=headers, stream=True, timeout=60) as response:
+        count_metric("imfdb_http_requests_total", endpoint="image", status=response.status_code)
+        if response.status_code == 416: # The partial file is already complete
+            offset = -1
+        elif response.status_code not in (200, 206):
+            raise RuntimeError(f"Download of {url} failed with status code {response.status_code}")
+        else:
+            if response.status_code == 200:
+                offset = 0
+            with open(partial, "ab" if offset > 0 else "wb") as file:
+                for chunk in response.iter_content(download_dict["chunk_size"]):
+                    file.write(chunk)
+                    count_metric("imfdb_http_received_bytes_total", len(chunk), endpoint="image")
+        mime = response.headers.get("Content-Type")
+    observe_metric("imfdb_http_request_seconds", time.perf_counter() - start, endpoint="image")
+
+    digest = hashlib.sha256()
+    with open(partial, "rb") as file:
+        for chunk in iter(lambda: file.read(download_dict["chunk_size"]), b""):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+    size = os.path.getsize(partial)
+    localpath = get_image_store_path(sha256, url)
+    target = os.path.join(directory, localpath)
+    if os.path.exists(target): # Same content under another url
+        os.remove(partial)
+        count_metric("imfdb_images_deduplicated_total")
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(partial, target)
+    return sha256, localpath, size, mime
+
+def download_images():
+    # Downloads every distinct image url of the per-entity image tables that has no local file yet
+    imageurls = []
+    for table in image_tables_dict.values():
+        statement = f"SELECT DISTINCT imageurl FROM {table['image_table']}"
+        cursor.execute(statement)
+        imageurls.extend(row[0] for row in cursor.fetchall())
+    statement = "SELECT imageurl, localpath FROM imagefiles"
+    cursor.execute(statement)
+    stored = {url for url, localpath in cursor.fetchall() if os.path.exists(os.path.join(download_dict["directory"], localpath))}
+    urls = [url for url in dict.fromkeys(imageurls) if url not in stored and is_selected_page("downloads", url)]
+    logger.info("Downloading %s of %s image urls into '%s', %s are stored already.", len(urls), len(set(imageurls)), download_dict["directory"], len(stored))
+
+    statement = """INSERT INTO imagefiles (imageurl, sha256, localpath, filesize, mime) VALUES (%s, %s, %s, %s, %s)
+                   ON CONFLICT (imageurl) DO UPDATE SET sha256 = excluded.sha256, localpath = excluded.localpath, filesize = excluded.filesize,
+                   mime = excluded.mime, downloadtime = CURRENT_TIMESTAMP"""
+    window = max(1, download_dict["threads"]) * 4 # Downloads submitted ahead of the ones being recorded
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, download_dict["threads"]), thread_name_prefix="download") as executor:
+        pending = {}
+        position = 0
+        while position < len(urls) or len(pending) > 0:
+            while position < len(urls) and len(pending) < window:
+                pending[executor.submit(download_image, urls[position])] = urls[position]
+                position += 1
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                url = pending.pop(future)
+                exception = future.exception()
+                if exception is not None:
+                    logger.warning("Quarantining image %s: %s", url, exception)
+                    detail = "".join(traceback.format_exception(type(exception), exception, exception.__traceback__))
+                    quarantine_page("downloads", url, "exception", detail, 0, 0)
+                else:
+                    cursor.execute(statement, (url, *future.result()))
+                    release_page("downloads", url)
+                commit_writes()
+
+def run_family_stage():
+    # Finalize the firearms table
+    update_firearms_isfictional()
+    update_firearms_isfamily()
+    generate_firearms_from_multis()
+
+def run_appearances_stage():
+    # Populate junction tables
+    dummy_uuid = insert_dummy_actor()
+    load_link_resolver()
+    populate_appearances_tables(dummy_uuid)
+
+def run_images_stage():
+    # Populate image tables
+    populate_actor_images_table()
+    populate_firearm_images_table()
+    populate_movie_images_table()
+    populate_tvseries_images_table()
+    populate_images_table()
+
+# Pipeline stages in their default order, the functions they run and the stages they depend on.
+# Stages whose dependencies are met may run at the same time, so a full build is bounded by its longest chain of stages
+# (skeleton, redirects, junctions) rather than the sum of all of them. Runtimes are those of a full sequential build.
+stages_dict = {
+    "actors" : {"function" : populate_actors_table, "depends" : []}, # Part of the database skeleton (~250min Runtime)
+    "movies" : {"function" : populate_movies_table, "depends" : []},
+    "tvseries" : {"function" : populate_tvseries_table, "depends" : []},
+    "firearms" : {"function" : populate_firearms_table_minimally, "depends" : []},
+    "family" : {"function" : run_family_stage, "depends" : ["firearms"]}, # ~2min Runtime
+    "specifications" : {"function" : populate_specifications_table, "depends" : ["family"]}, # ~2min Runtime
+    "redirects" : {"function" : populate_redirects_table, "depends" : ["actors", "movies", "tvseries"]}, # ~202min Runtime
+    "appearances" : {"function" : run_appearances_stage, "depends" : ["family", "redirects"]}, # ~950min Runtime
+    "images" : {"function" : run_images_stage, "depends" : ["actors", "movies", "tvseries", "family"]}, # ~9min Runtime
+    "downloads" : {"function" : download_images, "depends" : ["images"], "optional" : True} # Only run when asked for
+}
+
+def get_default_stages():
+    # The stages of a run that doesn't name any, every stage but the optional ones
+    return [stage for stage, definition in stages_dict.items() if not definition.get("optional")]
+
+def run_stage(stage, metrics_directory="metrics"):
+    # Runs a single stage and returns its metrics report. This is what worker processes execute.
+    start_metrics(stage, metrics_directory)
+    logger.info("Starting stage '%s'", stage)
+    page_budget_dict["quarantined"].clear()
+    stages_dict[stage]["function"]()
+    flush_writes()
+    record_stage_version(stage)
+    report_suppressed_logs()
+    report = export_metrics(running=False)
+    logger.info("Finished stage '%s' after %.1fmin (%.1fmin CPU)", stage, report['wall_seconds'] / 60, report['cpu_seconds'] / 60)
+    return report
+
+# Counts the version of a stage up, see record_stage_version() and commit_writes()
+stage_version_statement = """INSERT INTO stageversions (stage) VALUES (%s)
+                             ON CONFLICT (stage) DO UPDATE SET version = stageversions.version + 1, committime = CURRENT_TIMESTAMP"""
+
+def record_stage_version(stage):
+    # Counts a finished run of stage, which tells readers of the database (see imfdb_queries.py) that its tables changed
+    cursor.execute(stage_version_statement, (stage,))
+    cnx.commit()
+    writer_dict["local"].written = False
+
+def write_run_report(reports, metrics_directory, start_time):
+    # Writes <metrics_directory>/run.json with the reports of all finished stages of this run
+    run_report = {
+        "started" : start_time,
+        "wall_seconds" : time.time() - start_time,
+        "stages" : reports
+    }
+    os.makedirs(metrics_directory, exist_ok=True)
+    write_file_atomically(os.path.join(metrics_directory, "run.json"), json.dumps(run_report, indent=2))
+
+def get_quarantined_stages():
+    # Returns the stages with quarantined pages in the default order of stages
+    statement = "SELECT DISTINCT stage FROM quarantine"
+    cursor.execute(statement)
+    quarantined = {row[0] for row in cursor.fetchall()}
+    return [stage for stage in stages_dict if stage in quarantined]
+
+def get_downstream_stages(stage):
+    # Returns the given stage and every stage that directly or indirectly depends on it, except optional ones
+    downstream = [stage]
+    for name, definition in stages_dict.items():
+        if definition.get("optional"):
+            continue
+        if any(dependency in downstream for dependency in definition["depends"]) and name not in downstream:
+            downstream.append(name)
+    return downstream
+
+def initialize_worker(log_level, log_json_path, sqlite_path, schema, retry_quarantined, page_source, bulk_load):
+    # Gives a worker process of run_stages() the logging, database, retry, page source and bulk load settings of the main process
+    configure_logging(log_level, log_json_path)
+    use_sqlite(sqlite_path)
+    use_schema(schema)
+    page_budget_dict["retry"] = retry_quarantined
+    page_source_dict["mode"] = page_source
+    bulk_load_dict["active"] = bulk_load
+
+def run_stages(stages, workers, metrics_directory="metrics"):
+    # Runs the given stages, starting each one as soon as all of its dependencies within the selection have finished.
+    # Dependencies outside of the selection are assumed to be finished by an earlier run. With more than one worker,
+    # independent stages run at the same time in separate processes, each with its own database connection.
+    # Every stage exports its metrics to metrics_directory while it runs, the run report is updated after each stage.
+    pending = [stage for stage in stages_dict if stage in stages]
+    finished = []
+    failed = []
+    reports = {}
+    start_time = time.time()
+
+    def ready(stage):
+        return all(dependency in finished or dependency not in stages for dependency in stages_dict[stage]["depends"])
+
+    if workers <= 1:
+        while len(pending) > 0:
+            stage = next(stage for stage in pending if ready(stage))
+            pending.remove(stage)
+            reports[stage] = run_stage(stage, metrics_directory)
+            finished.append(stage)
+            write_run_report(reports, metrics_directory, start_time)
+        return True
+
+    # Worker processes are spawned rather than forked so they don't share the database connection of this process
+    settings = (logging_dict["level"], logging_dict["json_path"], database_dict["sqlite_path"], database_dict["schema"], page_budget_dict["retry"],
+                page_source_dict["mode"], bulk_load_dict["active"])
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=initialize_worker, initargs=settings) as executor:
+        running = {}
+        while len(pending) > 0 or len(running) > 0:
+            if len(failed) == 0:
+                for stage in [stage for stage in pending if ready(stage)]:
+                    pending.remove(stage)
+                    running[executor.submit(run_stage, stage, metrics_directory)] = stage
+            if len(running) == 0:
+                break
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                if future.exception() is not None:
+                    logger.error("Stage '%s' failed: %r", stage, future.exception())
+                    failed.append(stage)
+                else:
+                    finished.append(stage)
+                    reports[stage] = future.result()
+                    write_run_report(reports, metrics_directory, start_time)
+
+    if len(failed) > 0:
+        logger.error("Stopped after failed stages %s. Not started: %s", failed, pending)
+        return False
+    return True
+
+# Shadow builds (PostgreSQL only). With --shadow the stages load into a schema of their own instead of the public tables,
+# so readers of the database keep querying the last complete build for the whole run. When every stage has finished, the
+# build is validated and swapped in by renaming schemas in one transaction: public becomes the previous build and the
+# build becomes public. The previous build is kept until the next swap, so --rollback-schema brings it back at once.
+shadow_schema_dict = {
+    "build" : "imfdb_build",
+    "previous" : "imfdb_previous",
+    "carried_tables" : ["stageversions", "negativelookups", "imagefiles", "extractions"], # Version counters and caches a build continues with
+    "counted_tables" : ["actors", "movies", "tvseries", "firearms", "specifications", "movies_actors_firearms", "tvseries_actors_firearms"],
+    "min_ratio" : float(os.environ.get("IMFDB_SHADOW_MIN_RATIO", "0.9")) # Fraction of the rows of the current build a new one must have
+}
+
+def get_postgres_schema(schema, path=sqlite_structure_path):
+    # The statements of the pg_dump schema file with its tables in schema instead of public
+    with open(path, encoding="utf-8") as file:
+        return re.sub(r"\bpublic\.", f"{schema}.", file.read())
+
+def schema_exists(schema):
+    statement = "SELECT count(*) FROM pg_namespace WHERE nspname = %s"
+    cursor.execute(statement, (schema,))
+    return cursor.fetchone()[0] > 0
+
+def get_table_columns(schema, table):
+    statement = "SELECT column_name FROM information_schema.columns WHERE table_schema = %s AND table_name = %s ORDER BY ordinal_position"
+    cursor.execute(statement, (schema, table))
+    return [row[0] for row in cursor.fetchall()]
+
+def create_shadow_schema(fresh):
+    # Creates the schema of a shadow build with empty tables, except for the carried tables, which are copied from public.
+    # Unless fresh, an existing build schema is kept, so an interrupted build continues with the selected stages.
+    build = shadow_schema_dict["build"]
+    if fresh:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {build} CASCADE")
+    elif schema_exists(build):
+        logger.info("Continuing the build in schema '%s'.", build)
+        return
+    cursor.execute(f"CREATE SCHEMA {build}")
+    cursor.execute(get_postgres_schema(build))
+    cursor.execute("RESET search_path") # The dump clears it for the session
+    for table in shadow_schema_dict["carried_tables"]:
+        columns = [column for column in get_table_columns("public", table) if column in get_table_columns(build, table)]
+        if len(columns) > 0:
+            cursor.execute(f"INSERT INTO {build}.{table} ({', '.join(columns)}) SELECT {', '.join(columns)} FROM public.{table}")
+    cnx.commit()
+    logger.info("Created schema '%s' for the build.", build)
+
+def get_schema_privileges(schema):
+    # Returns the privileges granted on schema and its tables and views as a set of (table, grantee, privilege, grantable),
+    # with table None for the schema itself and grantee 'PUBLIC' for everyone
+    statement = """SELECT NULL, a.grantee, a.privilege_type, a.is_grantable
+                   FROM pg_namespace n, aclexplode(coalesce(n.nspacl, acldefault('n', n.nspowner))) a
+                   WHERE n.nspname = %s
+                   UNION ALL
+                   SELECT c.relname, a.grantee, a.privilege_type, a.is_grantable
+                   FROM pg_class c, aclexplode(coalesce(c.relacl, acldefault('r', c.relowner))) a
+                   WHERE c.relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = %s) AND c.relkind IN ('r', 'p', 'v', 'm')"""
+    cursor.execute(f"SELECT table_name, CASE WHEN grantee = 0 THEN 'PUBLIC' ELSE quote_ident(pg_get_userbyid(grantee)) END, privilege_type, is_grantable FROM ({statement}) privileges (table_name, grantee, privilege_type, is_grantable)",
+                   (schema, schema))
+    return set(cursor.fetchall())
+
+def copy_schema_privileges(source, target):
+    # Grants on target and its tables what is granted on source and the tables of the same names, so readers keep their
+    # access to public once a build is swapped in. Tables that only exist in source are skipped.
+    granted = get_schema_privileges(target)
+    tables = {table for table, _, _, _ in granted} # Every table has at least its owner's privileges
+    for table, grantee, privilege, grantable in get_schema_privileges(source) - granted:
+        if table is not None and table not in tables:
+            continue
+        target_object = f"SCHEMA {target}" if table is None else f"TABLE {target}.{table}"
+        cursor.execute(f"GRANT {privilege} ON {target_object} TO {grantee}{' WITH GRANT OPTION' if grantable else ''}")
+
+def validate_shadow_schema():
+    # Returns the problems that keep the build from being swapped in: tables that are empty or shrank below min_ratio of
+    # the current build, rows whose foreign keys point nowhere, and privileges on public that the build lacks. An empty
+    # list means the build is fine.
+    build = shadow_schema_dict["build"]
+    problems = []
+    for table in shadow_schema_dict["counted_tables"]:
+        cursor.execute(f"SELECT count(*) FROM {build}.{table}")
+        count = cursor.fetchone()[0]
+        current = 0
+        if len(get_table_columns("public", table)) > 0:
+            cursor.execute(f"SELECT count(*) FROM public.{table}")
+            current = cursor.fetchone()[0]
+        logger.info("%s: %s rows, %s in the current build", table, count, current)
+        if count == 0:
+            problems.append(f"{table} is empty")
+        elif count < current * shadow_schema_dict["min_ratio"]:
+            problems.append(f"{table} has {count} rows, {current} in the current build")
+
+    # Constraints may have been added without checking existing rows (NOT VALID) or not at all, so every one is checked
+    statement = """SELECT c.conname, child.relname, child_column.attname, parent.relname, parent_column.attname
+                   FROM pg_constraint c
+                   INNER JOIN pg_class child ON child.oid = c.conrelid
+                   INNER JOIN pg_class parent ON parent.oid = c.confrelid
+                   INNER JOIN pg_attribute child_column ON child_column.attrelid = c.conrelid AND child_column.attnum = c.conkey[1]
+                   INNER JOIN pg_attribute parent_column ON parent_column.attrelid = c.confrelid AND parent_column.attnum = c.confkey[1]
+                   WHERE c.contype = 'f' AND c.connamespace = (SELECT oid FROM pg_namespace WHERE nspname = %s)
+                   ORDER BY 1"""
+    cursor.execute(statement, (build,))
+    for name, table, column, parent, parent_column in cursor.fetchall():
+        cursor.execute(f"""SELECT count(*) FROM {build}.{table} child WHERE child.{column} IS NOT NULL
+                           AND NOT EXISTS (SELECT 1 FROM {build}.{parent} parent WHERE parent.{parent_column} = child.{column})""")
+        orphans = cursor.fetchone()[0]
+        if orphans > 0:
+            problems.append(f"{orphans} rows of {table} violate {name}")
+    # Readers of public must keep their access once the build replaces it, see copy_schema_privileges()
+    granted = get_schema_privileges(build)
+    tables = {table for table, _, _, _ in granted}
+    for table, grantee, privilege, grantable in sorted(get_schema_privileges("public") - granted, key=str):
+        if table is None or table in tables:
+            problems.append(f"{grantee} lacks {privilege}{' WITH GRANT OPTION' if grantable else ''} on {'schema ' + build if table is None else table}")
+    cursor.execute(f"SELECT count(*) FROM {build}.quarantine")
+    quarantined = cursor.fetchone()[0]
+    if quarantined > 0:
+        logger.warning("The build has %s quarantined pages.", quarantined)
+    cnx.commit()
+    return problems
+
+def swap_schemas(first, second):
+    # Exchanges the names of two schemas in one transaction. Readers resolve table names when a statement starts, so they
+    # see either the old or the new tables, never a mix or none.
+    cursor.execute(f"ALTER SCHEMA {first} RENAME TO imfdb_swap")
+    cursor.execute(f"ALTER SCHEMA {second} RENAME TO {first}")
+    cursor.execute(f"ALTER SCHEMA imfdb_swap RENAME TO {second}")
+
+def publish_shadow_schema():
+    # Makes the build the public schema if it is valid, keeping the current one as the previous build. Returns success.
+    copy_schema_privileges("public", shadow_schema_dict["build"])
+    cnx.commit()
+    problems = validate_shadow_schema()
+    if len(problems) > 0:
+        logger.error("Not swapping in schema '%s': %s", shadow_schema_dict["build"], "; ".join(problems))
+        return False
+    cursor.execute(f"DROP SCHEMA IF EXISTS {shadow_schema_dict['previous']} CASCADE")
+    cursor.execute(f"ALTER SCHEMA public RENAME TO {shadow_schema_dict['previous']}")
+    cursor.execute(f"ALTER SCHEMA {shadow_schema_dict['build']} RENAME TO public")
+    cnx.commit()
+    logger.info("Swapped in the build, the previous one is kept as schema '%s'.", shadow_schema_dict["previous"])
+    return True
+
+def rollback_schema():
+    # Brings back the previous build. The current one becomes the previous build, so a second rollback undoes the first.
+    if not schema_exists(shadow_schema_dict["previous"]):
+        logger.error("There is no previous build to roll back to.")
+        return False
+    swap_schemas("public", shadow_schema_dict["previous"])
+    cnx.commit()
+    logger.info("Rolled back to the previous build, the replaced one is kept as schema '%s'.", shadow_schema_dict["previous"])
+    return True
+
+# Bulk loads (PostgreSQL only). With --bulk-load a full build writes the bulk tables as UNLOGGED tables without their
+# secondary indexes and foreign keys, so inserting a row neither writes WAL nor maintains indexes or checks keys, and the
+# writer loads queued rows with COPY (see run_writer()). Primary keys and unique constraints stay, the stages rely on them.
+# PostgreSQL empties unlogged tables when it restarts after a crash, so bulk loads only run in the schema of a shadow build
+# (--shadow), where a crash costs the build but never the live tables, which are only replaced once the build is valid.
+# Afterwards the tables are switched to logged first, which PostgreSQL only allows while no foreign key links them to an
+# unlogged table, then the indexes are built, the foreign keys are added and validated, and the tables are analyzed.
+# Every step can be repeated, so an interrupted bulk load is finished by the next one.
+bulk_load_dict = {
+    "active" : False,
+    "tables" : ["firearms", "specifications", "specificationattributes", "specificationcalibers", "movies_actors_firearms",
+                "tvseries_actors_firearms", "images", "actorimages", "firearmimages", "movieimages", "tvseriesimages"],
+    "load_times_file" : "loadtimes.json" # Duration of the last full build of every mode, in the metrics directory
+}
+
+def get_bulk_load_definitions(path=sqlite_structure_path):
+    # Returns the secondary indexes and foreign keys of the schema file involving the bulk tables, as lists of
+    # (name, table, statement or constraint definition) without the schema, so they apply to the search path
+    with open(path, encoding="utf-8") as file:
+        dump = file.read()
+    indexes = [(name, table, f"CREATE INDEX IF NOT EXISTS {name} ON {table} {definition}")
+               for name, table, definition in re.findall(r"^CREATE INDEX (\w+) ON public\.(\w+) (.*);$", dump, flags=re.M)
+               if table in bulk_load_dict["tables"]]
+    foreign_keys = [(name, table, definition.replace("public.", ""))
+                    for table, name, definition in re.findall(r"^ALTER TABLE ONLY public\.(\w+)\n    ADD CONSTRAINT (\w+) (FOREIGN KEY .*);$", dump, flags=re.M)
+                    if table in bulk_load_dict["tables"] or re.search(r"REFERENCES public\.(\w+)", definition).group(1) in bulk_load_dict["tables"]]
+    return {"indexes" : indexes, "foreign_keys" : foreign_keys}
+
+def prepare_bulk_load():
+    # Drops the foreign keys and secondary indexes of the bulk tables and makes them unlogged
+    definitions = get_bulk_load_definitions()
+    for name, table, _ in definitions["foreign_keys"]:
+        cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}")
+    for name, _, _ in definitions["indexes"]:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+    for table in bulk_load_dict["tables"]:
+        cursor.execute(f"ALTER TABLE {table} SET UNLOGGED")
+    cnx.commit()
+    bulk_load_dict["active"] = True
+    logger.info("Dropped %s indexes and %s foreign keys, %s tables are unlogged for the bulk load.", len(definitions["indexes"]),
+                len(definitions["foreign_keys"]), len(bulk_load_dict["tables"]))
+
+def finish_bulk_load():
+    # Makes the bulk tables logged again and restores their indexes and foreign keys. Returns False if rows violate a
+    # foreign key, which is then kept as NOT VALID (new rows are checked, existing ones are not) and logged.
+    stop_writer() # Its connection must not hold locks on the tables
+    cnx.rollback()
+    bulk_load_dict["active"] = False
+    definitions = get_bulk_load_definitions()
+    start = time.perf_counter()
+    for table in bulk_load_dict["tables"]:
+        cursor.execute(f"ALTER TABLE {table} SET LOGGED")
+    cnx.commit()
+    logged = time.perf_counter()
+    for _, _, statement in definitions["indexes"]:
+        cursor.execute(statement)
+    cnx.commit()
+    indexed = time.perf_counter()
+    for name, table, definition in definitions["foreign_keys"]:
+        cursor.execute("SELECT count(*) FROM pg_constraint WHERE conname = %s AND conrelid = CAST(%s AS regclass)", (name, table))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition} NOT VALID")
+    cnx.commit()
+    valid = True
+    for name, table, _ in definitions["foreign_keys"]:
+        try:
+            cursor.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+            cnx.commit()
+        except psycopg2.Error as exception:
+            cnx.rollback()
+            logger.error("Rows of %s violate %s, it is kept as NOT VALID: %s", table, name, str(exception).strip())
+            valid = False
+    validated = time.perf_counter()
+    for table in bulk_load_dict["tables"]:
+        cursor.execute(f"ANALYZE {table}")
+    cnx.commit()
+    logger.info("Finished the bulk load in %.1fs: %.1fs to make the tables logged, %.1fs to build %s indexes, %.1fs to validate %s foreign keys, %.1fs to analyze.",
+                time.perf_counter() - start, logged - start, indexed - logged, len(definitions["indexes"]), validated - indexed,
+                len(definitions["foreign_keys"]), time.perf_counter() - validated)
+    return valid
+
+def record_load_time(mode, seconds, metrics_directory):
+    # Records the duration of a full build in mode ('normal' or 'bulk') and logs how it compares to the last full build
+    # of the other mode
+    path = os.path.join(metrics_directory, bulk_load_dict["load_times_file"])
+    load_times = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            load_times = json.load(file)
+    load_times[mode] = {"seconds" : seconds, "time" : get_utc_timestamp()}
+    os.makedirs(metrics_directory, exist_ok=True)
+    write_file_atomically(path, json.dumps(load_times, indent=2))
+    other = "normal" if mode == "bulk" else "bulk"
+    if other in load_times:
+        difference = seconds - load_times[other]["seconds"]
+        logger.info("The %s load took %.1fs, %+.1fs (%+.1f%%) compared to the last %s load of %s.", mode, seconds, difference,
+                    difference / load_times[other]["seconds"] * 100, other, load_times[other]["time"])
+    else:
+        logger.info("The %s load took %.1fs, there was no %s load to compare it with yet.", mode, seconds, other)
+
+def main():
+    parser = argparse.ArgumentParser(description="Extracts data from IMFDB into the imfdb PostgreSQL database.")
+    parser.add_argument("stages", nargs="*", metavar="stage",
+                        help=f"Stages to run, default is all but the optional ones. One or more of: {', '.join(stages_dict)}")
+    parser.add_argument("--from", dest="from_stage", choices=list(stages_dict),
+                        help="Resume with this stage and run every stage that depends on it")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of stages that may run at the same time (default: 1, strictly sequential)")
+    parser.add_argument("--metrics-dir", default="metrics",
+                        help="Directory for the JSON run report and Prometheus text files (default: metrics)")
+    parser.add_argument("--log-level", default=default_log_level, choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Minimum level of messages to write (default: INFO, or IMFDB_LOG_LEVEL)")
+    parser.add_argument("--log-json", metavar="PATH", help="Also append messages to PATH as JSON lines")
+    parser.add_argument("--sqlite", metavar="PATH", default=os.environ.get("IMFDB_SQLITE_PATH"),
+                        help="Build an SQLite database file at PATH instead of using PostgreSQL (default: IMFDB_SQLITE_PATH)")
+    parser.add_argument("--source", choices=["html", "wikitext"], default=page_source_dict["mode"],
+                        help="Download pages as full html or as wikitext, 50 per request (default: html, or IMFDB_SOURCE)")
+    parser.add_argument("--retry-quarantined", action="store_true",
+                        help="Only extract the quarantined pages of the given stages, default is every stage with quarantined pages")
+    parser.add_argument("--shadow", action="store_true",
+                        help="Build into a separate schema and swap it in for public once it is complete and valid (PostgreSQL only)")
+    parser.add_argument("--rollback-schema", action="store_true", help="Swap the previous build back in for public and exit")
+    parser.add_argument("--bulk-load", action="store_true",
+                        help="Load a full shadow build into unlogged tables without secondary indexes and foreign keys, restored at the end. "
+                             "Needs --shadow, since a server crash empties unlogged tables (PostgreSQL only)")
+    parser.add_argument("--list", action="store_true", help="List all stages with their dependencies and exit")
+    parser.add_argument("--list-negative-lookups", action="store_true",
+                        help="List the links of appearance tables that could not be resolved, most frequent first, and exit")
+    args = parser.parse_args()
+    configure_logging(args.log_level, args.log_json)
+    use_sqlite(args.sqlite)
+    page_source_dict["mode"] = args.source
+
+    if args.list:
+        for name, definition in stages_dict.items():
+            print(f"{name}: depends on {', '.join(definition['depends']) or 'nothing'}{' (optional)' if definition.get('optional') else ''}")
+        return
+
+    if args.list_negative_lookups:
+        try:
+            for table, title, reason, pageid, hits, lookuptime in get_negative_lookup_report():
+                print(f"{hits:>6}  {reason:<15}{table:<10}{title}{f' (page {pageid})' if pageid else ''}  {lookuptime}")
+        finally:
+            close_connections()
+        return
+
+    if (args.shadow or args.rollback_schema or args.bulk_load) and is_sqlite():
+        parser.error("--shadow, --rollback-schema and --bulk-load need PostgreSQL")
+    if args.bulk_load and (len(args.stages) > 0 or args.from_stage is not None or args.retry_quarantined):
+        parser.error("--bulk-load is for full builds, it can't be combined with stages, --from or --retry-quarantined")
+    if args.bulk_load and not args.shadow:
+        parser.error("--bulk-load needs --shadow: its unlogged tables are emptied if the server crashes, which must not hit the live tables")
+    if args.rollback_schema:
+        try:
+            succeeded = rollback_schema()
+        finally:
+            close_connections()
+        sys.exit(0 if succeeded else 1)
+
+    for stage in args.stages:
+        if stage not in stages_dict:
+            parser.error(f"unknown stage '{stage}'")
+    stages = list(args.stages)
+    if args.from_stage is not None:
+        stages.extend(get_downstream_stages(args.from_stage))
+    if args.shadow:
+        create_shadow_schema(fresh=len(stages) == 0 and not args.retry_quarantined)
+        use_schema(shadow_schema_dict["build"]) # Also for the stages and workers below
+    if args.retry_quarantined:
+        page_budget_dict["retry"] = True
+        if len(stages) == 0:
+            stages = [stage for quarantined in get_quarantined_stages() for stage in get_downstream_stages(quarantined)]
+            if len(stages) == 0:
+                logger.info("There are no quarantined pages.")
+                close_connections()
+                return
+    full_build = len(stages) == 0
+    if full_build:
+        stages = get_default_stages()
+
+    try:
+        start = time.perf_counter()
+        if args.bulk_load:
+            prepare_bulk_load()
+        succeeded = False
+        try:
+            succeeded = run_stages(stages, args.workers, args.metrics_dir)
+        finally:
+            if args.bulk_load:
+                succeeded = finish_bulk_load() and succeeded
+        if succeeded and full_build:
+            record_load_time("bulk" if args.bulk_load else "normal", time.perf_counter() - start, args.metrics_dir)
+        if args.shadow:
+            use_schema(None)
+            succeeded = succeeded and publish_shadow_schema()
+    finally:
+        close_connections()
+    if not succeeded:
+        sys.exit(1)
+
+# Main - This is where the magic happens.
+if __name__ == "__main__":
+    main()
+
+# Keeping track of edge and corner cases:
+# Solved - X
+# Unsolved - !
+
+# X HK416 second variant has full html for some reason
+# X Author of Flammenwerfer 35 page can't spell table headers right
+# X Same for DefTech 37mm GL
+# X Notes column seems to be optional in Film and TV tables
+# X Film and TV table columns may sometimes be in Spanish
+# X The notes column may be called "Note", "Notes", "Notation" or "Notations"
+# X Actors appear as NaN in dataframe if unable to be determined.
+# X https://www.imfdb.org/index.php?curid=62 has just a single Spec at the beginning of the page
+# X Child guns are currently NULL in isfictional column. -> isfictional should default to false
+# X https://www.imfdb.org/index.php?curid=464719 Sage BML-37 has a table of contents despite being a single
+# ! https://www.imfdb.org/index.php?curid=348107 HK AG Grenade Launchers are a weird mix of versioned and non-versioned, ie. live-fire models are non-versioned, non-firing replicas are versioned
+# X https://www.imfdb.org/index.php?curid=3564 SIG P210 has its Video Game table nested in the Television segment
+# X https://www.imfdb.org/index.php?curid=314208 Flintlock Musket has a table of contents despite being a single
+# X Firearms may appear in a medium, but used by an unnamed actor or extra. Solution: Unnamed extra dummy actor
+# X Movie pages may have redirects example: https://www.imfdb.org/index.php?curid=14246 (pageid in DB), https://www.imfdb.org/index.php?curid=26085 (pageid in html table)
+# X TVSeries and movie may not have a linked page or may have a redlink, despite being valid titles
+# X Actors also have redirects. See Brandon Faser
+# X https://www.imfdb.org/index.php?curid=397370 The movie Weekend leads to a disambiguation page
+# X https://www.imfdb.org/index.php?curid=10193 The Modern Family (series) entries are listed in the Film table
+# X There are a metric crap-ton of movie pages that are a) missing in the movies category and therefore don't exist in the local database b) lead to disambiguation pages and are therefore resolved to an
+# incorrect page id. Solution: Rewrite the junction table function to commit after every gun, write uuids of finished guns into a file and skip them during next execution.
+# X skip csv should be deleted between populating junction tables
+# X "False positive" missing actors: '.', 'Various', 'Uncredited', 'Danish nazis and resistance fighters' to be added to both junction table checks
+# X Some deceased actors are not in the actors category
+# X Some redirect pages are not provided by the API and have to be added manually
+# ! https://www.imfdb.org/index.php?title=Heckler_%26_Koch_P7 is not formatted according to the template (no h1)
+# ! Refactor population functions to extract functions that take just a single object as parameter
\ No newline at end of file
@@ -0,0 +1,204 @@
+# Columnar export of a database built by imfdb_connector.py. Every table is streamed through a server-side cursor (SQLite
+# reads rows as they are fetched anyway) into a Parquet file of its own, in row groups of bounded size, so neither the
+# database nor the export ever holds a whole table in memory. The html of the pages is left out unless asked for, and
+# repeated names and titles are dictionary encoded. appearances.parquet joins every appearance with its firearm, actor,
+# movie or series and year, ready for aggregation without any joins or a database connection.
+#
+#   python imfdb_export.py export parquet/
+#   python imfdb_export.py export parquet/ --tables movies_actors_firearms actors --include-html
+#
+#   import pyarrow.parquet as pq
+#   pq.read_table("parquet/appearances.parquet").group_by("firearmtitle").aggregate([("title", "count")])
+
+import argparse
+import datetime
+import os
+import re
+import sys
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import imfdb_connector as imfdb
+
+# Tables written by default, in this order
+export_tables = ["actors", "movies", "tvseries", "firearms", "specifications", "specificationattributes", "specificationcalibers",
+                 "movies_actors_firearms", "tvseries_actors_firearms", "redirects", "images", "actorimages", "firearmimages",
+                 "movieimages", "tvseriesimages", "imagefiles"]
+
+# Columns holding the html or wikitext of a page, which make up most of the database and are only exported with --include-html
+html_columns_dict = {
+    "actors" : ("actorpagecontent", "actorwikitext"),
+    "movies" : ("moviepagecontent", "moviewikitext"),
+    "tvseries" : ("tvseriespagecontent", "tvserieswikitext"),
+    "firearms" : ("firearmpagecontent", "firearmwikitext")
+}
+
+# Column types of the PostgreSQL schema and the Arrow types they are exported as
+arrow_types_dict = {
+    "uuid" : pa.string(),
+    "character varying" : pa.string(),
+    "timestamp without time zone" : pa.timestamp("us"),
+    "boolean" : pa.bool_(),
+    "smallint" : pa.int16(),
+    "integer" : pa.int32(),
+    "bigint" : pa.int64(),
+    "double precision" : pa.float64()
+}
+
+# Text columns with few distinct values, which are dictionary encoded
+dictionary_columns = {"actorname", "movietitle", "tvseriestitle", "firearmtitle", "firearmversion", "totitle", "fromtitle", "title",
+                      "media", "type", "caliber", "capacity", "firemode", "productiontimeframe", "character", "year", "mime"}
+
+# Every appearance with its firearm, actor and title. Years are text, since television years may be ranges like '2005-2010',
+# and firstyear is the first year they mention.
+appearances_statement = """
+    SELECT 'movie', maf.moviesactorsfirearmsid, f.firearmid, f.firearmtitle, f.firearmversion, a.actorid, a.actorname, m.movieid,
+           m.movietitle, maf."character", maf.note, CAST(maf.year AS varchar)
+    FROM movies_actors_firearms maf
+    INNER JOIN firearms f ON f.firearmid = maf.firearmid
+    INNER JOIN movies m ON m.movieid = maf.movieid
+    LEFT JOIN actors a ON a.actorid = maf.actorid
+    UNION ALL
+    SELECT 'tvseries', taf.tvseriesactorsfirearmsid, f.firearmid, f.firearmtitle, f.firearmversion, a.actorid, a.actorname, t.tvseriesid,
+           t.tvseriestitle, taf."character", taf.note, taf.year
+    FROM tvseries_actors_firearms taf
+    INNER JOIN firearms f ON f.firearmid = taf.firearmid
+    INNER JOIN tvseries t ON t.tvseriesid = taf.tvseriesid
+    LEFT JOIN actors a ON a.actorid = taf.actorid"""
+appearances_columns = [("media", "character varying"), ("appearanceid", "uuid"), ("firearmid", "uuid"), ("firearmtitle", "character varying"),
+                       ("firearmversion", "character varying"), ("actorid", "uuid"), ("actorname", "character varying"), ("titleid", "uuid"),
+                       ("title", "character varying"), ("character", "character varying"), ("note", "character varying"), ("year", "character varying")]
+
+# Rows per fetch, and the limits of a row group in rows and in (uncompressed) bytes
+fetch_rows = 2000
+row_group_rows = 128 * 1024
+row_group_bytes = 64 * 1024 * 1024
+
+def get_table_columns(path=imfdb.sqlite_structure_path):
+    # Returns the columns of every table of the schema file as a dict of table -> [(column, type)]
+    with open(path, encoding="utf-8") as file:
+        dump = file.read()
+    tables = {}
+    for table, body in re.findall(r"^CREATE TABLE public\.(\w+) \((.*?)\n\);", dump, flags=re.M | re.S):
+        columns = []
+        for line in body.strip().splitlines():
+            match = re.match(r'^\s*"?(\w+)"? (.+?),?$', line)
+            column_type = next(column_type for column_type in arrow_types_dict if match.group(2).startswith(column_type))
+            columns.append((match.group(1), column_type))
+        tables[table] = columns
+    return tables
+
+def convert_value(value, column_type):
+    # SQLite returns timestamps as text and booleans as integers
+    if value is None:
+        return None
+    if column_type == "timestamp without time zone" and isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    if column_type == "boolean":
+        return bool(value)
+    if column_type == "uuid":
+        return str(value)
+    return value
+
+def get_export_schema(columns, first_year=False):
+    # The Arrow schema of columns, followed by the first year of the last column if first_year is set
+    fields = [pa.field(column, arrow_types_dict[column_type]) for column, column_type in columns]
+    if first_year:
+        fields.append(pa.field("firstyear", pa.int16()))
+    return pa.schema(fields)
+
+def get_record_batch(rows, columns, schema):
+    arrays = []
+    for index, (column, column_type) in enumerate(columns):
+        arrays.append(pa.array([convert_value(row[index], column_type) for row in rows], type=schema.field(column).type))
+    if len(schema) > len(columns):
+        years = [re.search(r"\d{4}", row[-1] or "") for row in rows]
+        arrays.append(pa.array([int(year.group(0)) if year else None for year in years], type=pa.int16()))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def open_stream(statement):
+    # Returns a cursor streaming the rows of statement: a named, server-side cursor on PostgreSQL
+    if imfdb.is_sqlite():
+        return imfdb.get_connection().execute(statement)
+    stream = imfdb.get_connection().cursor(name="imfdb_export")
+    stream.itersize = fetch_rows
+    stream.execute(statement)
+    return stream
+
+def write_parquet(path, statement, columns, first_year=False):
+    # Streams the rows of statement into the Parquet file at path, which is replaced atomically. Returns the number of rows.
+    schema = get_export_schema(columns, first_year)
+    dictionary = [field.name for field in schema if field.name in dictionary_columns]
+    stream = open_stream(statement)
+    count = 0
+    try:
+        with pq.ParquetWriter(path + ".tmp", schema, compression="zstd", use_dictionary=dictionary) as writer:
+            batches = []
+            size = 0
+            while True:
+                rows = stream.fetchmany(fetch_rows)
+                if len(rows) > 0:
+                    batch = get_record_batch(rows, columns, schema)
+                    batches.append(batch)
+                    size += batch.nbytes
+                    count += len(rows)
+                # Full row groups are written as soon as they are complete, the rows after them wait for the next one. A
+                # row group reaching row_group_bytes first, e.g. one with html, is written as it is.
+                if len(batches) > 0 and (len(rows) == 0 or sum(len(batch) for batch in batches) >= row_group_rows or size >= row_group_bytes):
+                    table = pa.Table.from_batches(batches, schema=schema)
+                    written = len(table) if len(rows) == 0 or size >= row_group_bytes else len(table) // row_group_rows * row_group_rows
+                    writer.write_table(table.slice(0, written), row_group_size=row_group_rows)
+                    batches = table.slice(written).to_batches()
+                    size = sum(batch.nbytes for batch in batches)
+                if len(rows) == 0:
+                    break
+    finally:
+        stream.close()
+        imfdb.get_connection().rollback()
+    os.replace(path + ".tmp", path)
+    return count
+
+def export_database(directory, tables=None, include_html=False, appearances=True):
+    # Writes <directory>/<table>.parquet for the given tables (default export_tables) and appearances.parquet
+    os.makedirs(directory, exist_ok=True)
+    table_columns = get_table_columns()
+    exports = []
+    for table in tables or export_tables:
+        columns = [(column, column_type) for column, column_type in table_columns[table] if include_html or column not in html_columns_dict.get(table, ())]
+        statement = "SELECT {} FROM {}".format(", ".join(f'"{column}"' for column, _ in columns), table)
+        exports.append((table, statement, columns, False))
+    if appearances:
+        exports.append(("appearances", appearances_statement, appearances_columns, True))
+    for name, statement, columns, first_year in exports:
+        start = time.perf_counter()
+        path = os.path.join(directory, f"{name}.parquet")
+        count = write_parquet(path, statement, columns, first_year)
+        imfdb.logger.info("Exported %s rows of %s to %s (%s bytes) in %.1fs", count, name, path, os.path.getsize(path), time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Exports the imfdb database into Parquet files.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Write every table and the joined appearances into a directory")
+    export.add_argument("directory")
+    export.add_argument("--tables", nargs="+", choices=export_tables, help="Only export these tables (default: all of them)")
+    export.add_argument("--include-html", action="store_true", help="Also export the html and wikitext of the pages")
+    export.add_argument("--no-appearances", action="store_true", help="Don't write the joined appearances.parquet")
+    export.add_argument("--sqlite", metavar="PATH", default=os.environ.get("IMFDB_SQLITE_PATH"), help="Read an SQLite database instead of PostgreSQL")
+    parser.add_argument("--log-level", default=imfdb.default_log_level, choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Minimum level of messages to write (default: INFO, or IMFDB_LOG_LEVEL)")
+    args = parser.parse_args()
+
+    imfdb.configure_logging(args.log_level)
+    imfdb.use_sqlite(args.sqlite)
+    start = time.perf_counter()
+    try:
+        export_database(args.directory, args.tables, args.include_html, not args.no_appearances)
+    finally:
+        imfdb.close_connections()
+    imfdb.logger.info("Exported to %s in %.1fs", args.directory, time.perf_counter() - start)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+# Appearance graph of a database built by imfdb_connector.py. Every row of movies_actors_firearms and
+# tvseries_actors_firearms links its actor, firearm and movie or series with each other, which makes a graph of integer
+# node ids stored as CSR adjacency arrays (NumPy): the neighbors of node i are indices[indptr[i]:indptr[i + 1]], and
+# weights holds the number of appearances behind every edge. Graphs are saved as .npy files and loaded memory-mapped, so
+# questions over the whole dataset ("which firearms did this actor use", "shortest path between two actors via shared
+# guns") are answered in milliseconds without the database.
+#
+#   python imfdb_graph.py export graph/
+#   python imfdb_graph.py path graph/ "Arnold Schwarzenegger" "Sigourney Weaver" --via firearm
+#
+#   import imfdb_graph
+#   graph = imfdb_graph.load_graph("graph/")
+#   actor = imfdb_graph.find_node(graph, "Arnold Schwarzenegger", "actor")
+#   imfdb_graph.neighbors(graph, actor, "firearm")
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import imfdb_connector as imfdb
+
+# Node types in the order of their id ranges
+node_types = ["actor", "firearm", "movie", "tvseries"]
+
+# Entities of every node type and the statement reading them
+node_statements_dict = {
+    "actor" : "SELECT actorid, actorname FROM actors WHERE NOT (actorpageid = '0' AND actorname = 'Dummy / Uncredited Extra')",
+    "firearm" : "SELECT firearmid, firearmtitle FROM firearms",
+    "movie" : "SELECT movieid, movietitle FROM movies",
+    "tvseries" : "SELECT tvseriesid, tvseriestitle FROM tvseries"
+}
+
+# Appearances, one (actor, firearm, movie or series) triple per row
+appearance_statements_dict = {
+    "movie" : "SELECT actorid, firearmid, movieid FROM movies_actors_firearms",
+    "tvseries" : "SELECT actorid, firearmid, tvseriesid FROM tvseries_actors_firearms"
+}
+
+graph_files = ["indptr", "indices", "weights", "types"]
+
+def build_graph():
+    # Reads the appearance tables and returns the graph as a dict of arrays. Appearances of the dummy actor of uncredited
+    # extras only link their firearm and movie, the dummy would otherwise connect every actor to every other one.
+    cursor = imfdb.get_cursor()
+    uuids = []
+    names = []
+    types = []
+    node_ids = {}
+    for type_id, node_type in enumerate(node_types):
+        cursor.execute(node_statements_dict[node_type])
+        for uuid, name in cursor.fetchall():
+            node_ids[str(uuid)] = len(uuids)
+            uuids.append(str(uuid))
+            names.append(name)
+            types.append(type_id)
+
+    sources = []
+    targets = []
+    for media, statement in appearance_statements_dict.items():
+        cursor.execute(statement)
+        rows = [[node_ids.get(str(value), -1) for value in row] for row in cursor.fetchall()]
+        if len(rows) == 0:
+            continue
+        triples = np.array(rows, dtype=np.int64)
+        # Every pair of the triple becomes an edge in both directions, pairs with a missing node are dropped
+        for first, second in [(0, 1), (0, 2), (1, 2)]:
+            pairs = triples[(triples[:, first] >= 0) & (triples[:, second] >= 0)]
+            sources.extend([pairs[:, first], pairs[:, second]])
+            targets.extend([pairs[:, second], pairs[:, first]])
+    imfdb.get_connection().rollback()
+
+    node_count = len(uuids)
+    if len(sources) > 0:
+        # Identical edges are merged by their key, their number becomes the weight. Keys sort by source, then target.
+        keys, weights = np.unique(np.concatenate(sources) * node_count + np.concatenate(targets), return_counts=True)
+    else:
+        keys, weights = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // node_count, minlength=node_count), out=indptr[1:])
+    return {
+        "indptr" : indptr,
+        "indices" : (keys % node_count).astype(np.int32),
+        "weights" : weights.astype(np.int32),
+        "types" : np.array(types, dtype=np.int8),
+        "uuids" : uuids,
+        "names" : names,
+        "name_ids" : None # name -> node ids, built on first use by find_node()
+    }
+
+def save_graph(graph, directory):
+    # Writes the arrays as .npy files and the uuids and names as nodes.json. Every file is replaced atomically.
+    os.makedirs(directory, exist_ok=True)
+    for name in graph_files:
+        path = os.path.join(directory, f"{name}.npy")
+        with open(path + ".tmp", "wb") as file:
+            np.save(file, graph[name])
+        os.replace(path + ".tmp", path)
+    imfdb.write_file_atomically(os.path.join(directory, "nodes.json"), json.dumps({"uuids" : graph["uuids"], "names" : graph["names"]}, ensure_ascii=False))
+
+def load_graph(directory):
+    # Loads a saved graph. The arrays are memory-mapped, so loading is instant and pages are read as they are needed.
+    graph = {name : np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in graph_files}
+    with open(os.path.join(directory, "nodes.json"), encoding="utf-8") as file:
+        nodes = json.load(file)
+    graph["uuids"] = nodes["uuids"]
+    graph["names"] = nodes["names"]
+    graph["name_ids"] = None
+    return graph
+
+def find_node(graph, name, node_type=None):
+    # Returns the id of the node with the given name (or uuid) and type, None if there is none
+    if graph["name_ids"] is None:
+        graph["name_ids"] = {}
+        for node, node_name in enumerate(graph["names"]):
+            graph["name_ids"].setdefault(node_name, []).append(node)
+        for node, uuid in enumerate(graph["uuids"]):
+            graph["name_ids"].setdefault(uuid, []).append(node)
+    for node in graph["name_ids"].get(name, []):
+        if node_type is None or node_types[graph["types"][node]] == node_type:
+            return node
+    return None
+
+def describe(graph, nodes):
+    # Turns node ids into (type, name) pairs
+    return [(node_types[graph["types"][node]], graph["names"][node]) for node in nodes]
+
+def expand(graph, frontier):
+    # Returns the neighbors of all nodes in frontier (with repetitions), and the weights of the edges leading to them
+    starts = graph["indptr"][frontier]
+    lengths = graph["indptr"][frontier + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return graph["indices"][offsets], graph["weights"][offsets]
+
+def neighbors(graph, node, node_type=None):
+    # Returns the neighbors of node, optionally only those of node_type, with the number of appearances they share,
+    # most appearances first. For example the firearms used by an actor, or the actors seen with a firearm.
+    start, end = graph["indptr"][node], graph["indptr"][node + 1]
+    nodes = np.asarray(graph["indices"][start:end])
+    weights = np.asarray(graph["weights"][start:end])
+    if node_type is not None:
+        mask = graph["types"][nodes] == node_types.index(node_type)
+        nodes, weights = nodes[mask], weights[mask]
+    order = np.argsort(-weights, kind="stable")
+    return list(zip(nodes[order].tolist(), weights[order].tolist()))
+
+def co_occurrences(graph, node, node_type, via_type):
+    # Counts the nodes of node_type sharing neighbors of via_type with node, e.g. the actors who used the same firearms as
+    # an actor (node_type 'actor', via_type 'firearm'), or the firearms appearing in the same movies as a firearm.
+    # Returns (node, number of shared via nodes) pairs, most shared first.
+    via = np.array([neighbor for neighbor, _ in neighbors(graph, node, via_type)], dtype=np.int64)
+    if len(via) == 0:
+        return []
+    candidates, _ = expand(graph, via)
+    candidates = candidates[(graph["types"][candidates] == node_types.index(node_type)) & (candidates != node)]
+    nodes, counts = np.unique(candidates, return_counts=True)
+    order = np.argsort(-counts, kind="stable")
+    return list(zip(nodes[order].tolist(), counts[order].tolist()))
+
+def k_hop(graph, node, k, node_types_allowed=None):
+    # Returns the nodes within k hops of node with their distance, only walking through nodes of node_types_allowed if given
+    distances = np.full(len(graph["types"]), -1, dtype=np.int32)
+    allowed = None
+    if node_types_allowed is not None:
+        allowed = np.isin(graph["types"], [node_types.index(node_type) for node_type in node_types_allowed])
+    distances[node] = 0
+    frontier = np.array([node], dtype=np.int64)
+    for hop in range(1, k + 1):
+        if len(frontier) == 0:
+            break
+        reached, _ = expand(graph, frontier)
+        reached = np.unique(reached)
+        reached = reached[distances[reached] < 0]
+        if allowed is not None:
+            reached = reached[allowed[reached]]
+        distances[reached] = hop
+        frontier = reached.astype(np.int64)
+    nodes = np.flatnonzero(distances > 0)
+    return list(zip(nodes.tolist(), distances[nodes].tolist()))
+
+def shortest_path(graph, source, target, via_types=None):
+    # Returns the nodes of a shortest path from source to target, None if there is none. With via_types the path only runs
+    # through nodes of those types and of the types of its ends, e.g. ['firearm'] connects two actors through the guns
+    # they shared (actor, firearm, actor, firearm, ... actor).
+    parents = np.full(len(graph["types"]), -1, dtype=np.int64)
+    allowed = None
+    if via_types is not None:
+        allowed = np.isin(graph["types"], [node_types.index(node_type) for node_type in via_types] + [graph["types"][source], graph["types"][target]])
+    parents[source] = source
+    frontier = np.array([source], dtype=np.int64)
+    while len(frontier) > 0 and parents[target] < 0:
+        lengths = graph["indptr"][frontier + 1] - graph["indptr"][frontier]
+        reached, _ = expand(graph, frontier)
+        origins = np.repeat(frontier, lengths)
+        new = parents[reached] < 0
+        if allowed is not None:
+            new &= allowed[reached]
+        reached, index = np.unique(reached[new], return_index=True)
+        parents[reached] = origins[new][index]
+        frontier = reached
+    if parents[target] < 0:
+        return None
+    path = [target]
+    while path[-1] != source:
+        path.append(int(parents[path[-1]]))
+    return path[::-1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Exports the appearance graph of the imfdb database and answers questions about it.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Build the graph from the database and save it")
+    export.add_argument("directory")
+    export.add_argument("--sqlite", metavar="PATH", default=os.environ.get("IMFDB_SQLITE_PATH"), help="Read an SQLite database instead of PostgreSQL")
+    for command, help in [("neighbors", "Neighbors of a node"), ("co-occurrences", "Nodes sharing neighbors with a node"), ("k-hop", "Nodes within k hops of a node")]:
+        subparser = subparsers.add_parser(command, help=help)
+        subparser.add_argument("directory")
+        subparser.add_argument("name")
+        subparser.add_argument("--type", choices=node_types, help="Type of the node called name")
+        subparser.add_argument("--of", choices=node_types, help="Only return nodes of this type")
+        subparser.add_argument("--via", choices=node_types, default="firearm", help="Shared neighbors of this type (co-occurrences)")
+        subparser.add_argument("-k", type=int, default=2, help="Number of hops (k-hop)")
+        subparser.add_argument("--limit", type=int, default=20)
+    path = subparsers.add_parser("path", help="Shortest path between two nodes")
+    path.add_argument("directory")
+    path.add_argument("source")
+    path.add_argument("target")
+    path.add_argument("--type", choices=node_types, default="actor", help="Type of source and target (default: actor)")
+    path.add_argument("--via", choices=node_types, action="append", help="Only walk through nodes of this type, may be repeated")
+    parser.add_argument("--log-level", default=imfdb.default_log_level, choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Minimum level of messages to write (default: INFO, or IMFDB_LOG_LEVEL)")
+    args = parser.parse_args()
+
+    imfdb.configure_logging(args.log_level)
+
+    if args.command == "export":
+        imfdb.use_sqlite(args.sqlite)
+        start = time.perf_counter()
+        graph = build_graph()
+        save_graph(graph, args.directory)
+        imfdb.logger.info("Saved %s nodes and %s edges to %s in %.1fs", len(graph["types"]), len(graph["indices"]), args.directory, time.perf_counter() - start)
+        return 0
+
+    graph = load_graph(args.directory)
+    names = [args.source, args.target] if args.command == "path" else [args.name]
+    nodes = [find_node(graph, name, args.type) for name in names]
+    for name, node in zip(names, nodes):
+        if node is None:
+            imfdb.logger.error("No node called '%s' was found!", name)
+            return 1
+    if args.command == "path":
+        result = shortest_path(graph, nodes[0], nodes[1], args.via)
+        if result is None:
+            imfdb.logger.error("No path was found between '%s' and '%s'.", args.source, args.target)
+            return 1
+        for node_type, name in describe(graph, result):
+            print(f"{node_type}: {name}")
+        return 0
+    if args.command == "neighbors":
+        result = neighbors(graph, nodes[0], args.of)
+    elif args.command == "co-occurrences":
+        result = co_occurrences(graph, nodes[0], args.of or node_types[graph["types"][nodes[0]]], args.via)
+    else:
+        result = k_hop(graph, nodes[0], args.k)
+        if args.of is not None:
+            result = [(node, distance) for node, distance in result if node_types[graph["types"][node]] == args.of]
+    for node, value in result[:args.limit]:
+        print(f"{value:>6}  {node_types[graph['types'][node]]}: {graph['names'][node]}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+# Read access to a database built by imfdb_connector.py, for services and ad hoc analysis. The common lookups of
+# db/sample statements.txt run as parameterized, prepared statements (PREPARE on PostgreSQL, SQLite caches its compiled
+# statements on its own), and their results are kept in an LRU cache. The cache is cleared as soon as a pipeline stage
+# has committed rows, which commit_writes() and run_stage() record in the stageversions table.
+#
+#   import imfdb_queries
+#   imfdb_queries.firearms_by_actor("Arnold Schwarzenegger")
+#   imfdb_queries.top_firearms("movies", 20)
+#
+# Connections are the per-thread connections of imfdb_connector.py, configured the same way (PG_IMFDB_* or
+# IMFDB_SQLITE_PATH). Every lookup ends its transaction right away, so don't mix lookups with uncommitted writes in the
+# same thread.
+
+import collections
+import re
+import threading
+import time
+import weakref
+
+import imfdb_connector as imfdb
+
+# Statements of the lookups by name, with the types of their parameters ($1, $2, ...) and the columns of their rows.
+# Appearances in movies and television are returned together, with their year as text because television years are.
+queries_dict = {
+    "firearms_by_actor" : {
+        "types" : ["text"],
+        "columns" : ["firearmtitle", "title", "media", "character", "year"],
+        "statement" : """
+            SELECT f.firearmtitle, m.movietitle, 'movie', maf."character", CAST(maf.year AS text)
+            FROM actors a
+            INNER JOIN movies_actors_firearms maf ON maf.actorid = a.actorid
+            INNER JOIN firearms f ON f.firearmid = maf.firearmid
+            INNER JOIN movies m ON m.movieid = maf.movieid
+            WHERE a.actorname = $1 AND f.isfamily = FALSE
+            UNION ALL
+            SELECT f.firearmtitle, t.tvseriestitle, 'tvseries', taf."character", taf.year
+            FROM actors a
+            INNER JOIN tvseries_actors_firearms taf ON taf.actorid = a.actorid
+            INNER JOIN firearms f ON f.firearmid = taf.firearmid
+            INNER JOIN tvseries t ON t.tvseriesid = taf.tvseriesid
+            WHERE a.actorname = $1 AND f.isfamily = FALSE
+            ORDER BY 5, 2, 1"""
+    },
+    "actors_by_firearm" : {
+        "types" : ["text"],
+        "columns" : ["actorname", "title", "media", "character", "year"],
+        "statement" : """
+            SELECT a.actorname, m.movietitle, 'movie', maf."character", CAST(maf.year AS text)
+            FROM firearms f
+            INNER JOIN movies_actors_firearms maf ON maf.firearmid = f.firearmid
+            INNER JOIN actors a ON a.actorid = maf.actorid
+            INNER JOIN movies m ON m.movieid = maf.movieid
+            WHERE f.firearmtitle = $1
+            UNION ALL
+            SELECT a.actorname, t.tvseriestitle, 'tvseries', taf."character", taf.year
+            FROM firearms f
+            INNER JOIN tvseries_actors_firearms taf ON taf.firearmid = f.firearmid
+            INNER JOIN actors a ON a.actorid = taf.actorid
+            INNER JOIN tvseries t ON t.tvseriesid = taf.tvseriesid
+            WHERE f.firearmtitle = $1
+            ORDER BY 5, 2, 1"""
+    },
+    "appearances_by_movie" : {
+        "types" : ["text"],
+        "columns" : ["firearmtitle", "actorname", "character", "note", "year"],
+        "statement" : """
+            SELECT f.firearmtitle, a.actorname, maf."character", maf.note, CAST(maf.year AS text)
+            FROM movies m
+            INNER JOIN movies_actors_firearms maf ON maf.movieid = m.movieid
+            INNER JOIN firearms f ON f.firearmid = maf.firearmid
+            LEFT JOIN actors a ON a.actorid = maf.actorid
+            WHERE m.movietitle = $1
+            ORDER BY 1, 2"""
+    },
+    "appearances_by_tvseries" : {
+        "types" : ["text"],
+        "columns" : ["firearmtitle", "actorname", "character", "note", "year"],
+        "statement" : """
+            SELECT f.firearmtitle, a.actorname, taf."character", taf.note, taf.year
+            FROM tvseries t
+            INNER JOIN tvseries_actors_firearms taf ON taf.tvseriesid = t.tvseriesid
+            INNER JOIN firearms f ON f.firearmid = taf.firearmid
+            LEFT JOIN actors a ON a.actorid = taf.actorid
+            WHERE t.tvseriestitle = $1
+            ORDER BY 1, 2"""
+    },
+    "top_firearms_in_movies" : {
+        "types" : ["integer"],
+        "columns" : ["firearmtitle", "appearances"],
+        "statement" : """
+            SELECT f.firearmtitle, count(*)
+            FROM movies_actors_firearms maf
+            INNER JOIN firearms f ON f.firearmid = maf.firearmid
+            WHERE f.isfamily = FALSE
+            GROUP BY f.firearmtitle
+            ORDER BY 2 DESC, 1
+            LIMIT $1"""
+    },
+    "top_firearms_in_tvseries" : {
+        "types" : ["integer"],
+        "columns" : ["firearmtitle", "appearances"],
+        "statement" : """
+            SELECT f.firearmtitle, count(*)
+            FROM tvseries_actors_firearms taf
+            INNER JOIN firearms f ON f.firearmid = taf.firearmid
+            WHERE f.isfamily = FALSE
+            GROUP BY f.firearmtitle
+            ORDER BY 2 DESC, 1
+            LIMIT $1"""
+    },
+    "top_actors" : {
+        "types" : ["integer"],
+        "columns" : ["actorname", "appearances"],
+        "statement" : """
+            SELECT a.actorname, count(*)
+            FROM (SELECT actorid FROM movies_actors_firearms UNION ALL SELECT actorid FROM tvseries_actors_firearms) appearances
+            INNER JOIN actors a ON a.actorid = appearances.actorid
+            WHERE a.actorname != 'Dummy / Uncredited Extra'
+            GROUP BY a.actorid, a.actorname
+            ORDER BY 2 DESC, 1
+            LIMIT $1"""
+    }
+}
+
+for name, query in queries_dict.items():
+    query["row_type"] = collections.namedtuple(f"{name}_row", query["columns"])
+
+# Number of results kept in the cache, and the minimum number of seconds between two checks whether a stage has committed
+# rows since the cache was filled. Lookups may return results up to that old.
+query_cache_size = 4096
+query_cache_check_interval = 1.0
+
+cache_dict = {
+    "results" : collections.OrderedDict(), # (query name, parameters) -> rows, least recently used first
+    "lock" : threading.Lock(),
+    "version" : None, # Sum of the stage versions the cached results were read at
+    "checked" : 0.0,
+    "hits" : 0,
+    "misses" : 0
+}
+
+# Names of the statements prepared on each connection. Connections of the pool move between threads, and prepared
+# statements stay with the connection.
+prepared_dict = {
+    "names" : weakref.WeakKeyDictionary(), # connection -> names
+    "lock" : threading.Lock()
+}
+
+def clear_cache():
+    with cache_dict["lock"]:
+        cache_dict["results"].clear()
+        cache_dict["version"] = None
+
+def get_cache_info():
+    with cache_dict["lock"]:
+        return {"hits" : cache_dict["hits"], "misses" : cache_dict["misses"], "size" : len(cache_dict["results"]), "version" : cache_dict["version"]}
+
+def get_database_version():
+    # Changes whenever a pipeline stage commits rows or finishes
+    cursor = imfdb.get_cursor()
+    try:
+        cursor.execute("SELECT coalesce(sum(version), 0) FROM stageversions")
+        return cursor.fetchone()[0]
+    finally:
+        imfdb.get_connection().rollback()
+
+def check_cache():
+    # Clears the cache if a stage has committed rows since it was filled, at most once every query_cache_check_interval seconds
+    now = time.monotonic()
+    if now - cache_dict["checked"] < query_cache_check_interval:
+        return
+    version = get_database_version()
+    with cache_dict["lock"]:
+        cache_dict["checked"] = now
+        if version != cache_dict["version"]:
+            cache_dict["results"].clear()
+            cache_dict["version"] = version
+
+def get_prepared_statements():
+    # Returns the names of the statements prepared on the connection of the calling thread
+    connection = imfdb.get_connection()
+    with prepared_dict["lock"]:
+        return prepared_dict["names"].setdefault(connection, set())
+
+def execute_query(name, parameters):
+    query = queries_dict[name]
+    cursor = imfdb.get_cursor()
+    try:
+        if imfdb.is_sqlite():
+            cursor.execute(re.sub(r"\$(\d+)", r"?\1", query["statement"]), parameters)
+        else:
+            prepared = get_prepared_statements()
+            if name not in prepared:
+                cursor.execute(f"PREPARE imfdb_{name} ({', '.join(query['types'])}) AS {query['statement']}")
+                prepared.add(name)
+            cursor.execute(f"EXECUTE imfdb_{name} ({', '.join(['%s'] * len(parameters))})", parameters)
+        rows = cursor.fetchall()
+    finally:
+        imfdb.get_connection().rollback() # Never keep a snapshot or locks open between lookups
+    return tuple(query["row_type"](*row) for row in rows)
+
+def run_query(name, *parameters):
+    # Returns the rows of a query of queries_dict as a tuple of named tuples, from the cache if possible
+    check_cache()
+    key = (name, parameters)
+    with cache_dict["lock"]:
+        if key in cache_dict["results"]:
+            cache_dict["results"].move_to_end(key)
+            cache_dict["hits"] += 1
+            return cache_dict["results"][key]
+        cache_dict["misses"] += 1
+        version = cache_dict["version"]
+    rows = execute_query(name, parameters)
+    with cache_dict["lock"]:
+        if cache_dict["version"] != version: # The cache was cleared while the query ran, its rows may predate the change
+            return rows
+        cache_dict["results"][key] = rows
+        if len(cache_dict["results"]) > query_cache_size:
+            cache_dict["results"].popitem(last=False)
+    return rows
+
+def firearms_by_actor(actorname):
+    # Every appearance of a firearm in the hands of an actor, e.g. firearms_by_actor("Arnold Schwarzenegger")
+    return run_query("firearms_by_actor", actorname)
+
+def actors_by_firearm(firearmtitle):
+    # Every appearance of a firearm with the actor using it
+    return run_query("actors_by_firearm", firearmtitle)
+
+def appearances_by_movie(movietitle):
+    return run_query("appearances_by_movie", movietitle)
+
+def appearances_by_tvseries(tvseriestitle):
+    return run_query("appearances_by_tvseries", tvseriestitle)
+
+def top_firearms(media="movies", limit=10):
+    # The firearms with the most appearances in 'movies' or 'tvseries'
+    if media not in ("movies", "tvseries"):
+        raise ValueError(f"media must be 'movies' or 'tvseries', not '{media}'")
+    return run_query(f"top_firearms_in_{media}", limit)
+
+def top_actors(limit=10):
+    # The actors with the most firearm appearances in movies and television
+    return run_query("top_actors", limit)
@@ -0,0 +1,18 @@
+# Shared fixtures. Tests run against the SQLite backend, so they need neither PostgreSQL nor network access.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import imfdb_connector as imfdb
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    # An empty database with the schema of db/imfdb_structure.sql, used by the connections of this process
+    path = str(tmp_path / "imfdb.db")
+    imfdb.use_sqlite(path)
+    yield path
+    imfdb.use_sqlite(None)
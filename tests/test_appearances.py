@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+import imfdb_connector as imfdb
+
+fixture_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmark", "fixtures", "Gun", "1001.html")
+
+@pytest.fixture
+def page():
+    with open(fixture_path, encoding="utf-8") as file:
+        return file.read()
+
+@pytest.fixture
+def database(sqlite_db):
+    # The pages the appearance tables of the fixture link to, and the firearm itself
+    imfdb.cursor.execute("INSERT INTO actors (actorpageid, actorname) VALUES ('1002', 'Val Kilmer')")
+    imfdb.cursor.execute("INSERT INTO movies (moviepageid, movietitle) VALUES ('1003', 'Heat (1995)')")
+    imfdb.cursor.execute("INSERT INTO tvseries (tvseriespageid, tvseriestitle) VALUES ('1004', 'Miami Vice')")
+    imfdb.cursor.execute("INSERT INTO firearms (firearmpageid, firearmtitle, isfamily) VALUES ('1001', 'Beretta 92FS', FALSE)")
+    imfdb.cnx.commit()
+    imfdb.load_link_resolver()
+    imfdb.cursor.execute("SELECT * FROM firearms")
+    return imfdb.cursor.fetchone()
+
+def test_both_tables_are_extracted_in_one_pass(page):
+    tables = imfdb.extract_appearance_tables(page, "firearm")
+    assert tables["Film"]["columns"] == ["Title", "Actor", "Character", "Note", "Date"]
+    assert tables["Film"]["rows"][0][:2] == [("Heat", "/wiki/Heat_(1995)"), ("Val Kilmer", "/wiki/Val_Kilmer")]
+    assert len(tables["Film"]["rows"]) == 2
+    assert len(tables["Television"]["rows"]) == 1
+
+def test_page_without_tables():
+    assert imfdb.extract_appearance_tables("<p>No appearances</p>", "firearm") == {"Film" : None, "Television" : None}
+
+def test_columns_are_classified_per_table(page):
+    df = imfdb.extract_dataframe_from_html_table(page, "Television", "firearm")
+    assert imfdb.classify_appearance_columns(df, "Television") == {"title" : "Show", "actor" : "Actor", "character" : "Character",
+                                                                    "note" : "Note", "date" : "Air Date"}
+
+def test_rows_are_routed_to_their_junction_tables(page, database):
+    dummy_uuid = imfdb.insert_dummy_actor()
+    for table_name, table in imfdb.extract_appearance_tables(page, database[0]).items():
+        imfdb.insert_appearances_from_dataframe(imfdb.get_dataframe_from_extraction(table), table_name, database, dummy_uuid)
+    imfdb.commit_writes()
+    imfdb.cursor.execute("""SELECT a.actorname, maf."character", maf.year FROM movies_actors_firearms maf
+                            INNER JOIN actors a ON a.actorid = maf.actorid ORDER BY maf."character" """)
+    assert imfdb.cursor.fetchall() == [("Val Kilmer", "Chris Shiherlis", 1995), ("Dummy / Uncredited Extra", "LAPD Officer", 1995)]
+    imfdb.cursor.execute("""SELECT t.tvseriestitle, taf.year FROM tvseries_actors_firearms taf
+                            INNER JOIN tvseries t ON t.tvseriesid = taf.tvseriesid""")
+    assert imfdb.cursor.fetchall() == [("Miami Vice", "1986")]
+
+def test_images_of_a_page():
+    html = '<img src="/images/thumb/4/4b/Foo.jpg/600px-Foo.jpg"/><img src="/images/a/ab/Bar_baz.png"/>'
+    urls = imfdb.extract_images_from_html(html)
+    assert urls == ["/images/thumb/4/4b/Foo.jpg/600px-Foo.jpg", "/images/a/ab/Bar_baz.png"]
+    assert [imfdb.get_image_filename(url) for url in urls] == ["Foo.jpg", "Bar baz.png"]
+    assert imfdb.get_image_filename("/resources/assets/poweredby_mediawiki_88x31.png") is None
@@ -0,0 +1,33 @@
+import pytest
+
+import imfdb_connector as imfdb
+
+members = [{"pageid" : 1, "title" : "Tom Sizemore"}, {"pageid" : 2, "title" : "Category:Stuntmen"}, {"pageid" : 3, "title" : "Val Kilmer"}]
+
+@pytest.fixture
+def wiki(monkeypatch):
+    # A category of two actors and a subcategory, served by another MediaWiki instance than imfdb.org
+    monkeypatch.setattr(imfdb, "imfdb_url", "http://localhost:8080")
+    monkeypatch.setattr(imfdb, "iterate_categorymembers", lambda cmtitle, format: iter(members))
+    monkeypatch.setattr(imfdb, "get_page_sources_by_ids", lambda pageids: [(f"<p>{pageid}</p>", None) for pageid in pageids])
+
+def test_pages_are_streamed_without_subcategories(wiki):
+    pages = sorted(imfdb.stream_category_pages("Category:Actor"), key=lambda page: page[0]["pageid"])
+    assert [(member["title"], html, wikitext) for member, html, wikitext in pages] == [("Tom Sizemore", "<p>1</p>", None),
+                                                                                        ("Val Kilmer", "<p>3</p>", None)]
+    assert [member["title"] for member, _, _ in imfdb.stream_category_pages("Category:Actor", skip={"1"})] == ["Val Kilmer"]
+
+def test_enumeration_errors_reach_the_stage(wiki, monkeypatch):
+    def fail(cmtitle, format):
+        raise RuntimeError("Enumerating failed")
+        yield
+    monkeypatch.setattr(imfdb, "iterate_categorymembers", fail)
+    with pytest.raises(RuntimeError):
+        list(imfdb.stream_category_pages("Category:Actor"))
+
+def test_stored_urls_point_at_the_wiki_they_came_from(wiki, sqlite_db):
+    imfdb.populate_category_table("actors")
+    imfdb.cursor.execute("SELECT actorname, actorurl FROM actors ORDER BY actorpageid")
+    assert imfdb.cursor.fetchall() == [("Tom Sizemore", "http://localhost:8080/index.php?curid=1"),
+                                       ("Val Kilmer", "http://localhost:8080/index.php?curid=3")]
+    assert imfdb.load_checkpoints("actors") == set()
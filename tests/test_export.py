@@ -0,0 +1,30 @@
+import pyarrow.parquet as pq
+import pytest
+
+import imfdb_connector as imfdb
+import imfdb_export
+
+@pytest.fixture
+def database(sqlite_db):
+    imfdb.cursor.execute("INSERT INTO actors (actorpageid, actorname, actorpagecontent) VALUES ('1', 'Don Johnson', '<p>html</p>')")
+    imfdb.cursor.execute("INSERT INTO tvseries (tvseriespageid, tvseriestitle) VALUES ('2', 'Miami Vice')")
+    imfdb.cursor.execute("INSERT INTO firearms (firearmpageid, firearmtitle, isfamily) VALUES ('3', 'Bren Ten', FALSE)")
+    imfdb.cursor.execute("""INSERT INTO tvseries_actors_firearms (tvseriesid, firearmid, actorid, "character", year)
+                            SELECT t.tvseriesid, f.firearmid, a.actorid, 'Sonny Crockett', '1984-1986' FROM tvseries t, firearms f, actors a""")
+    imfdb.cnx.commit()
+
+def test_html_is_left_out(database, tmp_path):
+    imfdb_export.export_database(str(tmp_path), ["actors"], appearances=False)
+    table = pq.read_table(str(tmp_path / "actors.parquet"))
+    assert "actorpagecontent" not in table.column_names
+    assert "actorwikitext" not in table.column_names
+    assert table.column("actorname").to_pylist() == ["Don Johnson"]
+    imfdb_export.export_database(str(tmp_path), ["actors"], include_html=True, appearances=False)
+    assert pq.read_table(str(tmp_path / "actors.parquet")).column("actorpagecontent").to_pylist() == ["<p>html</p>"]
+
+def test_appearances_are_joined(database, tmp_path):
+    imfdb_export.export_database(str(tmp_path), ["firearms"])
+    rows = pq.read_table(str(tmp_path / "appearances.parquet")).to_pylist()
+    assert [(row["media"], row["firearmtitle"], row["actorname"], row["title"], row["year"], row["firstyear"]) for row in rows] == [
+        ("tvseries", "Bren Ten", "Don Johnson", "Miami Vice", "1984-1986", 1984)]
+    assert pq.read_table(str(tmp_path / "firearms.parquet")).column("isfamily").to_pylist() == [False]
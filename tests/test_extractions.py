@@ -0,0 +1,80 @@
+import pytest
+
+import imfdb_connector as imfdb
+
+@pytest.fixture
+def extractor(sqlite_db, monkeypatch):
+    # A test extractor whose derived rows are checkpoints of the entity, recording the content it extracts
+    calls = []
+    state = {"value" : None}
+    def extract(html_content):
+        calls.append(html_content)
+        return html_content.upper()
+    monkeypatch.setitem(imfdb.extractors_dict, "test", {
+        "function" : extract,
+        "version" : 1,
+        "derived" : ["DELETE FROM checkpoints WHERE entityid = %s"],
+        "state" : lambda: state["value"]
+    })
+    return calls, state
+
+def write_derived_row(entityid):
+    imfdb.cursor.execute("INSERT INTO checkpoints (stage, entityid) VALUES ('test', %s)", (entityid,))
+
+def count_derived_rows(entityid):
+    imfdb.cursor.execute("SELECT count(*) FROM checkpoints WHERE entityid = %s", (entityid,))
+    return imfdb.cursor.fetchone()[0]
+
+def test_unchanged_page_is_skipped(extractor):
+    calls, _ = extractor
+    assert imfdb.extract_page("test", "firearm-1", "12", "<p>a</p>") == (False, "<P>A</P>")
+    write_derived_row("firearm-1")
+    assert imfdb.extract_page("test", "firearm-1", "12", "<p>a</p>") == (True, None)
+    assert count_derived_rows("firearm-1") == 1
+    assert calls == ["<p>a</p>"]
+
+def test_changed_page_deletes_its_rows(extractor):
+    calls, _ = extractor
+    imfdb.extract_page("test", "firearm-1", "12", "<p>a</p>")
+    write_derived_row("firearm-1")
+    assert imfdb.extract_page("test", "firearm-1", "12", "<p>b</p>") == (False, "<P>B</P>")
+    assert count_derived_rows("firearm-1") == 0
+    imfdb.cursor.execute("SELECT count(*) FROM extractedpages WHERE extractor = 'test'")
+    assert imfdb.cursor.fetchone()[0] == 1 # The record of the old content is replaced
+
+def test_rebuilt_row_reuses_the_extraction(extractor):
+    # After a rebuild the same page belongs to a new row, which has no rows yet
+    calls, _ = extractor
+    imfdb.extract_page("test", "firearm-1", "12", "<p>a</p>")
+    assert imfdb.extract_page("test", "firearm-2", "12", "<p>a</p>") == (False, "<P>A</P>")
+    assert calls == ["<p>a</p>"]
+    assert imfdb.extract_page("test", "firearm-2", "12", "<p>a</p>") == (True, None)
+
+def test_changed_state_rewrites_rows(extractor):
+    calls, state = extractor
+    state["value"] = "redirects:1"
+    imfdb.extract_page("test", "firearm-1", "12", "<p>a</p>")
+    write_derived_row("firearm-1")
+    assert imfdb.extract_page("test", "firearm-1", "12", "<p>a</p>")[0]
+    state["value"] = "redirects:2"
+    assert imfdb.extract_page("test", "firearm-1", "12", "<p>a</p>") == (False, "<P>A</P>")
+    assert count_derived_rows("firearm-1") == 0
+    assert calls == ["<p>a</p>"]
+
+def test_version_bump_extracts_again(extractor, monkeypatch):
+    calls, _ = extractor
+    imfdb.extract_page("test", "firearm-1", "12", "<p>a</p>")
+    monkeypatch.setitem(imfdb.extractors_dict["test"], "version", 2)
+    assert imfdb.extract_page("test", "firearm-1", "12", "<p>a</p>") == (False, "<P>A</P>")
+    assert calls == ["<p>a</p>", "<p>a</p>"]
+
+def test_resolver_state_follows_stage_versions(sqlite_db):
+    imfdb.record_stage_version("redirects")
+    imfdb.load_link_resolver()
+    first = imfdb.get_resolver_state()
+    imfdb.record_stage_version("appearances") # Not an input of the resolver
+    imfdb.load_link_resolver()
+    assert imfdb.get_resolver_state() == first
+    imfdb.record_stage_version("redirects")
+    imfdb.load_link_resolver()
+    assert imfdb.get_resolver_state() != first
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import imfdb_connector as imfdb
+
+benchmark_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmark")
+sys.path.insert(0, benchmark_directory)
+
+import corpus
+
+def test_fixture_pages_are_loaded():
+    pages = corpus.build_corpus(scale=0, fixtures=os.path.join(benchmark_directory, "fixtures"))["pages"]
+    assert {pageid : (page["title"], page["category"]) for pageid, page in pages.items()} == {
+        "1001" : ("Beretta 92FS", "Gun"),
+        "1002" : ("Val Kilmer", "Actor"),
+        "1003" : ("Heat (1995)", "Movie"),
+        "1004" : ("Miami Vice", "Television")
+    }
+    assert all(page["wikitext"] is not None for page in pages.values())
+
+def test_both_page_sources_of_a_fixture_give_the_same_specification():
+    page = corpus.build_corpus(scale=0, fixtures=os.path.join(benchmark_directory, "fixtures"))["pages"]["1001"]
+    from_html = imfdb.get_single_specification(page["html"])
+    from_wikitext = imfdb.get_single_specification(imfdb.render_wikitext(page["title"], page["wikitext"]))
+    assert from_html == from_wikitext
+    assert from_html["caliber"] == "9x19mm Parabellum"
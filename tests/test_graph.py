@@ -0,0 +1,53 @@
+import pytest
+
+import imfdb_connector as imfdb
+import imfdb_graph
+
+@pytest.fixture
+def graph(sqlite_db, tmp_path):
+    # Arnold and Michael use the same pistol in different movies, Sigourney a rifle that Michael used as well.
+    # An uncredited extra holds the rifle in Aliens, which must not connect the actors.
+    imfdb.cursor.execute("""INSERT INTO actors (actorpageid, actorname) VALUES ('1', 'Arnold Schwarzenegger'), ('2', 'Michael Biehn'),
+                            ('3', 'Sigourney Weaver'), ('0', 'Dummy / Uncredited Extra')""")
+    imfdb.cursor.execute("INSERT INTO firearms (firearmpageid, firearmtitle, isfamily) VALUES ('10', 'Colt M1911', FALSE), ('11', 'M41A Pulse Rifle', FALSE)")
+    imfdb.cursor.execute("INSERT INTO movies (moviepageid, movietitle) VALUES ('20', 'The Terminator (1984)'), ('21', 'Aliens (1986)')")
+    for actor, firearm, movie in [("Arnold Schwarzenegger", "Colt M1911", "The Terminator (1984)"),
+                                  ("Michael Biehn", "Colt M1911", "Aliens (1986)"),
+                                  ("Michael Biehn", "M41A Pulse Rifle", "Aliens (1986)"),
+                                  ("Sigourney Weaver", "M41A Pulse Rifle", "Aliens (1986)"),
+                                  ("Sigourney Weaver", "M41A Pulse Rifle", "Aliens (1986)"),
+                                  ("Dummy / Uncredited Extra", "M41A Pulse Rifle", "Aliens (1986)")]:
+        imfdb.cursor.execute("""INSERT INTO movies_actors_firearms (movieid, firearmid, actorid)
+                                SELECT m.movieid, f.firearmid, a.actorid FROM movies m, firearms f, actors a
+                                WHERE m.movietitle = %s AND f.firearmtitle = %s AND a.actorname = %s""", (movie, firearm, actor))
+    imfdb.cnx.commit()
+    imfdb_graph.save_graph(imfdb_graph.build_graph(), str(tmp_path / "graph"))
+    return imfdb_graph.load_graph(str(tmp_path / "graph"))
+
+def find(graph, name):
+    return imfdb_graph.find_node(graph, name)
+
+def test_dummy_actor_is_left_out(graph):
+    assert find(graph, "Dummy / Uncredited Extra") is None
+    assert len(graph["names"]) == 7
+
+def test_neighbors_are_weighted_by_appearances(graph):
+    rifle = find(graph, "M41A Pulse Rifle")
+    assert imfdb_graph.describe(graph, [node for node, _ in imfdb_graph.neighbors(graph, rifle, "actor")]) == [
+        ("actor", "Sigourney Weaver"), ("actor", "Michael Biehn")]
+    assert imfdb_graph.neighbors(graph, rifle, "movie") == [(find(graph, "Aliens (1986)"), 4)] # The extra still links them
+
+def test_co_occurrences(graph):
+    biehn = find(graph, "Michael Biehn")
+    assert imfdb_graph.co_occurrences(graph, biehn, "actor", "firearm") == [(find(graph, "Arnold Schwarzenegger"), 1),
+                                                                           (find(graph, "Sigourney Weaver"), 1)]
+
+def test_shortest_path_through_firearms(graph):
+    path = imfdb_graph.shortest_path(graph, find(graph, "Arnold Schwarzenegger"), find(graph, "Sigourney Weaver"), ["firearm"])
+    assert [name for _, name in imfdb_graph.describe(graph, path)] == ["Arnold Schwarzenegger", "Colt M1911", "Michael Biehn",
+                                                                       "M41A Pulse Rifle", "Sigourney Weaver"]
+
+def test_k_hop(graph):
+    arnold = find(graph, "Arnold Schwarzenegger")
+    reached = dict(imfdb_graph.k_hop(graph, arnold, 2, ["actor", "firearm"]))
+    assert reached == {find(graph, "Colt M1911") : 1, find(graph, "Michael Biehn") : 2}
@@ -0,0 +1,58 @@
+import pytest
+
+import imfdb_connector as imfdb
+
+@pytest.fixture
+def resolver(sqlite_db, monkeypatch):
+    # Two actors with pages, one without and a redirect, and an API that answers every remaining title as missing
+    requests = []
+    def get_page_id_by_url(url, format):
+        requests.append(url)
+        return "-1"
+    monkeypatch.setattr(imfdb, "get_page_id_by_url", get_page_id_by_url)
+    imfdb.cursor.execute("INSERT INTO actors (actorpageid, actorname) VALUES ('10', 'Téa Leoni'), ('11', 'Robert De Niro'), ('0', 'Tom Sizemore')")
+    imfdb.cursor.execute("INSERT INTO redirects (frompageid, fromtitle, topageid, totitle) VALUES ('20', 'Bobby De Niro', '11', 'Robert De Niro')")
+    imfdb.cnx.commit()
+    imfdb.load_link_resolver()
+    return requests
+
+def get_actor_uuid(name):
+    imfdb.cursor.execute("SELECT actorid FROM actors WHERE actorname = %s", (name,))
+    return imfdb.cursor.fetchone()[0]
+
+def test_normalize_wiki_title():
+    assert imfdb.normalize_wiki_title("heat_%281995%29#Pistols") == "Heat (1995)"
+    assert imfdb.normalize_wiki_title("  ") is None
+
+def test_fold_name_key():
+    assert imfdb.fold_name_key("Téa  Leoni") == imfdb.fold_name_key("tea-leoni") == "tea leoni"
+
+def test_titles_resolve_locally(resolver):
+    assert imfdb.resolve_link("/wiki/Robert_De_Niro", "actors") == get_actor_uuid("Robert De Niro")
+    assert imfdb.resolve_link("/wiki/Bobby_De_Niro", "actors") == get_actor_uuid("Robert De Niro")
+    assert resolver == []
+
+def test_spelling_variants_resolve_to_the_page(resolver):
+    assert imfdb.resolve_link("/wiki/Tea_Leoni", "actors") == get_actor_uuid("Téa Leoni")
+    assert imfdb.insert_actor_without_page("TOM SIZEMORE") == get_actor_uuid("Tom Sizemore")
+    assert resolver == []
+
+def test_ambiguous_folded_names_are_not_resolved(resolver):
+    imfdb.add_folded_name("Tea Leoni", "actors", "another-uuid")
+    assert imfdb.lookup_folded_name("Téa Leoni", "actors") is None
+
+def test_missing_pages_are_asked_for_once(resolver):
+    assert imfdb.resolve_link("/wiki/Nobody", "actors") is None
+    assert imfdb.resolve_link("/wiki/Nobody", "actors") is None
+    assert resolver == ["/wiki/Nobody"]
+    assert imfdb.get_negative_lookup("/wiki/Nobody", "actors") == "missing"
+    imfdb.write_negative_lookup_hits()
+    assert [row[:3] + row[4:5] for row in imfdb.get_negative_lookup_report()] == [("actors", "Nobody", "missing", 1)]
+
+def test_expired_negative_lookups_are_dropped(resolver, monkeypatch):
+    imfdb.resolve_link("/wiki/Nobody", "actors")
+    imfdb.cnx.commit()
+    monkeypatch.setattr(imfdb, "negative_lookup_ttl_days", -1)
+    imfdb.load_link_resolver()
+    assert imfdb.get_negative_lookup("/wiki/Nobody", "actors") is None
+    assert imfdb.get_negative_lookup_report() == []
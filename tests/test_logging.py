@@ -0,0 +1,15 @@
+import logging
+
+import imfdb_connector as imfdb
+
+def test_one_default_level():
+    assert imfdb.logging_dict["level"] == imfdb.default_log_level
+    assert imfdb.configure_logging.__defaults__[0] == imfdb.default_log_level
+
+def test_repeated_warnings_are_rate_limited(monkeypatch):
+    monkeypatch.setattr(imfdb, "logging_dict", {**imfdb.logging_dict, "rate_limits" : {}})
+    limit = imfdb.RateLimitFilter()
+    records = [logging.LogRecord("imfdb", logging.WARNING, __file__, 1, "No wikitext for page %s!", (page,), None, "fetch") for page in range(imfdb.log_rate_limit_burst + 5)]
+    assert sum(limit.filter(record) for record in records) == imfdb.log_rate_limit_burst
+    error = logging.LogRecord("imfdb", logging.ERROR, __file__, 1, "No wikitext for page %s!", (0,), None, "fetch")
+    assert limit.filter(error)
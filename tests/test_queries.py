@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+import imfdb_connector as imfdb
+import imfdb_queries
+
+@pytest.fixture
+def database(sqlite_db, monkeypatch):
+    # One firearm appearing in one movie in the hands of one actor, and a cache that is checked on every lookup
+    monkeypatch.setattr(imfdb_queries, "query_cache_check_interval", 0)
+    imfdb_queries.clear_cache()
+    imfdb.cursor.execute("INSERT INTO actors (actorpageid, actorname) VALUES ('1', 'Arnold Schwarzenegger')")
+    imfdb.cursor.execute("INSERT INTO movies (movietitle, moviepageid) VALUES ('The Terminator (1984)', '2')")
+    imfdb.cursor.execute("INSERT INTO firearms (firearmpageid, firearmtitle, isfamily) VALUES ('3', 'Colt M1911', FALSE)")
+    imfdb.commit_writes()
+    yield
+    imfdb.metrics_dict["stage"] = None
+    imfdb_queries.clear_cache()
+
+def insert_appearance(character):
+    imfdb.queue_write("""INSERT INTO movies_actors_firearms (movieid, firearmid, actorid, "character", year)
+                         SELECT m.movieid, f.firearmid, a.actorid, %s, 1984 FROM movies m, firearms f, actors a""", (character,))
+
+def test_results_are_cached(database):
+    assert imfdb_queries.firearms_by_actor("Arnold Schwarzenegger") == ()
+    info = imfdb_queries.get_cache_info()
+    assert info["size"] == 1
+    assert imfdb_queries.firearms_by_actor("Arnold Schwarzenegger") == ()
+    assert imfdb_queries.get_cache_info()["hits"] == info["hits"] + 1
+
+def test_cache_is_cleared_by_committed_writes_of_a_running_stage(database, tmp_path):
+    imfdb.start_metrics("appearances", str(tmp_path))
+    assert imfdb_queries.firearms_by_actor("Arnold Schwarzenegger") == ()
+    insert_appearance("The Terminator")
+    imfdb.commit_writes()
+    rows = imfdb_queries.firearms_by_actor("Arnold Schwarzenegger")
+    assert [(row.firearmtitle, row.title, row.character) for row in rows] == [("Colt M1911", "The Terminator (1984)", "The Terminator")]
+    imfdb.cursor.execute("SELECT version FROM stageversions WHERE stage = 'appearances'")
+    assert imfdb.cursor.fetchone()[0] == 1
+
+def test_commits_without_writes_keep_the_cache(database, tmp_path):
+    imfdb.start_metrics("appearances", str(tmp_path))
+    imfdb_queries.firearms_by_actor("Arnold Schwarzenegger")
+    info = imfdb_queries.get_cache_info()
+    imfdb.commit_writes()
+    imfdb_queries.firearms_by_actor("Arnold Schwarzenegger")
+    assert imfdb_queries.get_cache_info()["version"] == info["version"]
+    assert imfdb_queries.get_cache_info()["hits"] == info["hits"] + 1
+
+def test_finished_stage_clears_the_cache(database):
+    imfdb_queries.top_firearms("movies", 5)
+    misses = imfdb_queries.get_cache_info()["misses"]
+    imfdb.record_stage_version("firearms")
+    imfdb_queries.top_firearms("movies", 5)
+    assert imfdb_queries.get_cache_info()["misses"] == misses + 1
+
+def test_results_read_before_a_clear_are_not_cached(database, monkeypatch):
+    execute_query = imfdb_queries.execute_query
+    def execute_during_a_stage_commit(name, parameters):
+        rows = execute_query(name, parameters)
+        imfdb.record_stage_version("appearances")
+        imfdb_queries.check_cache()
+        return rows
+    monkeypatch.setattr(imfdb_queries, "execute_query", execute_during_a_stage_commit)
+    imfdb_queries.firearms_by_actor("Arnold Schwarzenegger")
+    assert imfdb_queries.get_cache_info()["size"] == 0
+
+def test_prepared_statements_follow_the_connection(monkeypatch):
+    # A pooled connection keeps its prepared statements when another thread checks it out
+    connections = [object.__new__(type("Connection", (), {})) for _ in range(2)]
+    current = threading.local()
+    monkeypatch.setattr(imfdb, "get_connection", lambda: current.connection)
+
+    def prepare(connection, name):
+        current.connection = connection
+        imfdb_queries.get_prepared_statements().add(name)
+
+    thread = threading.Thread(target=prepare, args=(connections[0], "top_actors"))
+    thread.start()
+    thread.join()
+    current.connection = connections[0]
+    assert imfdb_queries.get_prepared_statements() == {"top_actors"}
+    current.connection = connections[1]
+    assert imfdb_queries.get_prepared_statements() == set()
+
+def test_top_firearms_rejects_other_media():
+    with pytest.raises(ValueError):
+        imfdb_queries.top_firearms("anime")
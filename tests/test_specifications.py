@@ -0,0 +1,62 @@
+import pytest
+
+import imfdb_connector as imfdb
+
+@pytest.mark.parametrize("caliber, canonical", [
+    (".308 Winchester", "7.62x51mm"),
+    ("308 Winchester", "7.62x51mm"),
+    ("7.62x51mm NATO", "7.62x51mm"),
+    (".44 Magnum", ".44 magnum"),
+    (".50 BMG", ".50 bmg"),
+    (".30-06 Springfield", ".30-06 springfield"),
+    ("30-06 Springfield", ".30-06 springfield"),
+    (".303 British", ".303 british"),
+    (".40 S&W", ".40 s&w"),
+    ("40 S&W", ".40 s&w"),
+    (".45 ACP", ".45 acp"),
+    ("45 ACP", ".45 acp"),
+    (".45 Auto", ".45 acp"),
+    (".380 ACP", "9x17mm"),
+    ("9x19mm Parabellum", "9x19mm"),
+    ("9mm Luger.", "9x19mm"),
+    ("9×19mm[1]", "9x19mm"),
+    ("7.62x54mmR", "7.62x54mmr"),
+    ("12 gauge", "12 gauge"),
+    ("12-gauge", "12 gauge"),
+    ("12 ga", "12 gauge"),
+    ("20mm", "20mm"),
+    ("12.7x99mm NATO", "12.7x99mm"),
+    ("12.7x108mm", "12.7x108mm"),
+    ("14.5x114mm", "14.5x114mm"),
+    ("12.7mm", "12.7mm"),
+    ("20 x 102mm", "20x102mm"),
+    ("40 mm grenade", "40 mm grenade"),
+    (" (see below)", None)
+])
+def test_canonicalize_caliber(caliber, canonical):
+    assert imfdb.canonicalize_caliber(caliber) == canonical
+
+def test_calibers_of_one_cartridge_are_merged():
+    assert imfdb.get_calibers("7.62x51mm NATO, .308 Winchester") == ["7.62x51mm"]
+    assert imfdb.get_calibers("9x19mm Parabellum / .40 S&W or .45 ACP") == ["9x19mm", ".40 s&w", ".45 acp"]
+    assert imfdb.get_calibers("12.7x99mm NATO") == ["12.7x99mm"]
+    assert imfdb.get_calibers(None) == []
+
+def test_page_without_headers_has_no_specification():
+    assert imfdb.get_single_specification("<p>No headers</p>") is None
+
+def test_capacity_range():
+    assert imfdb.get_capacity_range("20 or 30-round box magazine") == (20, 30)
+    assert imfdb.get_capacity_range("Single shot") == (1, 1)
+    assert imfdb.get_capacity_range(None) == (None, None)
+
+def test_fire_mode_flags():
+    flags = imfdb.get_fire_mode_flags("Semi-Automatic, Fully-Automatic")
+    assert flags["issemiautomatic"] and flags["isfullyautomatic"] and not flags["isburst"]
+    assert not imfdb.get_fire_mode_flags("Semi-Automatic")["isfullyautomatic"]
+    assert imfdb.get_fire_mode_flags(None)["isboltaction"] is None
+
+def test_production_years():
+    assert imfdb.get_production_years("(1985 - Present)") == (1985, None)
+    assert imfdb.get_production_years("(1911 - 1985)") == (1911, 1985)
+    assert imfdb.get_production_years(None) == (None, None)
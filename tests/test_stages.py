@@ -0,0 +1,71 @@
+import pytest
+
+import imfdb_connector as imfdb
+
+@pytest.fixture
+def stage(sqlite_db):
+    # A clean quarantine cache, which is otherwise cleared when a stage starts
+    imfdb.page_budget_dict["quarantined"].clear()
+    yield "appearances"
+    imfdb.page_budget_dict["quarantined"].clear()
+
+def insert_row(entityid):
+    imfdb.cursor.execute("INSERT INTO checkpoints (stage, entityid) VALUES ('test', %s)", (entityid,))
+
+def fail(entityid):
+    insert_row(entityid)
+    raise ValueError("broken table")
+
+def count_rows():
+    imfdb.cursor.execute("SELECT count(*) FROM checkpoints WHERE stage = 'test'")
+    return imfdb.cursor.fetchone()[0]
+
+def test_default_stages_leave_out_optional_ones():
+    assert "downloads" not in imfdb.get_default_stages()
+    assert imfdb.get_default_stages()[:4] == ["actors", "movies", "tvseries", "firearms"]
+
+def test_downstream_stages():
+    assert imfdb.get_downstream_stages("redirects") == ["redirects", "appearances"]
+    assert imfdb.get_downstream_stages("firearms") == ["firearms", "family", "specifications", "appearances", "images"]
+
+def test_checkpoints_survive_until_cleared(stage):
+    imfdb.write_checkpoint(stage, "1")
+    imfdb.write_checkpoint(stage, "1")
+    imfdb.commit_writes()
+    assert imfdb.load_checkpoints(stage) == {"1"}
+    imfdb.clear_checkpoints(stage)
+    imfdb.commit_writes()
+    assert imfdb.load_checkpoints(stage) == set()
+
+def test_failed_page_is_rolled_back_and_quarantined(stage):
+    assert imfdb.run_page(stage, "1", insert_row, "1")
+    assert not imfdb.run_page(stage, "2", fail, "2")
+    imfdb.commit_writes()
+    assert count_rows() == 1
+    imfdb.cursor.execute("SELECT entityid, reason, exception FROM quarantine")
+    entityid, reason, exception = imfdb.cursor.fetchone()
+    assert (entityid, reason) == ("2", "exception")
+    assert "ValueError: broken table" in exception
+
+def test_oversized_page_is_not_run(stage):
+    assert not imfdb.run_page(stage, "1", insert_row, "1", size=imfdb.page_budget_dict["bytes"] + 1)
+    assert count_rows() == 0
+    assert imfdb.load_quarantine(stage) == {"1"}
+
+def test_retry_only_runs_quarantined_pages_and_releases_them(stage, monkeypatch):
+    imfdb.run_page(stage, "2", fail, "2")
+    imfdb.commit_writes()
+    monkeypatch.setitem(imfdb.page_budget_dict, "retry", True)
+    assert not imfdb.is_selected_page(stage, "1")
+    assert imfdb.is_selected_page(stage, "2")
+    assert imfdb.run_page(stage, "2", insert_row, "2")
+    imfdb.commit_writes()
+    assert imfdb.get_quarantined_stages() == []
+
+def test_failed_page_forgets_its_folded_names(stage):
+    imfdb.load_link_resolver()
+    def insert_actor():
+        imfdb.insert_actor_without_page("Tom Sizemore")
+        raise ValueError("broken table")
+    imfdb.run_page(stage, "1", insert_actor)
+    assert imfdb.lookup_folded_name("Tom Sizemore", "actors") is None
@@ -0,0 +1,58 @@
+import imfdb_connector as imfdb
+
+spec_page = """The '''Colt M1911''' is a pistol.{{Citation needed}}
+
+==Specifications==
+{{Gun spec
+|production = 1911 - Present
+|type = Pistol
+|caliber = {{nowrap|.45 ACP}}
+|feed_system = 7-round box magazine
+|fire modes = Semi-Auto
+}}
+
+==Film==
+{| class="wikitable"
+! Title !! Actor !! Character !! Note !! Date
+|-
+| ''[[Heat (1995)|Heat]]'' || [[Robert De Niro]] || Neil McCauley || || 1995
+|}
+"""
+
+def test_spec_template_is_rendered_as_spec_list():
+    spec = imfdb.get_single_specification(imfdb.render_wikitext("Colt M1911", spec_page))
+    assert spec["production"] == "(1911 - Present)"
+    assert spec["type"] == "Pistol"
+    assert spec["caliber"] == ".45 ACP"
+    assert spec["capacity"] == "7-round box magazine"
+    assert spec["fire_modes"] == "Semi-Auto"
+
+def test_spec_list_items_keep_text_templates():
+    wikitext = "==Specifications==\n(1935 - 1972)\n\n* '''Type:''' Pistol\n* '''Caliber:''' {{nowrap|9x19mm Parabellum}}{{Ref|x}}\n"
+    spec = imfdb.get_single_specification(imfdb.render_wikitext("Browning Hi-Power", wikitext))
+    assert spec["caliber"] == "9x19mm Parabellum"
+    assert spec["production"] == "(1935 - 1972)"
+
+def test_other_templates_are_dropped():
+    assert imfdb.strip_wikitext("A {{Quote|text={{nowrap|b}}}} c {{Navbox}}") == "A  c "
+    assert imfdb.strip_wikitext("{{convert|9|mm|in}} long") == "9 mm long"
+
+def test_appearance_table_is_rendered():
+    html = imfdb.render_wikitext("Colt M1911", spec_page)
+    assert '<a href="/wiki/Heat_%281995%29" title="Heat (1995)">Heat</a>' in html
+    assert '<span class="mw-headline" id="Film">Film</span>' in html
+
+def test_pages_are_stored_as_wikitext(sqlite_db, monkeypatch):
+    # Pages downloaded as wikitext keep their wikitext and are rendered when a stage reads them
+    monkeypatch.setitem(imfdb.page_source_dict, "mode", "wikitext")
+    monkeypatch.setattr(imfdb, "get_wikitext_by_ids", lambda pageids: {str(pageid) : ("Colt M1911", spec_page) for pageid in pageids})
+    assert imfdb.get_page_sources_by_ids(["1"]) == [(None, spec_page)]
+    imfdb.cursor.execute("INSERT INTO firearms (firearmurl, firearmpageid, firearmpagecontent, firearmwikitext, firearmtitle) VALUES (%s, %s, %s, %s, %s)",
+                         ("https://www.imfdb.org/index.php?curid=1", "1", None, spec_page, "Colt M1911"))
+    imfdb.cnx.commit()
+    imfdb.cursor.execute("SELECT * FROM firearms")
+    firearm = imfdb.cursor.fetchone()
+    assert firearm[imfdb.firearms_dict["firearmpagecontent"]] is None
+    assert imfdb.get_firearm_html(firearm) == imfdb.render_wikitext("Colt M1911", spec_page)
+    assert imfdb.get_firearm_size(firearm) == len(spec_page)
+    assert imfdb.get_page_content_from_db_by_uuid(firearm[0], "firearms") == imfdb.get_firearm_html(firearm)
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+import imfdb_connector as imfdb
+
+checkpoint_statement = "INSERT INTO checkpoints (stage, entityid) VALUES (%s, %s)"
+
+@pytest.fixture
+def writer(sqlite_db):
+    # The writer thread on SQLite, which is only used on PostgreSQL otherwise. Its connection is opened by the thread itself.
+    writes = imfdb.start_writer()
+    yield writes
+    imfdb.stop_writer()
+
+def wait_for(writes):
+    barrier = threading.Event()
+    writes.put(barrier)
+    assert barrier.wait(10)
+
+def count_checkpoints():
+    imfdb.cursor.execute("SELECT count(*) FROM checkpoints")
+    count = imfdb.cursor.fetchone()[0]
+    imfdb.cnx.commit()
+    return count
+
+def test_writes_run_inline_on_sqlite(sqlite_db):
+    imfdb.queue_write(checkpoint_statement, ("test", "1"))
+    assert imfdb.get_pending_writes() == []
+    imfdb.commit_writes()
+    assert count_checkpoints() == 1
+
+def test_groups_are_committed_before_the_barrier(writer):
+    writer.put([(checkpoint_statement, ("test", "1")), (checkpoint_statement, ("test", "2"))])
+    wait_for(writer)
+    assert count_checkpoints() == 2
+
+def test_failed_group_is_raised_and_later_groups_dropped(writer):
+    writer.put([(checkpoint_statement, ("test", "1")), (checkpoint_statement, ("test", "1"))])
+    writer.put([(checkpoint_statement, ("test", "2"))])
+    wait_for(writer)
+    assert count_checkpoints() == 0
+    with pytest.raises(RuntimeError):
+        imfdb.raise_writer_error()
+
+def test_copy_statement():
+    assert imfdb.get_copy_statement("INSERT INTO images (url, mime) VALUES (%s, %s)") == ("images", "COPY images (url, mime) FROM STDIN")
+    assert imfdb.get_copy_statement("INSERT INTO checkpoints (stage, entityid) VALUES (%s, %s) ON CONFLICT DO NOTHING") is None
+    assert imfdb.get_copy_statement("INSERT INTO images (url) SELECT url FROM actorimages") is None
+
+def test_copy_value():
+    assert imfdb.format_copy_value(None) == "\\N"
+    assert imfdb.format_copy_value(True) == "t"
+    assert imfdb.format_copy_value(False) == "f"
+    assert imfdb.format_copy_value("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+    assert imfdb.format_copy_value(1984) == "1984"
+
+def test_bulk_load_collects_inserts_until_their_table_is_touched(writer, monkeypatch):
+    # Collected rows of a table are loaded before another statement on that table, those of other tables wait for the commit
+    copies = []
+    monkeypatch.setattr(imfdb, "copy_rows", lambda statement, rows: copies.append((statement.split()[1], len(rows))))
+    monkeypatch.setitem(imfdb.bulk_load_dict, "active", True)
+    writer.put([("INSERT INTO images (url) VALUES (%s)", ("a.jpg",)),
+                ("INSERT INTO firearmimages (firearmid, url) VALUES (%s, %s)", ("1", "a.jpg")),
+                ("INSERT INTO images (url) VALUES (%s)", ("b.jpg",)),
+                ("DELETE FROM images WHERE url = %s", ("c.jpg",))])
+    wait_for(writer)
+    assert copies == [("images", 2), ("firearmimages", 1)]